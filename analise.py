@@ -1,10 +1,15 @@
-import pandas as pd
 from sklearn.cluster import KMeans
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 import numpy as np
 import os 
 
+import leitura
+import armazenamento
+import simulacao
+import validacao
+from configuracao import CONFIG_SERIES
+
 # Constantes globais
 SEED = 42
 FEATURES_PRINCIPAIS = ['PROFICIENCIA_LP', 'PROFICIENCIA_MT']
@@ -18,20 +23,17 @@ COLUNAS_MANTER = [
     'TX_RESP_Q05b',   # Q05b: TEA
     'TX_RESP_Q05c'    # Q05c: Superdotação
 ]
+TIPOS_COLUNAS = {
+    'PROFICIENCIA_LP': 'float64',
+    'PROFICIENCIA_MT': 'float64',
+    'TX_RESP_Q05a': str,
+    'TX_RESP_Q05b': str,
+    'TX_RESP_Q05c': str
+}
 
-CONFIG_SERIES = {
-    '5EF': {
-        'N_CLUSTERS': 7, 
-        'ALTO_RISCO': ['1', '2', '3'], 
-        'MODERADO': ['5', '6'], 
-        'NORMAL_BASE': ['4', '0'] 
-    },
-    '9EF': {
-        'N_CLUSTERS': 7, 
-        'ALTO_RISCO': ['1', '2', '3'], 
-        'MODERADO': ['5', '6'],
-        'NORMAL_BASE': ['4', '0']
-    }
+ARQUIVOS_ALUNO = {
+    '5EF': 'D:/PI_SAEB/DADOS/TS_ALUNO_5EF.csv',
+    '9EF': 'D:/PI_SAEB/DADOS/TS_ALUNO_9EF.csv'
 }
 
 def classificar_risco_final(cluster_id_str, flag_risco_anomalia, tx_resp_q05c, config_risco):
@@ -64,18 +66,10 @@ def classificar_risco_final(cluster_id_str, flag_risco_anomalia, tx_resp_q05c, c
         return 'Normal'
 
 
-def carregar_e_processar_dados(caminho_csv, ano_escolar, config_serie):
-    """Carrega, limpa e processa os dados de proficiência para um dado ano."""
-    print(f"Iniciando processamento para {ano_escolar} com K={config_serie['N_CLUSTERS']}...")
-    
-    try:
-        df = pd.read_csv(caminho_csv, sep=';', encoding='latin-1', usecols=lambda x: x in COLUNAS_MANTER)
-    except Exception as e:
-        print(f"Erro ao carregar {caminho_csv}: {e}")
-        return None
-
-    df.dropna(subset=FEATURES_PRINCIPAIS, inplace=True)
-    df.drop_duplicates(subset=['ID_ALUNO'], keep='first', inplace=True)
+def preparar_dados_modelo(df):
+    """Limpa os dados e retorna o DataFrame e a matriz padronizada usada pelos modelos."""
+    df = df.dropna(subset=FEATURES_PRINCIPAIS)
+    df = df.drop_duplicates(subset=['ID_ALUNO'], keep='first').copy()
     
     df['TX_RESP_Q05c'] = df['TX_RESP_Q05c'].fillna('B')
    
@@ -87,6 +81,20 @@ def carregar_e_processar_dados(caminho_csv, ano_escolar, config_serie):
     
     scaler = StandardScaler()
     df_modelo_scaled = scaler.fit_transform(df_modelo)
+    return df, df_modelo_scaled
+
+
+def carregar_e_processar_dados(caminho_csv, ano_escolar, config_serie):
+    """Carrega, limpa e processa os dados de proficiência para um dado ano."""
+    print(f"Iniciando processamento para {ano_escolar} com K={config_serie['N_CLUSTERS']}...")
+    
+    try:
+        df = leitura.ler_csv(caminho_csv, colunas=COLUNAS_MANTER, dtype=TIPOS_COLUNAS)
+    except Exception as e:
+        print(f"Erro ao carregar {caminho_csv}: {e}")
+        return None
+
+    df, df_modelo_scaled = preparar_dados_modelo(df)
     
     # 4. Treinamento do K-Means (Clustering)
     kmeans = KMeans(n_clusters=config_serie['N_CLUSTERS'], random_state=SEED, n_init=10)
@@ -96,6 +104,8 @@ def carregar_e_processar_dados(caminho_csv, ano_escolar, config_serie):
     # 5. Treinamento do Isolation Forest (Detecção de Risco/Anomalia)
     iso_forest = IsolationForest(contamination=0.05, random_state=SEED)
     df['ANOMALIA'] = iso_forest.fit_predict(df_modelo_scaled)
+    # Score contínuo (negativo = anômalo); permite simular outros níveis de contaminação.
+    df['SCORE_ANOMALIA'] = iso_forest.decision_function(df_modelo_scaled)
     df['FLAG_RISCO_ANOMALIA'] = df['ANOMALIA'].apply(lambda x: 'Normal' if x == 1 else 'Risco')
 
     # Geração do Status de Risco customizado (Alto, Moderado, Normal, Superdotação)
@@ -116,8 +126,11 @@ def carregar_e_processar_dados(caminho_csv, ano_escolar, config_serie):
 if __name__ == "__main__":
     os.makedirs('data', exist_ok=True) 
 
-    CAMINHO_5EF = 'D:/PI_SAEB/DADOS/TS_ALUNO_5EF.csv'
-    CAMINHO_9EF = 'D:/PI_SAEB/DADOS/TS_ALUNO_9EF.csv'
+    # Interrompe antes do treinamento se a amostra das entradas tiver erros.
+    validacao.exigir_entradas_validas(ARQUIVOS_ALUNO, COLUNAS_MANTER, 'analise')
+
+    CAMINHO_5EF = ARQUIVOS_ALUNO['5EF']
+    CAMINHO_9EF = ARQUIVOS_ALUNO['9EF']
     
     df_5ef_analisado = carregar_e_processar_dados(CAMINHO_5EF, '5º Ano', CONFIG_SERIES['5EF'])
     df_9ef_analisado = carregar_e_processar_dados(CAMINHO_9EF, '9º Ano', CONFIG_SERIES['9EF'])
@@ -131,6 +144,12 @@ if __name__ == "__main__":
             index=False
         )
         print("Arquivo 'data/resultados_finais_5EF.csv.gz' salvo com sucesso.")
+        armazenamento.gravar_particoes(df_5ef_analisado, 'resultados', '5EF')
+
+        df_hist_5ef = simulacao.gerar_histogramas_risco(df_5ef_analisado)
+        df_hist_5ef.to_csv('data/histogramas_risco_5EF.csv.gz', sep=';', encoding='utf-8', compression='gzip', index=False)
+        print(f"Arquivo 'data/histogramas_risco_5EF.csv.gz' salvo ({len(df_hist_5ef)} células).")
+        armazenamento.gravar_particoes(df_hist_5ef, 'histogramas_risco', '5EF')
           
     if df_9ef_analisado is not None:
         df_9ef_analisado.to_csv(
@@ -141,5 +160,11 @@ if __name__ == "__main__":
             index=False
         )
         print("Arquivo 'data/resultados_finais_9EF.csv.gz' salvo com sucesso.")
+        armazenamento.gravar_particoes(df_9ef_analisado, 'resultados', '9EF')
+
+        df_hist_9ef = simulacao.gerar_histogramas_risco(df_9ef_analisado)
+        df_hist_9ef.to_csv('data/histogramas_risco_9EF.csv.gz', sep=';', encoding='utf-8', compression='gzip', index=False)
+        print(f"Arquivo 'data/histogramas_risco_9EF.csv.gz' salvo ({len(df_hist_9ef)} células).")
+        armazenamento.gravar_particoes(df_hist_9ef, 'histogramas_risco', '9EF')
 
     print("\nProcesso de Análise concluído.")
\ No newline at end of file
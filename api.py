@@ -0,0 +1,304 @@
+import argparse
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+import armazenamento
+import carregamento
+import graficos
+
+
+# Serviço HTTP/JSON somente leitura sobre as saídas do pipeline, com os mesmos
+# números do painel. Os parâmetros espelham os filtros da barra lateral:
+#   serie, edicao, uf (ID_UF), status, cluster e disciplina (LP/MT).
+# Parâmetros com vários valores aceitam repetição (?cluster=1&cluster=2) ou vírgulas.
+
+HOST_PADRAO = '127.0.0.1'
+PORTA_PADRAO = 8765
+MAX_DADOS_CACHE = 4
+MAX_RESPOSTAS_CACHE = 512
+
+
+class ErroRequisicao(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class CacheLRU:
+    """Cache LRU seguro entre threads."""
+
+    def __init__(self, max_itens):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave):
+        with self._trava:
+            if chave not in self._itens:
+                self.faltas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return self._itens[chave]
+
+    def guardar(self, chave, valor):
+        with self._trava:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+
+_CACHE_DADOS = CacheLRU(MAX_DADOS_CACHE)
+_CACHE_RESPOSTAS = CacheLRU(MAX_RESPOSTAS_CACHE)
+# Evita que requisições simultâneas carreguem a mesma (série, edição) em paralelo.
+_TRAVA_CARGA = threading.Lock()
+
+
+def carregar_dados_cache(serie, edicao):
+    chave = (serie, edicao)
+    dados = _CACHE_DADOS.obter(chave)
+    if dados is None:
+        with _TRAVA_CARGA:
+            dados = _CACHE_DADOS.obter(chave)
+            if dados is None:
+                dados = carregamento.carregar_dados(serie, edicao)
+                if dados[0] is None:
+                    raise ErroRequisicao(404, f"Dados da série {serie} na edição {edicao} não encontrados.")
+                _CACHE_DADOS.guardar(chave, dados)
+    return dados
+
+
+def _valores(parametros, nome):
+    """Lista de valores de um parâmetro (repetido e/ou separado por vírgulas) ou None."""
+    if nome not in parametros:
+        return None
+    return [v.strip() for valor in parametros[nome] for v in valor.split(',') if v.strip()]
+
+
+def _valor_unico(parametros, nome, padrao=None):
+    valores = _valores(parametros, nome)
+    return valores[0] if valores else padrao
+
+
+def ler_filtros(parametros):
+    """Valida os parâmetros da consulta e retorna os filtros normalizados."""
+    serie = _valor_unico(parametros, 'serie')
+    if serie not in carregamento.ARQUIVOS_SERIES:
+        raise ErroRequisicao(400, f"Parâmetro 'serie' obrigatório: {', '.join(carregamento.ARQUIVOS_SERIES)}.")
+
+    try:
+        edicao = int(_valor_unico(parametros, 'edicao', armazenamento.EDICAO_ATUAL))
+        ufs = [int(uf) for uf in _valores(parametros, 'uf')] if _valores(parametros, 'uf') else None
+    except ValueError:
+        raise ErroRequisicao(400, "Os parâmetros 'edicao' e 'uf' devem ser numéricos.")
+
+    disciplina = _valor_unico(parametros, 'disciplina')
+    if disciplina is not None and disciplina not in ('LP', 'MT'):
+        raise ErroRequisicao(400, "Parâmetro 'disciplina' deve ser LP ou MT.")
+
+    return {
+        'serie': serie,
+        'edicao': edicao,
+        'uf': ufs,
+        'status': _valores(parametros, 'status') or None,
+        'cluster': _valores(parametros, 'cluster') or None,
+        'disciplina': disciplina,
+    }
+
+
+def filtrar_alunos(df_alunos, filtros):
+    """Aplica os filtros globais do painel (UF, status de risco e clusters)."""
+    condicao = pd.Series(True, index=df_alunos.index)
+    if filtros['uf'] is not None:
+        condicao &= df_alunos['ID_UF'].isin(filtros['uf'])
+    if filtros['status'] is not None:
+        condicao &= df_alunos['STATUS_RISCO_FINAL'].isin(filtros['status'])
+    if filtros['cluster'] is not None:
+        condicao &= df_alunos['CLUSTER'].isin(filtros['cluster'])
+    return df_alunos[condicao]
+
+
+def filtrar_diagnostico(df_diag, filtros):
+    """Filtra o diagnóstico por cluster e disciplina e oculta as habilidades como o painel."""
+    condicao = pd.Series(True, index=df_diag.index)
+    if filtros['cluster'] is not None:
+        condicao &= df_diag['CLUSTER'].isin(filtros['cluster'])
+    if filtros['disciplina'] is not None:
+        condicao &= df_diag['TP_DISCIPLINA'] == filtros['disciplina']
+    for disciplina, descritores in carregamento.HABILIDADES_OCULTAR.get(filtros['serie'], {}).items():
+        condicao &= ~((df_diag['TP_DISCIPLINA'] == disciplina) & df_diag['NU_DESCRITOR_HABILIDADE'].isin(descritores))
+    return df_diag[condicao]
+
+
+def _nativo(valor):
+    """Converte escalares numpy/pandas em tipos JSON (NaN vira null)."""
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    return valor
+
+
+def _registros(df):
+    return [{coluna: _nativo(valor) for coluna, valor in registro.items()} for registro in df.to_dict('records')]
+
+
+def rota_edicoes(parametros):
+    return {
+        serie: carregamento.listar_edicoes_disponiveis(serie)
+        for serie in carregamento.ARQUIVOS_SERIES
+    }
+
+
+def rota_kpis(parametros):
+    filtros = ler_filtros(parametros)
+    df_alunos, _ = carregar_dados_cache(filtros['serie'], filtros['edicao'])
+    df_filtrado = filtrar_alunos(df_alunos, filtros)
+    return {'filtros': filtros, 'kpis': {k: _nativo(v) for k, v in graficos.calcular_kpis(df_filtrado).items()}}
+
+
+def rota_distribuicao_risco(parametros):
+    filtros = ler_filtros(parametros)
+    df_alunos, _ = carregar_dados_cache(filtros['serie'], filtros['edicao'])
+    contagens = filtrar_alunos(df_alunos, filtros)['STATUS_RISCO_FINAL'].value_counts()
+    total = int(contagens.sum())
+    return {
+        'filtros': filtros,
+        'total_alunos': total,
+        'status': [
+            {'STATUS_RISCO_FINAL': status, 'N_ALUNOS': int(n), 'PERCENTUAL': n / total if total else None}
+            for status, n in contagens.items()
+        ],
+    }
+
+
+def rota_clusters(parametros):
+    filtros = ler_filtros(parametros)
+    df_alunos, _ = carregar_dados_cache(filtros['serie'], filtros['edicao'])
+    config = carregamento.CONFIG_APP_SERIES[filtros['serie']]
+    contagens = filtrar_alunos(df_alunos, filtros)['CLUSTER'].value_counts().sort_index()
+    return {
+        'filtros': filtros,
+        'clusters': [
+            {
+                'CLUSTER': cluster,
+                'DESCRICAO': config['CLUSTER_LEGEND'].get(cluster, f"Cluster {cluster} (Sem Legenda)"),
+                'STATUS_RISCO': config['CLUSTER_PARA_RISCO'].get(cluster, 'Desconhecido'),
+                'N_ALUNOS': int(n),
+            }
+            for cluster, n in contagens.items()
+        ],
+    }
+
+
+def rota_diagnostico(parametros):
+    filtros = ler_filtros(parametros)
+    _, df_diag = carregar_dados_cache(filtros['serie'], filtros['edicao'])
+    df_diag = filtrar_diagnostico(df_diag, filtros)
+    colunas = [c for c in ['CLUSTER', 'TP_DISCIPLINA', 'NU_DESCRITOR_HABILIDADE', 'DESCRICAO_HABILIDADE',
+                           'N_RESPOSTAS', 'TAXA_ERRO', 'TAXA_ERRO_IC_INF', 'TAXA_ERRO_IC_SUP'] if c in df_diag.columns]
+    return {
+        'filtros': filtros,
+        'diagnostico': _registros(df_diag[colunas].sort_values(by=['TP_DISCIPLINA', 'NU_DESCRITOR_HABILIDADE', 'CLUSTER'])),
+    }
+
+
+ROTAS = {
+    '/edicoes': rota_edicoes,
+    '/kpis': rota_kpis,
+    '/distribuicao-risco': rota_distribuicao_risco,
+    '/clusters': rota_clusters,
+    '/diagnostico': rota_diagnostico,
+}
+
+
+def _chave_resposta(caminho, parametros):
+    """Chave canônica da resposta: a ordem dos parâmetros e valores não importa."""
+    return caminho, tuple(sorted((nome, tuple(sorted(_valores(parametros, nome)))) for nome in parametros))
+
+
+def responder(caminho, parametros):
+    """Retorna (corpo, etag) da rota, usando o cache de respostas."""
+    chave = _chave_resposta(caminho, parametros)
+    resposta = _CACHE_RESPOSTAS.obter(chave)
+    if resposta is None:
+        if caminho not in ROTAS:
+            raise ErroRequisicao(404, f"Rota {caminho} inexistente. Rotas: {', '.join(ROTAS)}.")
+        corpo = json.dumps(ROTAS[caminho](parametros), ensure_ascii=False).encode('utf-8')
+        resposta = (corpo, '"' + hashlib.sha1(corpo).hexdigest() + '"')
+        _CACHE_RESPOSTAS.guardar(chave, resposta)
+    return resposta
+
+
+class ManipuladorAPI(BaseHTTPRequestHandler):
+    server_version = 'PainelSAEB/1.0'
+    log_requisicoes = False
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        try:
+            corpo, etag = responder(url.path.rstrip('/') or '/', parse_qs(url.query))
+        except ErroRequisicao as e:
+            self._enviar(e.status, json.dumps({'erro': str(e)}, ensure_ascii=False).encode('utf-8'))
+            return
+        except Exception as e:
+            self._enviar(500, json.dumps({'erro': f'{type(e).__name__}: {e}'}, ensure_ascii=False).encode('utf-8'))
+            return
+
+        etags_cliente = [t.strip() for t in self.headers.get('If-None-Match', '').split(',')]
+        if etag in etags_cliente or '*' in etags_cliente:
+            self._enviar(304, b'', etag)
+        else:
+            self._enviar(200, corpo, etag)
+
+    def _enviar(self, status, corpo, etag=None):
+        self.send_response(status)
+        if etag is not None:
+            self.send_header('ETag', etag)
+            # Os clientes podem guardar a resposta, mas devem revalidá-la (If-None-Match).
+            self.send_header('Cache-Control', 'no-cache')
+        if status != 304:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        if self.log_requisicoes:
+            super().log_message(formato, *args)
+
+
+def criar_servidor(host=HOST_PADRAO, porta=PORTA_PADRAO, log_requisicoes=False):
+    ManipuladorAPI.log_requisicoes = log_requisicoes
+    servidor = ThreadingHTTPServer((host, porta), ManipuladorAPI)
+    servidor.daemon_threads = True
+    return servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API HTTP/JSON somente leitura sobre os resultados do pipeline.")
+    parser.add_argument('--host', default=HOST_PADRAO)
+    parser.add_argument('--porta', type=int, default=PORTA_PADRAO)
+    parser.add_argument('--log', action='store_true', help="Registra cada requisição no terminal.")
+    args = parser.parse_args()
+
+    servidor = criar_servidor(args.host, args.porta, args.log)
+    print(f"API disponível em http://{args.host}:{args.porta} (rotas: {', '.join(ROTAS)}).")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
@@ -1,94 +1,41 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go 
 import os
-import numpy as np
-import re 
+import tempfile
+import time
+import plotly.express as px
 from typing import Dict, Any, Tuple
 
+import perfis_habilidades
+import armazenamento
+import carregamento
+import graficos
+import simulacao
+import telemetria
+
 #  Configuração da Página 
 st.set_page_config(
-    page_title="Painel de Diagnóstico SAEB - 2023",
+    page_title="Painel de Diagnóstico SAEB",
     page_icon="📊",
     layout="wide"
 )
 
+# Telemetria de desenvolvimento (opcional): ativada pelo interruptor no fim da barra lateral
+# ou por padrão com SAEB_TELEMETRIA=1.
+TELEMETRIA_PADRAO = os.environ.get('SAEB_TELEMETRIA') == '1'
+ETAPAS_CACHEADAS = ['carregar_dados', 'carregar_perfis', 'carregar_estatisticas_itens', 'carregar_agregados', 'resumir_edicao',
+                     'carregar_histogramas_risco']
+telemetria_ativa = st.session_state.get('telemetria_ativa', TELEMETRIA_PADRAO)
+if telemetria_ativa:
+    telemetria.iniciar()
+
 #  Constantes Globais  
-ARQUIVOS_SERIES = {
-    '5EF': {
-        'resultados': 'data/resultados_finais_5EF.csv.gz',
-        'diagnostico': 'data/diagnostico_habilidades_5EF.csv.gz',
-        'matriz': 'descritores_5EF.csv'  
-    },
-    '9EF': {
-        'resultados': 'data/resultados_finais_9EF.csv.gz',
-        'diagnostico': 'data/diagnostico_habilidades_9EF.csv.gz',
-        'matriz': 'descritores_9EF.csv' 
-    }
-}
-HABILIDADES_OCULTAR = {
-    '5EF': {
-        'LP': ['D20', 'D18'], 
-        'MT': ['D34', 'D35', 'D36'] 
-    },
-    '9EF': {
-        'LP': [],
-        'MT': []
-    }
-}
-MAPA_UF = {
-    11: 'RO - Rondônia', 12: 'AC - Acre', 13: 'AM - Amazonas', 14: 'RR - Roraima', 
-    15: 'PA - Pará', 16: 'AP - Amapá', 17: 'TO - Tocantins', 21: 'MA - Maranhão', 
-    22: 'PI - Piauí', 23: 'CE - Ceará', 24: 'RN - Rio Grande do Norte', 25: 'PB - Paraíba', 
-    26: 'PE - Pernambuco', 27: 'AL - Alagoas', 28: 'SE - Sergipe', 29: 'BA - Bahia', 
-    31: 'MG - Minas Gerais', 32: 'ES - Espírito Santo', 33: 'RJ - Rio de Janeiro', 
-    35: 'SP - São Paulo', 41: 'PR - Paraná', 42: 'SC - Santa Catarina', 
-    43: 'RS - Rio Grande do Sul', 50: 'MS - Mato Grosso do Sul', 51: 'MT - Mato Grosso', 
-    52: 'GO - Goiás', 53: 'DF - Distrito Federal', 
-    -1: 'Não Informado' 
-}
-CONFIG_APP_SERIES = { 
-    '5EF': {
-        'CLUSTER_LEGEND': {
-            '3': 'Dificuldade Crítica Generalizada', '1': 'Risco Extremo em LP (Dislexia)',   
-            '2': 'Risco Extremo em MT (Discalculia)', '0': 'Abaixo da Média Equilibrado',      
-            '6': 'Risco Extremo LP (Dislexia Forte)', '5': 'Risco MT (Discalculia Moderado)',   
-            '4': 'Alto Desempenho Equilibrado',       
-        },
-        'RISCO_PARA_CLUSTER': {
-            'Alto Risco': ['3', '1', '2', '6'], 'Risco Moderado': ['0', '5'], 'Normal': ['4']          
-        },
-        'CLUSTER_PARA_RISCO': {
-            '3': 'Alto Risco', '1': 'Alto Risco', '2': 'Alto Risco', '6': 'Alto Risco',
-            '0': 'Risco Moderado', '5': 'Risco Moderado', '4': 'Normal'
-        }
-    },
-    '9EF': {
-        'CLUSTER_LEGEND': {
-            '0': 'Grande Déficit em MT (Crítico)', '6': 'Grande Déficit em LP (Crítico)',
-            '3': 'Risco Extremo Dislexia (LP << MT)', '2': 'Risco Extremo Discalculia (LP >> MT)',
-            '5': 'Alto Desempenho Discrepante (LP Forte)', '1': 'Alto Desempenho Discrepante (MT Forte)',
-            '4': 'Perfil Mediano Equilibrado (Média Geral)', 
-        },
-        'RISCO_PARA_CLUSTER': {
-            'Alto Risco': ['0', '6', '3', '2'], 'Risco Moderado': ['5', '1'], 'Normal': ['4']         
-        },
-        'CLUSTER_PARA_RISCO': {
-            '4': 'Normal', '0': 'Alto Risco', '6': 'Alto Risco',
-            '3': 'Alto Risco', '2': 'Alto Risco', '5': 'Risco Moderado', 
-            '1': 'Risco Moderado'
-        }
-    }
-}
-STATUS_RISCO_FINAL = ['Normal', 'Risco Moderado', 'Alto Risco', 'Superdotação']
-RISK_SORT_KEY = {'Alto Risco': 0, 'Risco Moderado': 1, 'Superdotação': 2, 'Normal': 3, 'Desconhecido': 99}
-COR_PRIMARIA_AZUL = '#1f77b4' 
-COR_SECUNDARIA_VERDE = '#2ca02c' 
-COR_ALTO_RISCO = '#17becf' 
-COR_MODERADO = '#9467bd' 
-COR_NORMAL = COR_SECUNDARIA_VERDE 
-COR_SUPERDOTACAO = '#ff7f0e' 
+from carregamento import (
+    ARQUIVOS_SERIES, EDICAO_ARQUIVOS_LEGADOS, HABILIDADES_OCULTAR, MAPA_UF,
+    CONFIG_APP_SERIES, STATUS_RISCO_FINAL, RISK_SORT_KEY
+)
+from graficos import COR_PRIMARIA_AZUL, COR_MODERADO
+from configuracao import CONFIG_SERIES, QUANTIL_RISCO, QUANTIL_DISCREPANCIA
 
 
 st.markdown("""
@@ -136,163 +83,81 @@ def set_risco_from_clusters(todos_status: list, config_serie: Dict[str, Any]):
         riscos_ordenados = [r for r in todos_status if r in riscos_a_selecionar]
         st.session_state.filtro_status_risco_global_temp = riscos_ordenados
 
-def limpar_caracteres_acentuados(texto: Any) -> Any:
-    """Função para tentar corrigir problemas de codificação de caracteres."""
-    if pd.isna(texto) or not isinstance(texto, str):
-        return texto
-        
-    texto = texto.replace('Ã£o', 'ão').replace('Ã£o', 'ão')
-    texto = texto.replace('Ãªncia', 'ência')
-    texto = texto.replace('Ã¡', 'á').replace('Ã©', 'é').replace('Ã­', 'í').replace('Ã³', 'ó').replace('Ãº', 'ú')
-    texto = texto.replace('Ã§', 'ç').replace('Ãµ', 'õ')
-    texto = texto.replace('Ão', 'ão').replace('Ãa', 'ã') 
-    texto = re.sub(r'Ã\w+', lambda m: m.group(0).lstrip('Ã'), texto) 
-    return texto
-
-@st.cache_data
-def carregar_dados(serie: str) -> Tuple[pd.DataFrame | None, pd.DataFrame | None]:
+@telemetria.cronometrar()
+@st.cache_data(max_entries=4)
+def carregar_dados(serie: str, edicao: int) -> Tuple[pd.DataFrame | None, pd.DataFrame | None]:
     """Função para carregar todos os dataframes necessários."""
-    
-    COLUNA_DESCRITOR_MATRIZ = 'NU_DESCRITOR_HABILIDADE' 
-    COLUNA_DESCRICAO_MATRIZ = 'DESCRICAO'
-    COLUNA_DISCIPLINA_MATRIZ = 'TP_DISCIPLINA' 
-    SEPARADOR_CSV = ';'
-    caminho_resultados = ARQUIVOS_SERIES[serie]['resultados']
-    caminho_diagnostico = ARQUIVOS_SERIES[serie]['diagnostico']
-    caminho_matriz = ARQUIVOS_SERIES[serie]['matriz']
-
-    if not os.path.exists(caminho_resultados) or not os.path.exists(caminho_diagnostico):
-        st.error(f"ERRO: Arquivos principais da série **{serie}** não encontrados. Verifique se eles estão em 'data/'")
-        return None, None
-
-    try:
-        df_alunos = pd.read_csv(
-            caminho_resultados,
-            sep=SEPARADOR_CSV,
-            encoding='latin-1',
-            compression='gzip', 
-            dtype={'ID_ALUNO': str, 'CLUSTER': str}
-        )
-    except Exception as e:
-        st.error(f"Erro ao ler **{caminho_resultados}**. Detalhe: {e}")
-        return None, None
-        
-    df_alunos['STATUS_RISCO_FINAL'] = df_alunos['STATUS_RISCO_FINAL'].astype(str).replace('nan', 'Normal') 
-    
-    df_alunos['ID_UF'] = pd.to_numeric(df_alunos['ID_UF'], errors='coerce').fillna(-1).astype(int)
-    df_alunos['UF_DESCRICAO'] = df_alunos['ID_UF'].map(MAPA_UF).fillna('UF Desconhecida')
-
-    try:
-        df_diagnostico = pd.read_csv(
-            caminho_diagnostico,
-            sep=SEPARADOR_CSV,
-            encoding='latin-1',
-            compression='gzip', 
-            dtype={'CLUSTER': str, COLUNA_DESCRITOR_MATRIZ: str}
-        )
-        
-        df_matriz = pd.read_csv(
-            caminho_matriz,
-            sep=SEPARADOR_CSV,
-            encoding='latin-1'
-        )
-    except Exception as e:
-        st.error(f"Erro ao carregar arquivos de diagnóstico/matriz. Detalhe: {e}")
-        return None, None
-
-    try:
-        COLUNAS_MESCLAGEM = [COLUNA_DESCRITOR_MATRIZ, COLUNA_DISCIPLINA_MATRIZ]
-
-        df_diag_completo = pd.merge(
-            df_diagnostico,
-            df_matriz,
-            left_on=COLUNAS_MESCLAGEM,
-            right_on=COLUNAS_MESCLAGEM, 
-            how='left'
-        )
-    except KeyError as e:
-        st.error(f"KeyError durante o Merge: A coluna **{e}** não foi encontrada no seu arquivo de descritores.")
-        return None, None
-    
-    COLUNA_DISCIPLINA_MATRIZ = 'TP_DISCIPLINA' 
-    df_diag_completo[COLUNA_DISCIPLINA_MATRIZ] = df_diag_completo[COLUNA_DISCIPLINA_MATRIZ].astype(str).str.strip()
-    
-    if COLUNA_DESCRICAO_MATRIZ != 'DESCRICAO_HABILIDADE' and COLUNA_DESCRICAO_MATRIZ in df_diag_completo.columns:
-        df_diag_completo.rename(
-            columns={COLUNA_DESCRICAO_MATRIZ: 'DESCRICAO_HABILIDADE'}, 
-            inplace=True
-        )
-    
-    df_diag_completo['DESCRICAO_HABILIDADE'] = df_diag_completo['DESCRICAO_HABILIDADE'].apply(limpar_caracteres_acentuados)
-
-    df_diag_completo['DESCRICAO_HABILIDADE'] = df_diag_completo['DESCRICAO_HABILIDADE'].fillna(
-        df_diag_completo[COLUNA_DESCRITOR_MATRIZ] + " (Descrição não disponível)"
-    )
-
-    return df_alunos, df_diag_completo
+    telemetria.registrar_falta_cache('carregar_dados')
+    return carregamento.carregar_dados(serie, edicao, avisar=st.error)
+
+@telemetria.cronometrar()
+@st.cache_resource
+def carregar_perfis(serie: str, edicao: int) -> Dict[str, Any] | None:
+    """Abre (via mmap) o armazenamento de perfis individuais de habilidades da série na edição."""
+    telemetria.registrar_falta_cache('carregar_perfis')
+    return perfis_habilidades.abrir_perfis(armazenamento.diretorio_perfis(serie, edicao))
+
+@telemetria.cronometrar()
+@st.cache_data(max_entries=4)
+def carregar_estatisticas_itens(serie: str, edicao: int) -> Tuple[pd.DataFrame | None, pd.DataFrame | None]:
+    """Carrega as estatísticas por item e a frequência das alternativas por cluster."""
+    telemetria.registrar_falta_cache('carregar_estatisticas_itens')
+    return carregamento.carregar_estatisticas_itens(serie, edicao)
+
+@telemetria.cronometrar()
+@st.cache_data(max_entries=4)
+def carregar_agregados(serie: str, edicao: int) -> Tuple[pd.DataFrame | None, pd.DataFrame | None]:
+    """Carrega as tabelas de risco pré-agregadas por UF e por escola."""
+    telemetria.registrar_falta_cache('carregar_agregados')
+    return carregamento.carregar_agregados(serie, edicao)
+
+@telemetria.cronometrar()
+@st.cache_data(max_entries=16)
+def resumir_edicao(serie: str, edicao: int, ufs: Tuple[int, ...] | None) -> Tuple[Dict[str, Any] | None, pd.DataFrame | None]:
+    """KPIs e taxa de erro por habilidade de uma edição, lendo só as colunas e UFs necessárias."""
+    telemetria.registrar_falta_cache('resumir_edicao')
+    return carregamento.resumir_edicao(serie, edicao, ufs)
+
+@telemetria.cronometrar()
+@st.cache_data(max_entries=4)
+def carregar_histogramas_risco(serie: str, edicao: int) -> pd.DataFrame | None:
+    """Carrega os histogramas conjuntos usados pelo simulador de limiares de risco."""
+    telemetria.registrar_falta_cache('carregar_histogramas_risco')
+    return carregamento.carregar_histogramas_risco(serie, edicao)
 
 #  Funções de Visualização
 
+def exibir_figura(fig):
+    """Exibe a figura, registrando o tamanho serializado quando a telemetria está ativa."""
+    telemetria.registrar_figura(fig)
+    st.plotly_chart(fig, use_container_width=True)
+
+@telemetria.cronometrar()
 def criar_kpis_visao_geral(df_alunos_filtrado: pd.DataFrame):
     """Exibe os KPIs principais na Visão Geral."""
     st.subheader("Métricas Principais")
     kpi_t1, kpi_t2, kpi_t3, kpi_t4 = st.columns(4) 
     
-    total_alunos = df_alunos_filtrado['ID_ALUNO'].nunique()
-    alunos_risco = df_alunos_filtrado[
-        df_alunos_filtrado['STATUS_RISCO_FINAL'].isin(['Alto Risco', 'Risco Moderado'])
-    ]['ID_ALUNO'].nunique()
+    kpis = graficos.calcular_kpis(df_alunos_filtrado)
     
-    proficiencia_lp = df_alunos_filtrado['PROFICIENCIA_LP'].mean()
-    proficiencia_mt = df_alunos_filtrado['PROFICIENCIA_MT'].mean()
-    
-    kpi_t1.metric("Total de Alunos", f"{total_alunos:,}".replace(",", "."))
-    kpi_t2.metric("Alunos em Risco (Alto ou Mod.)", f"{alunos_risco:,}".replace(",", "."))
-    kpi_t3.metric("Proficiência Média (LP)", f"{proficiencia_lp:.2f}")
-    kpi_t4.metric("Proficiência Média (MT)", f"{proficiencia_mt:.2f}") 
+    kpi_t1.metric("Total de Alunos", f"{kpis['TOTAL_ALUNOS']:,}".replace(",", "."))
+    kpi_t2.metric("Alunos em Risco (Alto ou Mod.)", f"{kpis['ALUNOS_RISCO']:,}".replace(",", "."))
+    kpi_t3.metric("Proficiência Média (LP)", f"{kpis['MEDIA_LP']:.2f}")
+    kpi_t4.metric("Proficiência Média (MT)", f"{kpis['MEDIA_MT']:.2f}") 
     
     st.divider()
 
+@telemetria.cronometrar()
 def criar_grafico_risco(df_alunos_filtrado: pd.DataFrame):
     """Gera e exibe o gráfico de pizza de Status de Risco."""
     st.markdown("#### Distribuição por Status de Risco")
-    df_pizza = df_alunos_filtrado['STATUS_RISCO_FINAL'].value_counts().reset_index()
-    
-    color_map_risco = {
-        'Alto Risco': COR_ALTO_RISCO, 'Risco Moderado': COR_MODERADO, 
-        'Normal': COR_NORMAL, 'Superdotação': COR_SUPERDOTACAO
-    }
-    
-    fig_pizza = px.pie(
-        df_pizza,
-        names='STATUS_RISCO_FINAL',
-        values='count',
-        title="Alunos por Status de Risco",
-        hole=0.3,
-        color='STATUS_RISCO_FINAL',
-        color_discrete_map=color_map_risco
-    )
-    st.plotly_chart(fig_pizza, use_container_width=True)
+    exibir_figura(graficos.figura_risco(df_alunos_filtrado))
 
+@telemetria.cronometrar()
 def criar_grafico_cluster(df_alunos_filtrado: pd.DataFrame, cluster_legend: Dict[str, str]):
     """Gera e exibe o gráfico de barras de Contagem por Cluster."""
     st.markdown("#### Contagem por Cluster")
-    df_barras = df_alunos_filtrado['CLUSTER'].value_counts().reset_index().sort_values(by='CLUSTER')
-    
-    df_barras['CLUSTER_DESCRICAO'] = df_barras['CLUSTER'].map(cluster_legend).fillna(
-        df_barras['CLUSTER'].apply(lambda c: f"Cluster {c} (Sem Legenda)")
-    )
-    
-    fig_barras = px.bar(
-        df_barras,
-        x='CLUSTER_DESCRICAO', 
-        y='count',
-        title="Alunos por Cluster",
-        labels={'count': 'Número de Alunos', 'CLUSTER_DESCRICAO': 'Cluster de Risco'},
-        color_discrete_sequence=[COR_PRIMARIA_AZUL] 
-    )
-    fig_barras.update_xaxes(tickangle=45) 
-    st.plotly_chart(fig_barras, use_container_width=True)
+    exibir_figura(graficos.figura_cluster(df_alunos_filtrado, cluster_legend))
 
 def exibir_legenda_clusters(cluster_legend: Dict[str, str], cluster_para_risco: Dict[str, str]):
     """Exibe a legenda ordenada dos perfis de cluster."""
@@ -313,6 +178,7 @@ def exibir_legenda_clusters(cluster_legend: Dict[str, str], cluster_para_risco:
         for _, cluster_id, descricao, status_risco in lista_legendas:
             st.markdown(f"**[{cluster_id}] {status_risco}**: {descricao}")
 
+@telemetria.cronometrar()
 def criar_grafico_dispersao(df_alunos_filtrado: pd.DataFrame, cluster_legend: Dict[str, str]):
     """Gera e exibe o gráfico de dispersão LP vs MT."""
     st.markdown("#### Proficiência (LP vs MT) por Cluster")
@@ -337,115 +203,479 @@ def criar_grafico_dispersao(df_alunos_filtrado: pd.DataFrame, cluster_legend: Di
         yaxis_title='Proficiência Matemática (MT)',
     )
     
-    st.plotly_chart(fig_scatter, use_container_width=True)
+    exibir_figura(fig_scatter)
 
+@telemetria.cronometrar()
 def criar_heatmap_habilidade(df_diag_filtrado: pd.DataFrame, cluster_legend: Dict[str, str], disciplina_selec: str):
     """Gera e exibe o mapa de calor da Taxa de Erro por Habilidade e Cluster."""
     st.subheader("Mapa de Calor: Taxa de Erro por Habilidade e Cluster")
     st.markdown("O Eixo Y mostra o **código da Habilidade**. Quanto mais escuro (verde intenso), maior a taxa de erro média do cluster naquela habilidade. **Passe o mouse na célula para ver o código e a descrição completa.**")
     
     try:
-        df_heatmap_pivot = df_diag_filtrado.pivot_table(
-            index='NU_DESCRITOR_HABILIDADE', 
-            columns='CLUSTER',
-            values='TAXA_ERRO'
-        )
-        
-        z_values = df_heatmap_pivot.values
-        x_clusters = df_heatmap_pivot.columns.tolist()
-        y_descritores = df_heatmap_pivot.index.tolist()
-        
-        df_descricoes = df_diag_filtrado[['NU_DESCRITOR_HABILIDADE', 'DESCRICAO_HABILIDADE']].drop_duplicates()
-        descricoes_lookup = df_descricoes.set_index('NU_DESCRITOR_HABILIDADE')['DESCRICAO_HABILIDADE'].to_dict()
-        
-        hover_text = []
-        annotations = []
-
-        for i, descritor in enumerate(y_descritores):
-            row_text = []
-            descricao = limpar_caracteres_acentuados(descricoes_lookup.get(descritor, "Descrição não encontrada"))
-            
-            for j, cluster in enumerate(x_clusters):
-                erro = df_heatmap_pivot.loc[descritor, cluster]
-                cluster_desc = cluster_legend.get(cluster, f"Cluster {cluster}") 
-                
-                if not pd.isna(erro):
-                    hover_item = (
-                        f"<b>Cluster:</b> {cluster} ({cluster_desc})<br>"
-                        f"<b>Código:</b> {descritor}<br>"
-                        f"<b>Habilidade:</b> {descricao}<br>"
-                        f"<b>Taxa de Erro:</b> {erro:.2%}"
-                    )
-                    row_text.append(hover_item)
-                    
-                    annotations.append({
-                        'x': x_clusters[j], 'y': y_descritores[i], 'text': f"{erro:.0%}",
-                        'xref': 'x1', 'yref': 'y1', 'showarrow': False,
-                        'font': {'color': 'black', 'size': 10}
-                    })
-                else:
-                    hover_item = f"<b>Código:</b> {descritor}<br><b>Habilidade:</b> {descricao}<br>Dados não disponíveis<extra></extra>"
-                    row_text.append(hover_item)
-            hover_text.append(row_text)
-
-        fig_heatmap = go.Figure(data=go.Heatmap(
-            z=z_values, x=x_clusters, y=y_descritores, colorscale='Greens',
-            text=hover_text, hoverinfo="text", name='Taxa de Erro',
-            hovertemplate="%{text}<extra></extra>" 
-        ))
-        
-        fig_heatmap.update_layout(
-            title_text=f"Mapa de Calor: Taxa de Erro por Habilidade e Cluster ({disciplina_selec})",
-            yaxis_title='', xaxis_title='Cluster',
-            height=max(600, len(y_descritores) * 25),
-            annotations=annotations # Adiciona as anotações aqui
-        )
-
-        st.plotly_chart(fig_heatmap, use_container_width=True)
+        fig_heatmap = graficos.figura_heatmap_habilidade(df_diag_filtrado, cluster_legend, disciplina_selec)
+        exibir_figura(fig_heatmap)
         
     except Exception as e:
         st.error(f"Não foi possível gerar o mapa de calor. Detalhe: {e}")
 
+@telemetria.cronometrar()
 def criar_grafico_top10(df_diag_filtrado: pd.DataFrame, disciplina_selec: str):
     """Gera e exibe o gráfico de barras Top 10 Habilidades com Maior Erro."""
     st.subheader("Top 10 Habilidades com Maior Dificuldade")
     st.markdown("O Eixo X mostra o **código da Habilidade**. **Passe o mouse na barra para ver o código e a descrição completa.**")
     
-    df_top10 = df_diag_filtrado.groupby(['NU_DESCRITOR_HABILIDADE', 'DESCRICAO_HABILIDADE'])['TAXA_ERRO'].mean()
-    df_top10 = df_top10.nlargest(10).reset_index()
-    
-    fig_top10 = px.bar(
-        df_top10,
+    exibir_figura(graficos.figura_top_habilidades(df_diag_filtrado, disciplina_selec))
+
+@telemetria.cronometrar()
+def criar_drilldown_perfis(perfis: Dict[str, Any], df_diag_completo: pd.DataFrame):
+    """Consulta o perfil de habilidades de um aluno ou de uma escola."""
+    st.subheader("Consulta de Perfil por Aluno ou Escola")
+    st.markdown("Informe o **ID_ALUNO** ou o **ID_ESCOLA** para ver as habilidades acertadas e erradas.")
+
+    dcol1, dcol2 = st.columns([1, 2])
+    with dcol1:
+        tipo_consulta = st.radio("Consultar por", ['Aluno', 'Escola'], key='filtro_tipo_drilldown', horizontal=True)
+    with dcol2:
+        id_consulta = st.text_input(f"ID {'do Aluno' if tipo_consulta == 'Aluno' else 'da Escola'}", key='filtro_id_drilldown')
+
+    if not id_consulta:
+        return
+    if not id_consulta.strip().isdigit():
+        st.warning("O ID deve conter apenas números.")
+        return
+
+    df_descricoes = df_diag_completo[
+        ['TP_DISCIPLINA', 'NU_DESCRITOR_HABILIDADE', 'DESCRICAO_HABILIDADE']
+    ].drop_duplicates(subset=['TP_DISCIPLINA', 'NU_DESCRITOR_HABILIDADE'])
+
+    if tipo_consulta == 'Aluno':
+        df_perfil = perfis_habilidades.buscar_aluno(perfis, id_consulta.strip())
+        if df_perfil is None:
+            st.warning(f"Aluno {id_consulta} não encontrado.")
+            return
+        st.markdown(f"**Escola:** {df_perfil['ID_ESCOLA'].iloc[0]}")
+        df_perfil = df_perfil.merge(df_descricoes, on=['TP_DISCIPLINA', 'NU_DESCRITOR_HABILIDADE'], how='left')
+        df_exibir = df_perfil[['TP_DISCIPLINA', 'NU_DESCRITOR_HABILIDADE', 'DESCRICAO_HABILIDADE', 'RESULTADO']].rename(
+            columns={'TP_DISCIPLINA': 'Disciplina', 'NU_DESCRITOR_HABILIDADE': 'Habilidade',
+                     'DESCRICAO_HABILIDADE': 'Descrição', 'RESULTADO': 'Resultado'}
+        )
+    else:
+        df_perfil = perfis_habilidades.buscar_escola(perfis, id_consulta.strip())
+        if df_perfil is None:
+            st.warning(f"Escola {id_consulta} não encontrada.")
+            return
+        st.markdown(f"**Alunos avaliados:** {df_perfil.attrs['total_alunos']}")
+        df_perfil = df_perfil.merge(df_descricoes, on=['TP_DISCIPLINA', 'NU_DESCRITOR_HABILIDADE'], how='left')
+        df_perfil = df_perfil.sort_values(by='TAXA_ERRO', ascending=False)
+        df_perfil['TAXA_ERRO'] = df_perfil['TAXA_ERRO'].apply(lambda x: f"{x:.2%}" if pd.notna(x) else '-')
+        df_exibir = df_perfil[['TP_DISCIPLINA', 'NU_DESCRITOR_HABILIDADE', 'DESCRICAO_HABILIDADE', 'N_ALUNOS', 'TAXA_ERRO']].rename(
+            columns={'TP_DISCIPLINA': 'Disciplina', 'NU_DESCRITOR_HABILIDADE': 'Habilidade',
+                     'DESCRICAO_HABILIDADE': 'Descrição', 'N_ALUNOS': 'Alunos que Responderam',
+                     'TAXA_ERRO': 'Taxa de Erro'}
+        )
+
+    st.dataframe(df_exibir, use_container_width=True, hide_index=True)
+
+@telemetria.cronometrar()
+def criar_analise_itens(df_itens: pd.DataFrame, df_alternativas: pd.DataFrame, cluster_legend: Dict[str, str],
+                        clusters_selecionados: list, disciplina_selec: str):
+    """Exibe p-valor, ponto-bisserial e a frequência das alternativas por cluster de cada item."""
+    st.subheader(f"Dificuldade e Discriminação dos Itens ({disciplina_selec})")
+    st.markdown("**P-valor** é a proporção de acertos do item. **Ponto-bisserial** é a correlação entre acertar o item e a proficiência na disciplina; valores baixos ou negativos indicam item pouco discriminativo.")
+
+    df_itens_disc = df_itens[df_itens['TP_DISCIPLINA'] == disciplina_selec]
+    if df_itens_disc.empty:
+        st.warning("Nenhum item encontrado para a disciplina selecionada.")
+        return
+
+    fig_itens = px.scatter(
+        df_itens_disc,
+        x='P_VALOR',
+        y='PONTO_BISSERIAL',
+        hover_data=['ID_ITEM', 'NU_DESCRITOR_HABILIDADE', 'TX_GABARITO', 'N_RESPOSTAS'],
+        title="P-valor x Ponto-Bisserial por Item",
+        labels={'P_VALOR': 'P-valor (Proporção de Acertos)', 'PONTO_BISSERIAL': 'Ponto-Bisserial'},
+        color_discrete_sequence=[COR_PRIMARIA_AZUL]
+    )
+    fig_itens.update_xaxes(tickformat=".0%")
+    exibir_figura(fig_itens)
+
+    item_selec = st.selectbox(
+        "Selecione o Item para ver as Alternativas",
+        df_itens_disc.sort_values(by='PONTO_BISSERIAL')['ID_ITEM'].tolist(),
+        format_func=lambda i: f"{i} ({df_itens_disc.set_index('ID_ITEM').loc[i, 'NU_DESCRITOR_HABILIDADE']})",
+        key='filtro_item_alternativas'
+    )
+    gabarito = df_itens_disc.set_index('ID_ITEM').loc[item_selec, 'TX_GABARITO']
+
+    df_alt_item = df_alternativas[
+        (df_alternativas['ID_ITEM'] == item_selec) &
+        (df_alternativas['CLUSTER'].isin(clusters_selecionados))
+    ].copy()
+    df_alt_item['PERCENTUAL'] = df_alt_item['N_RESPOSTAS'] / df_alt_item.groupby('CLUSTER')['N_RESPOSTAS'].transform('sum')
+    df_alt_item['CLUSTER_DESCRICAO'] = df_alt_item['CLUSTER'].map(cluster_legend).fillna(
+        df_alt_item['CLUSTER'].apply(lambda c: f"Cluster {c} (Sem Legenda)")
+    )
+
+    fig_alternativas = px.bar(
+        df_alt_item.sort_values(by=['CLUSTER', 'ALTERNATIVA']),
+        x='CLUSTER_DESCRICAO',
+        y='PERCENTUAL',
+        color='ALTERNATIVA',
+        title=f"Alternativas Marcadas por Cluster - Item {item_selec} (Gabarito: {gabarito})",
+        labels={'PERCENTUAL': 'Percentual de Respostas', 'CLUSTER_DESCRICAO': 'Cluster de Risco', 'ALTERNATIVA': 'Alternativa'},
+        color_discrete_sequence=px.colors.qualitative.Plotly
+    )
+    fig_alternativas.update_yaxes(tickformat=".0%")
+    fig_alternativas.update_xaxes(tickangle=45)
+    exibir_figura(fig_alternativas)
+
+    with st.expander("⬇️ Visualizar Tabela de Itens"):
+        st.dataframe(
+            df_itens_disc.sort_values(by='PONTO_BISSERIAL'),
+            use_container_width=True,
+            hide_index=True
+        )
+
+@telemetria.cronometrar()
+def criar_comparacao_edicoes(serie: str, edicao_atual: int, edicoes: list, ufs: Tuple[int, ...] | None, disciplina_selec: str):
+    """Compara KPIs, distribuição de risco e taxa de erro por habilidade entre duas edições."""
+    outras_edicoes = [e for e in edicoes if e != edicao_atual]
+    if not outras_edicoes:
+        st.info(f"Apenas a edição {edicao_atual} está disponível para a série {serie}. Processe outra edição para comparar.")
+        return
+
+    edicao_base = st.selectbox("Comparar com a Edição", sorted(outras_edicoes, reverse=True), key='filtro_edicao_comparacao')
+
+    resumo_atual, df_diag_atual = resumir_edicao(serie, edicao_atual, ufs)
+    resumo_base, df_diag_base = resumir_edicao(serie, edicao_base, ufs)
+    if resumo_atual is None or resumo_base is None:
+        st.warning("Não foi possível carregar uma das edições selecionadas.")
+        return
+
+    st.subheader(f"Edição {edicao_atual} x {edicao_base}")
+    kpi_c1, kpi_c2, kpi_c3, kpi_c4 = st.columns(4)
+    kpi_c1.metric("Total de Alunos", f"{resumo_atual['TOTAL_ALUNOS']:,}".replace(",", "."),
+                  f"{resumo_atual['TOTAL_ALUNOS'] - resumo_base['TOTAL_ALUNOS']:+,}".replace(",", "."))
+    kpi_c2.metric("Alunos em Risco (Alto ou Mod.)", f"{resumo_atual['TAXA_RISCO']:.1%}",
+                  f"{(resumo_atual['TAXA_RISCO'] - resumo_base['TAXA_RISCO']) * 100:+.1f} p.p.", delta_color='inverse')
+    kpi_c3.metric("Proficiência Média (LP)", f"{resumo_atual['MEDIA_LP']:.2f}",
+                  f"{resumo_atual['MEDIA_LP'] - resumo_base['MEDIA_LP']:+.2f}")
+    kpi_c4.metric("Proficiência Média (MT)", f"{resumo_atual['MEDIA_MT']:.2f}",
+                  f"{resumo_atual['MEDIA_MT'] - resumo_base['MEDIA_MT']:+.2f}")
+
+    df_status = pd.DataFrame([
+        {'EDICAO': str(edicao), 'STATUS_RISCO_FINAL': status, 'PERCENTUAL': percentual}
+        for edicao, resumo in [(edicao_base, resumo_base), (edicao_atual, resumo_atual)]
+        for status, percentual in resumo['DISTRIBUICAO_STATUS'].items()
+    ])
+    fig_status = px.bar(
+        df_status,
+        x='STATUS_RISCO_FINAL',
+        y='PERCENTUAL',
+        color='EDICAO',
+        barmode='group',
+        title="Distribuição por Status de Risco",
+        labels={'PERCENTUAL': 'Percentual de Alunos', 'STATUS_RISCO_FINAL': 'Status de Risco', 'EDICAO': 'Edição'},
+        category_orders={'STATUS_RISCO_FINAL': STATUS_RISCO_FINAL},
+        color_discrete_sequence=[COR_MODERADO, COR_PRIMARIA_AZUL]
+    )
+    fig_status.update_yaxes(tickformat=".0%")
+    exibir_figura(fig_status)
+
+    if df_diag_atual is None or df_diag_base is None:
+        st.warning("Diagnóstico por habilidade indisponível para uma das edições.")
+        return
+
+    df_diag_comparacao = pd.concat([
+        df_diag_base.assign(EDICAO=str(edicao_base)),
+        df_diag_atual.assign(EDICAO=str(edicao_atual))
+    ])
+    df_diag_comparacao = df_diag_comparacao[df_diag_comparacao['TP_DISCIPLINA'] == disciplina_selec]
+    fig_diag = px.bar(
+        df_diag_comparacao.sort_values(by='NU_DESCRITOR_HABILIDADE'),
         x='NU_DESCRITOR_HABILIDADE',
         y='TAXA_ERRO',
-        hover_data={
-            'NU_DESCRITOR_HABILIDADE': False,   
-            'TAXA_ERRO': ':.2%'
-        },
-        title=f"Top 10 Dificuldades - {disciplina_selec}",
-        labels={'TAXA_ERRO': 'Taxa de Erro Média', 'NU_DESCRITOR_HABILIDADE': 'Habilidade (Código)'},
-        color_discrete_sequence=[COR_SECUNDARIA_VERDE],
+        color='EDICAO',
+        barmode='group',
+        title=f"Taxa de Erro por Habilidade - {disciplina_selec} (todos os clusters)",
+        labels={'TAXA_ERRO': 'Taxa de Erro', 'NU_DESCRITOR_HABILIDADE': 'Habilidade (Código)', 'EDICAO': 'Edição'},
+        color_discrete_sequence=[COR_MODERADO, COR_PRIMARIA_AZUL]
     )
-    
-    fig_top10.update_traces(
-        hovertemplate=
-            "<b>Código:</b> %{x}<br>" +
-            "<b>Habilidade:</b> %{customdata[0]}<br>" + 
-            "<b>Taxa de Erro:</b> %{y}<extra></extra>",
-        customdata=df_top10[['DESCRICAO_HABILIDADE']]
+    fig_diag.update_yaxes(tickformat=".0%")
+    exibir_figura(fig_diag)
+
+@telemetria.cronometrar()
+def criar_exportacao_alunos(serie: str, edicao: int, ufs: Tuple[int, ...] | None, status: list, clusters: list, n_alunos: int):
+    """Botão de download dos alunos filtrados, gerado em lotes só quando clicado."""
+    st.subheader("Exportar Lista de Alunos")
+    ecol1, ecol2 = st.columns([1, 3])
+    with ecol1:
+        formato = st.radio(
+            "Formato", carregamento.FORMATOS_EXPORTACAO_ALUNOS, horizontal=True, key='filtro_formato_exportacao_alunos',
+            format_func=lambda f: {'csv.gz': 'CSV compactado', 'parquet': 'Parquet'}[f]
+        )
+
+    def gerar_arquivo():
+        # Executado pelo Streamlit em outra thread ao clicar, sem bloquear o script do painel.
+        # A partição é lida e compactada em lotes num arquivo temporário, mas o Streamlit
+        # converte o retorno em bytes e guarda o download em memória (vale também para
+        # objetos de arquivo): o arquivo final, já compactado, ocupa a RAM do servidor
+        # até o download expirar.
+        with tempfile.TemporaryFile() as arquivo:
+            carregamento.exportar_alunos(
+                arquivo, formato, serie, edicao,
+                ufs=list(ufs) if ufs is not None else None, status=list(status), clusters=list(clusters)
+            )
+            arquivo.seek(0)
+            return arquivo.read()
+
+    with ecol2:
+        st.download_button(
+            "⬇️ Baixar Alunos Filtrados",
+            data=gerar_arquivo,
+            file_name=f"alunos_{serie}_{edicao}.{formato}",
+            mime='application/gzip' if formato == 'csv.gz' else 'application/vnd.apache.parquet',
+            on_click='ignore',
+            key='botao_exportar_alunos'
+        )
+        total = f"{n_alunos:,}".replace(",", ".")
+        st.caption(
+            f"{total} alunos com os filtros da barra lateral (ID, escola, UF, cluster, status, proficiências e score de anomalia). "
+            "O arquivo é gerado ao clicar e, já compactado, fica em memória no servidor até o download; "
+            "para séries inteiras, filtre por UF para reduzir o tamanho."
+        )
+
+@telemetria.cronometrar()
+def criar_mapa_uf(df_ufs: pd.DataFrame):
+    """Exibe o mapa em grade das UFs para o indicador selecionado."""
+    indicadores = {
+        'Alunos em Risco (Alto ou Mod.)': ('TAXA_RISCO_STATUS', '.1%'),
+        'Risco de Aprendizagem (Limiares)': ('TAXA_RISCO', '.1%'),
+        'Proficiência Média (LP)': ('MEDIA_LP', '.1f'),
+        'Proficiência Média (MT)': ('MEDIA_MT', '.1f'),
+    }
+    indicadores = {nome: v for nome, v in indicadores.items() if v[0] in df_ufs.columns}
+    indicador = st.selectbox("Indicador do Mapa", list(indicadores), key='filtro_indicador_mapa')
+    coluna, formato = indicadores[indicador]
+
+    exibir_figura(graficos.figura_mapa_uf(df_ufs, coluna, indicador, formato))
+
+@telemetria.cronometrar()
+def criar_ranking_escolas(df_escolas: pd.DataFrame, ufs: Tuple[int, ...] | None):
+    """Ranking de escolas com busca, ordenação e paginação feitas no servidor."""
+    st.subheader("Ranking de Escolas")
+    if ufs is not None:
+        st.markdown(f"**UF:** {MAPA_UF.get(ufs[0], ufs[0])} (filtro da barra lateral)")
+
+    colunas_ordenacao = {
+        'Alunos em Risco (Alto ou Mod.)': 'TAXA_RISCO_STATUS',
+        'Risco de Aprendizagem (Limiares)': 'TAXA_RISCO',
+        'Total de Alunos': 'TOTAL_ALUNOS',
+        'Proficiência Média (LP)': 'MEDIA_LP',
+        'Proficiência Média (MT)': 'MEDIA_MT',
+    }
+    colunas_ordenacao = {nome: c for nome, c in colunas_ordenacao.items() if c in df_escolas.columns}
+
+    rcol1, rcol2, rcol3, rcol4 = st.columns([2, 2, 1, 1])
+    with rcol1:
+        busca = st.text_input("Buscar ID da Escola", key='filtro_busca_escola')
+    with rcol2:
+        ordenar_por = st.selectbox("Ordenar por", list(colunas_ordenacao), key='filtro_ordenacao_escolas')
+    with rcol3:
+        ascendente = st.toggle("Crescente", key='filtro_ordem_crescente_escolas')
+    with rcol4:
+        min_alunos = st.number_input("Mín. de Alunos", min_value=1, value=10, step=5, key='filtro_min_alunos_escolas')
+
+    pcol1, pcol2 = st.columns([1, 3])
+    with pcol1:
+        tamanho_pagina = st.selectbox("Escolas por Página", [25, 50, 100], key='filtro_tamanho_pagina_escolas')
+    with pcol2:
+        pagina = st.number_input("Página", min_value=1, value=1, step=1, key='filtro_pagina_escolas')
+
+    def consultar(pagina):
+        return carregamento.paginar_escolas(
+            df_escolas, pagina - 1, tamanho_pagina, colunas_ordenacao[ordenar_por], ascendente,
+            busca=busca, ufs=list(ufs) if ufs is not None else None, min_alunos=min_alunos
+        )
+
+    df_pagina, total = consultar(pagina)
+    if not total:
+        st.warning("Nenhuma escola encontrada com os filtros selecionados.")
+        return
+    n_paginas = -(-total // tamanho_pagina)
+    if pagina > n_paginas:
+        # Uma busca ou filtro mais restrito pode deixar a página pedida fora do ranking.
+        pagina = n_paginas
+        df_pagina, total = consultar(pagina)
+
+    st.caption(f"Página {pagina} de {n_paginas} ({total:,} escolas)".replace(",", "."))
+    colunas_exibir = {
+        'ID_ESCOLA': 'Escola', 'UF_DESCRICAO': 'UF', 'TOTAL_ALUNOS': 'Alunos',
+        'TAXA_RISCO_STATUS': 'Alunos em Risco (Alto ou Mod.)', 'TAXA_RISCO': 'Risco de Aprendizagem',
+        'MEDIA_LP': 'Proficiência LP', 'MEDIA_MT': 'Proficiência MT',
+    }
+    df_exibir = df_pagina[[c for c in colunas_exibir if c in df_pagina.columns]].rename(columns=colunas_exibir)
+    st.dataframe(
+        df_exibir,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'Escola': st.column_config.NumberColumn(format="%d"),
+            'Alunos em Risco (Alto ou Mod.)': st.column_config.ProgressColumn(format="percent", min_value=0, max_value=1),
+            'Risco de Aprendizagem': st.column_config.ProgressColumn(format="percent", min_value=0, max_value=1),
+            'Proficiência LP': st.column_config.NumberColumn(format="%.1f"),
+            'Proficiência MT': st.column_config.NumberColumn(format="%.1f"),
+        }
     )
-    
-    fig_top10.update_layout(
-        xaxis={'categoryorder':'total descending'} 
+
+@telemetria.cronometrar()
+def criar_simulador_risco(df_hist: pd.DataFrame, serie: str, ufs: Tuple[int, ...] | None):
+    """Simulador de limiares: recalcula as contagens de risco a partir dos histogramas."""
+    config_padrao = CONFIG_SERIES[serie]
+    clusters = sorted(df_hist['CLUSTER'].astype(str).unique())
+
+    scol1, scol2, scol3 = st.columns(3)
+    with scol1:
+        quantil_media = st.slider(
+            "Quantil da Média (Risco de Aprendizagem)", 0.05, 0.60, QUANTIL_RISCO, 0.01,
+            key='filtro_sim_quantil_media', help="Alunos com média LP/MT abaixo deste quantil da série."
+        )
+    with scol2:
+        quantil_discrepancia = st.slider(
+            "Quantil da Discrepância LP x MT", 0.40, 0.95, QUANTIL_DISCREPANCIA, 0.01,
+            key='filtro_sim_quantil_discrepancia', help="Alunos com |LP - MT| acima deste quantil da série."
+        )
+    with scol3:
+        limiar_score = st.slider(
+            "Limiar do Score de Anomalia", -0.30, 0.30, 0.0, simulacao.LARGURA_SCORE,
+            key='filtro_sim_limiar_score', help="Score abaixo do limiar é anomalia; 0 reproduz o modelo treinado."
+        )
+
+    ccol1, ccol2 = st.columns(2)
+    with ccol1:
+        clusters_alto = st.multiselect(
+            "Clusters de Alto Risco", clusters,
+            default=[c for c in config_padrao['ALTO_RISCO'] if c in clusters], key='filtro_sim_clusters_alto'
+        )
+    with ccol2:
+        clusters_moderado = st.multiselect(
+            "Clusters de Risco Moderado", clusters,
+            default=[c for c in config_padrao['MODERADO'] if c in clusters], key='filtro_sim_clusters_moderado'
+        )
+    # Um cluster marcado nas duas listas fica no Alto Risco; os demais formam a base normal.
+    clusters_moderado = [c for c in clusters_moderado if c not in clusters_alto]
+    config_simulada = {
+        'ALTO_RISCO': clusters_alto,
+        'MODERADO': clusters_moderado,
+        'NORMAL_BASE': [c for c in clusters if c not in clusters_alto and c not in clusters_moderado],
+    }
+
+    inicio = time.perf_counter()
+    # Limiares calculados sobre a série inteira (como em main.py); as contagens, sobre as UFs filtradas.
+    faixas_atuais = (
+        simulacao.faixa_por_quantil(df_hist, 'FAIXA_MEDIA', QUANTIL_RISCO),
+        simulacao.faixa_por_quantil(df_hist, 'FAIXA_DISCREPANCIA', QUANTIL_DISCREPANCIA),
+        simulacao.faixa_score(0.0),
+    )
+    faixas_simuladas = (
+        simulacao.faixa_por_quantil(df_hist, 'FAIXA_MEDIA', quantil_media),
+        simulacao.faixa_por_quantil(df_hist, 'FAIXA_DISCREPANCIA', quantil_discrepancia),
+        simulacao.faixa_score(limiar_score),
+    )
+    df_hist_ufs = df_hist[df_hist['ID_UF'].isin(ufs)] if ufs is not None else df_hist
+    df_atual = simulacao.simular_risco(df_hist_ufs, *faixas_atuais, config_padrao)
+    df_simulado = simulacao.simular_risco(df_hist_ufs, *faixas_simuladas, config_simulada)
+    resumo_atual = simulacao.resumir_simulacao(df_atual)
+    resumo_simulado = simulacao.resumir_simulacao(df_simulado)
+    milissegundos = (time.perf_counter() - inicio) * 1000
+
+    st.caption(
+        f"Média < {simulacao.limiar_da_faixa(faixas_simuladas[0], 'FAIXA_MEDIA'):.1f} ou "
+        f"discrepância ≥ {simulacao.limiar_da_faixa(faixas_simuladas[1], 'FAIXA_DISCREPANCIA'):.1f} | "
+        f"anomalia: score < {limiar_score:.2f} "
+        f"({simulacao.fracao_abaixo(df_hist, 'FAIXA_SCORE', faixas_simuladas[2]):.1%} dos alunos da série). "
+        f"Limiares arredondados para a grade dos histogramas; recalculado em {milissegundos:.1f} ms "
+        f"sobre {len(df_hist_ufs):,} células.".replace(",", ".")
     )
-    
-    fig_top10.update_yaxes(tickformat=".0%")
-    st.plotly_chart(fig_top10, use_container_width=True)
 
-#  Interface Principal (Execução) 
+    def em_risco(resumo):
+        return int(resumo['Alto Risco'] + resumo['Risco Moderado'])
+
+    metricas = [
+        ("Risco de Aprendizagem (Limiares)", int(resumo_simulado['RISCO_APRENDIZAGEM']), int(resumo_atual['RISCO_APRENDIZAGEM'])),
+        ("Alunos em Risco (Alto ou Mod.)", em_risco(resumo_simulado), em_risco(resumo_atual)),
+        ("Alto Risco", int(resumo_simulado['Alto Risco']), int(resumo_atual['Alto Risco'])),
+        ("Anomalias (Isolation Forest)", int(resumo_simulado['ANOMALIA']), int(resumo_atual['ANOMALIA'])),
+    ]
+    for coluna, (rotulo, simulado, atual) in zip(st.columns(len(metricas)), metricas):
+        coluna.metric(
+            rotulo, f"{simulado:,}".replace(",", "."),
+            delta=f"{simulado - atual:+,}".replace(",", ".") if simulado != atual else None,
+            delta_color='inverse'
+        )
 
-st.title("📊 Painel de Diagnóstico de Habilidades (SAEB-2023)")
-st.markdown("Use este painel para analisar o perfil dos alunos e suas dificuldades por habilidade.")
+    exibir_figura(graficos.figura_simulacao_status(resumo_atual[STATUS_RISCO_FINAL], resumo_simulado[STATUS_RISCO_FINAL]))
+
+    detalhar_por = st.radio("Detalhar por", ['UF', 'Cluster'], horizontal=True, key='filtro_sim_detalhamento')
+    coluna_grupo = 'ID_UF' if detalhar_por == 'UF' else 'CLUSTER'
+    df_grupos = simulacao.resumir_simulacao(df_atual, coluna_grupo).merge(
+        simulacao.resumir_simulacao(df_simulado, coluna_grupo), on=[coluna_grupo, 'N_ALUNOS'], suffixes=('_ATUAL', '_SIMULADO')
+    )
+    for sufixo in ('_ATUAL', '_SIMULADO'):
+        df_grupos['EM_RISCO' + sufixo] = df_grupos['Alto Risco' + sufixo] + df_grupos['Risco Moderado' + sufixo]
+    if coluna_grupo == 'ID_UF':
+        df_grupos['ID_UF'] = df_grupos['ID_UF'].map(MAPA_UF).fillna('UF Desconhecida')
+
+    colunas_exibir = {
+        coluna_grupo: detalhar_por, 'N_ALUNOS': 'Alunos',
+        'RISCO_APRENDIZAGEM_ATUAL': 'Risco Aprendizagem (Atual)', 'RISCO_APRENDIZAGEM_SIMULADO': 'Risco Aprendizagem (Simulado)',
+        'EM_RISCO_ATUAL': 'Alto ou Mod. (Atual)', 'EM_RISCO_SIMULADO': 'Alto ou Mod. (Simulado)',
+    }
+    st.dataframe(
+        df_grupos[list(colunas_exibir)].rename(columns=colunas_exibir).astype({c: 'int64' for c in list(colunas_exibir.values())[1:]}),
+        use_container_width=True,
+        hide_index=True
+    )
+
+@st.cache_resource
+def obter_historico_telemetria() -> telemetria.Historico:
+    """Histórico de telemetria compartilhado por todas as sessões do processo."""
+    return telemetria.Historico()
+
+def exibir_painel_telemetria(coletor: telemetria.Coletor, historico: telemetria.Historico):
+    """Painel de desenvolvedor com os tempos do rerun atual e o histórico do processo."""
+    with st.expander("🛠️ Telemetria de Desempenho", expanded=True):
+        df_rerun = coletor.para_dataframe().sort_values(by='SEGUNDOS', ascending=False)
+        rss_mb = telemetria.memoria_rss_mb()
+
+        tcol1, tcol2, tcol3, tcol4 = st.columns(4)
+        tcol1.metric("Tempo do Rerun", f"{coletor.segundos_total * 1000:,.0f} ms".replace(",", "."))
+        tcol2.metric("Figuras (JSON)", f"{df_rerun['FIGURAS'].sum()} / {df_rerun['BYTES_FIGURAS'].sum() / 1024:,.0f} KB".replace(",", "."))
+        tcol3.metric("Memória do Processo (RSS)", f"{rss_mb:,.0f} MB".replace(",", ".") if rss_mb is not None else "-")
+        tcol4.metric("Reruns Registrados", historico.n_reruns)
+
+        st.markdown("**Etapas do rerun atual** (o tempo das funções inclui as etapas internas e a serialização das figuras)")
+        st.dataframe(df_rerun, use_container_width=True, hide_index=True)
+
+        df_historico = historico.para_dataframe()
+        st.markdown("**Taxa de acerto dos caches** (todas as sessões)")
+        st.dataframe(telemetria.taxas_acerto_cache(df_historico, ETAPAS_CACHEADAS), use_container_width=True, hide_index=True)
+
+        df_reruns = df_historico[df_historico['ETAPA'] == telemetria.ETAPA_RERUN]
+        if len(df_reruns) > 1:
+            st.markdown("**Tempo e memória por rerun**")
+            st.line_chart(df_reruns.set_index('RERUN')[['SEGUNDOS', 'RSS_MB']])
+
+        st.download_button(
+            "⬇️ Exportar Histórico (CSV)",
+            data=lambda: historico.para_dataframe().to_csv(sep=';', index=False).encode('utf-8'),
+            file_name='telemetria_painel.csv',
+            mime='text/csv',
+            key='download_telemetria'
+        )
+
+#  Interface Principal (Execução) 
 
 # 1. Filtro Série
 st.sidebar.title("Filtros Globais")
@@ -455,7 +685,18 @@ serie_selecionada = st.sidebar.selectbox(
     key='filtro_serie'
 )
 
-dados = carregar_dados(serie_selecionada)
+# 1.1 Filtro Edição
+edicoes_disponiveis = carregamento.listar_edicoes_disponiveis(serie_selecionada) or [EDICAO_ARQUIVOS_LEGADOS]
+edicao_selecionada = st.sidebar.selectbox(
+    "Edição do SAEB",
+    sorted(edicoes_disponiveis, reverse=True),
+    key='filtro_edicao'
+)
+
+st.title(f"📊 Painel de Diagnóstico de Habilidades (SAEB-{edicao_selecionada})")
+st.markdown("Use este painel para analisar o perfil dos alunos e suas dificuldades por habilidade.")
+
+dados = carregar_dados(serie_selecionada, edicao_selecionada)
 
 if dados[0] is None:
     st.warning("Não foi possível carregar os dados. Verifique os arquivos e caminhos e reinicie o painel.")
@@ -482,6 +723,8 @@ else:
         key='filtro_uf_global'
     )
     uf_filter_condition = (df_alunos['UF_DESCRICAO'] == uf_selecionada) if uf_selecionada != 'Todos os Estados' else True
+    MAPA_UF_INVERSO = {descricao: id_uf for id_uf, descricao in MAPA_UF.items()}
+    ufs_comparacao = (MAPA_UF_INVERSO[uf_selecionada],) if uf_selecionada in MAPA_UF_INVERSO else None
     
     # 3. Filtro de Status de Risco 
     st.sidebar.multiselect(
@@ -505,18 +748,20 @@ else:
 
 
     #  Abas do Painel 
-    tab_visao_geral, tab_diagnostico = st.tabs(
-        ["📈 Visão Geral (O Quem)", "🔬 Diagnóstico (O Porquê)"]
+    tab_visao_geral, tab_diagnostico, tab_itens, tab_perfis, tab_edicoes, tab_mapa, tab_simulador = st.tabs(
+        ["📈 Visão Geral (O Quem)", "🔬 Diagnóstico (O Porquê)", "🧪 Itens", "🎯 Aluno / Escola",
+         "📅 Comparação entre Edições", "🗺️ Mapa e Ranking de Escolas", "🎚️ Simulador de Limiares"]
     )
 
     # ======================================================================
     # Aplicar Filtros Globais
     # ======================================================================
-    df_alunos_filtrado = df_alunos[
-        (df_alunos['STATUS_RISCO_FINAL'].isin(status_selecionados)) &
-        (df_alunos['CLUSTER'].isin(clusters_selecionados_global)) & 
-        uf_filter_condition
-    ].copy() # Adicionado .copy() para evitar SettingWithCopyWarning no Scatter
+    with telemetria.medir('filtro_global'):
+        df_alunos_filtrado = df_alunos[
+            (df_alunos['STATUS_RISCO_FINAL'].isin(status_selecionados)) &
+            (df_alunos['CLUSTER'].isin(clusters_selecionados_global)) & 
+            uf_filter_condition
+        ].copy() # Adicionado .copy() para evitar SettingWithCopyWarning no Scatter
 
     # ======================================================================
     # ABA 1: VISÃO GERAL (O QUEM) 
@@ -552,6 +797,14 @@ else:
             # 5. Gráfico de Dispersão (LP vs MT)
             criar_grafico_dispersao(df_alunos_filtrado, CLUSTER_LEGEND)
 
+            st.divider()
+
+            # 6. Exportação da Lista de Alunos
+            criar_exportacao_alunos(
+                serie_selecionada, edicao_selecionada, ufs_comparacao,
+                status_selecionados, clusters_selecionados_global, len(df_alunos_filtrado)
+            )
+
 
     # ======================================================================
     # ABA 2: DIAGNÓSTICO (O PORQUÊ)
@@ -572,16 +825,17 @@ else:
             clusters_para_diag = clusters_selecionados_global
 
         
-        df_diag_filtrado = df_diag_completo[
-            (df_diag_completo['TP_DISCIPLINA'] == disciplina_selec) &
-            (df_diag_completo['CLUSTER'].isin(clusters_para_diag))
-        ].copy()
-        
-        habilidades_ocultar_disc = HABILIDADES_OCULTAR.get(serie_selecionada, {}).get(disciplina_selec, [])
-        if habilidades_ocultar_disc:
-            df_diag_filtrado = df_diag_filtrado[
-                ~df_diag_filtrado['NU_DESCRITOR_HABILIDADE'].isin(habilidades_ocultar_disc)
-            ]
+        with telemetria.medir('filtro_diagnostico'):
+            df_diag_filtrado = df_diag_completo[
+                (df_diag_completo['TP_DISCIPLINA'] == disciplina_selec) &
+                (df_diag_completo['CLUSTER'].isin(clusters_para_diag))
+            ].copy()
+            
+            habilidades_ocultar_disc = HABILIDADES_OCULTAR.get(serie_selecionada, {}).get(disciplina_selec, [])
+            if habilidades_ocultar_disc:
+                df_diag_filtrado = df_diag_filtrado[
+                    ~df_diag_filtrado['NU_DESCRITOR_HABILIDADE'].isin(habilidades_ocultar_disc)
+                ]
 
         if df_diag_filtrado.empty:
             st.warning("Nenhum dado de diagnóstico encontrado para os filtros selecionados. Ajuste a seleção de Clusters na barra lateral.")
@@ -607,22 +861,93 @@ else:
             # 4. Tabela de Dados Completos da Taxa de Erro (Recolhida)
             st.subheader("Tabela Completa de Diagnóstico por Habilidade")
             
-            df_tabela_completa = df_diag_filtrado.groupby(['NU_DESCRITOR_HABILIDADE', 'DESCRICAO_HABILIDADE'])['TAXA_ERRO'].mean().reset_index()
-            
-            df_tabela_completa.rename(
-                columns={'NU_DESCRITOR_HABILIDADE': 'Habilidade', 'DESCRICAO_HABILIDADE': 'Descrição', 'TAXA_ERRO': 'Taxa de Erro Média'},
-                inplace=True
-            )
-            
-            df_tabela_completa = df_tabela_completa.sort_values(
-                by=['Habilidade', 'Taxa de Erro Média'], 
-                ascending=[True, False]
-            )
-            
-            df_tabela_completa['Taxa de Erro Média'] = df_tabela_completa['Taxa de Erro Média'].apply(lambda x: f"{x:.2%}")
+            df_tabela_completa = graficos.tabela_habilidades(df_diag_filtrado)
             
             with st.expander("⬇️ Visualizar Tabela Completa de Habilidades (Todos os Dados)"):
                 st.dataframe(
                     df_tabela_completa, 
                     use_container_width=True
-                )
\ No newline at end of file
+                )
+
+    # ======================================================================
+    # ABA 3: ESTATÍSTICAS DOS ITENS
+    # ======================================================================
+    with tab_itens:
+        st.header("Análise dos Itens da Prova")
+
+        df_itens, df_alternativas = carregar_estatisticas_itens(serie_selecionada, edicao_selecionada)
+        if df_itens is None:
+            st.warning("Estatísticas dos itens não encontradas. Execute o diagnóstico de habilidades para gerá-las.")
+        else:
+            disciplina_itens = st.selectbox(
+                "Selecione a Disciplina",
+                ['LP', 'MT'],
+                key='filtro_disciplina_itens'
+            )
+            criar_analise_itens(df_itens, df_alternativas, CLUSTER_LEGEND, clusters_selecionados_global, disciplina_itens)
+
+    # ======================================================================
+    # ABA 4: CONSULTA POR ALUNO / ESCOLA
+    # ======================================================================
+    with tab_perfis:
+        st.header("Perfil Individual de Habilidades")
+
+        perfis = carregar_perfis(serie_selecionada, edicao_selecionada)
+        if perfis is None:
+            st.warning(f"Perfis individuais da edição {edicao_selecionada} não encontrados. "
+                       "Execute o diagnóstico de habilidades desta edição para gerá-los.")
+        else:
+            criar_drilldown_perfis(perfis, df_diag_completo)
+
+    # ======================================================================
+    # ABA 5: COMPARAÇÃO ENTRE EDIÇÕES
+    # ======================================================================
+    with tab_edicoes:
+        st.header("Comparação entre Edições do SAEB")
+
+        disciplina_comparacao = st.selectbox(
+            "Selecione a Disciplina",
+            ['LP', 'MT'],
+            key='filtro_disciplina_comparacao'
+        )
+        criar_comparacao_edicoes(serie_selecionada, edicao_selecionada, edicoes_disponiveis, ufs_comparacao, disciplina_comparacao)
+
+    # ======================================================================
+    # ABA 6: MAPA POR UF E RANKING DE ESCOLAS
+    # ======================================================================
+    with tab_mapa:
+        st.header("Risco por UF e Ranking de Escolas")
+
+        df_ufs, df_escolas = carregar_agregados(serie_selecionada, edicao_selecionada)
+        if df_ufs is None:
+            st.warning("Tabelas agregadas por UF e por escola não encontradas. Execute main.py para gerá-las.")
+        else:
+            st.caption("Calculado sobre todos os alunos da série (tabelas pré-agregadas pelo pipeline); os filtros de status e cluster não se aplicam a esta aba.")
+            criar_mapa_uf(df_ufs)
+            st.divider()
+            criar_ranking_escolas(df_escolas, ufs_comparacao)
+
+    # ======================================================================
+    # ABA 7: SIMULADOR DE LIMIARES DE RISCO
+    # ======================================================================
+    with tab_simulador:
+        st.header("Simulador de Limiares de Risco")
+
+        df_hist = carregar_histogramas_risco(serie_selecionada, edicao_selecionada)
+        if df_hist is None:
+            st.warning("Histogramas de risco não encontrados. Execute analise.py para gerá-los.")
+        else:
+            st.caption("Compara as regras atuais com limiares alternativos sem reprocessar os alunos; o filtro de UF da barra lateral se aplica, os de status e cluster não.")
+            criar_simulador_risco(df_hist, serie_selecionada, ufs_comparacao)
+
+# ======================================================================
+# TELEMETRIA DE DESEMPENHO (DESENVOLVEDOR)
+# ======================================================================
+st.sidebar.divider()
+st.sidebar.toggle("🛠️ Telemetria de Desempenho", value=TELEMETRIA_PADRAO, key='telemetria_ativa')
+
+coletor_telemetria = telemetria.finalizar()
+if coletor_telemetria is not None:
+    historico_telemetria = obter_historico_telemetria()
+    historico_telemetria.adicionar(coletor_telemetria)
+    exibir_painel_telemetria(coletor_telemetria, historico_telemetria)
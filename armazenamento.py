@@ -0,0 +1,136 @@
+import os
+import re
+import shutil
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    PYARROW_DISPONIVEL = True
+except ImportError:
+    PYARROW_DISPONIVEL = False
+
+
+# Edição do SAEB processada pelo pipeline. Para uma nova edição, aponte os caminhos de
+# DADOS para os microdados do ano e altere esta constante: as partições das edições
+# anteriores não são reescritas.
+EDICAO_ATUAL = 2023
+
+# Layout: data/particoes/<tabela>/edicao=<ano>/serie=<série>/[uf=<ID_UF>/]parte-0.parquet
+DIRETORIO_PARTICOES = 'data/particoes'
+COLUNA_PARTICAO_UF = 'uf'
+# Os perfis individuais (arrays .npy de perfis_habilidades) seguem o mesmo layout.
+TABELA_PERFIS = 'perfis_habilidades'
+
+PADRAO_EDICAO = re.compile(r'^edicao=(\d+)$')
+
+
+def _diretorio_particao(tabela, edicao, serie):
+    return os.path.join(DIRETORIO_PARTICOES, tabela, f'edicao={edicao}', f'serie={serie}')
+
+
+def gravar_particoes(df, tabela, serie, edicao=EDICAO_ATUAL):
+    """
+    Grava `df` como partições Parquet de (edição, série) e, se houver ID_UF, por UF.
+
+    Apenas a partição (edição, série) gravada é substituída; as demais edições e
+    séries continuam intactas, então uma nova edição é acrescentada sem reescrita.
+    """
+    if not PYARROW_DISPONIVEL:
+        print(f"AVISO: pyarrow não instalado. Partições de '{tabela}' não foram gravadas.")
+        return None
+
+    destino = _diretorio_particao(tabela, edicao, serie)
+    temporario = f'{destino}.tmp'
+    shutil.rmtree(temporario, ignore_errors=True)
+
+    particionamento = None
+    if 'ID_UF' in df.columns:
+        df = df.assign(**{COLUNA_PARTICAO_UF: pd.to_numeric(df['ID_UF'], errors='coerce').fillna(-1).astype('int32')})
+        particionamento = ds.partitioning(pa.schema([(COLUNA_PARTICAO_UF, pa.int32())]), flavor='hive')
+
+    ds.write_dataset(
+        pa.Table.from_pandas(df, preserve_index=False),
+        temporario,
+        format='parquet',
+        partitioning=particionamento,
+        basename_template='parte-{i}.parquet'
+    )
+
+    # Troca a partição antiga pela nova só depois da gravação completa.
+    shutil.rmtree(destino, ignore_errors=True)
+    os.replace(temporario, destino)
+    print(f"Partição '{tabela}' da edição {edicao} ({serie}) gravada em '{destino}'.")
+    return destino
+
+
+def diretorio_perfis(serie, edicao=EDICAO_ATUAL):
+    """Diretório do armazenamento de perfis individuais da (edição, série)."""
+    return _diretorio_particao(TABELA_PERFIS, edicao, serie)
+
+
+def listar_edicoes(tabela, serie=None):
+    """Edições disponíveis para a tabela (e série, se informada), em ordem crescente."""
+    diretorio_tabela = os.path.join(DIRETORIO_PARTICOES, tabela)
+    if not os.path.isdir(diretorio_tabela):
+        return []
+
+    edicoes = []
+    for nome in os.listdir(diretorio_tabela):
+        correspondencia = PADRAO_EDICAO.match(nome)
+        if correspondencia and (serie is None or os.path.isdir(_diretorio_particao(tabela, correspondencia.group(1), serie))):
+            edicoes.append(int(correspondencia.group(1)))
+    return sorted(edicoes)
+
+
+def existe_particao(tabela, serie, edicao):
+    return PYARROW_DISPONIVEL and os.path.isdir(_diretorio_particao(tabela, edicao, serie))
+
+
+def _abrir_particao(tabela, serie, edicao, ufs=None):
+    """Abre a partição (edição, série) como dataset e monta o filtro de UFs."""
+    diretorio = _diretorio_particao(tabela, edicao, serie)
+    possui_uf = any(nome.startswith(f'{COLUNA_PARTICAO_UF}=') for nome in os.listdir(diretorio))
+    particionamento = (
+        ds.partitioning(pa.schema([(COLUNA_PARTICAO_UF, pa.int32())]), flavor='hive') if possui_uf else None
+    )
+    dataset = ds.dataset(diretorio, format='parquet', partitioning=particionamento)
+
+    filtro = None
+    if ufs is not None and possui_uf:
+        filtro = ds.field(COLUNA_PARTICAO_UF).isin([int(uf) for uf in ufs])
+    return dataset, filtro
+
+
+def carregar_particoes(tabela, serie, edicao, colunas=None, ufs=None):
+    """
+    Carrega apenas a partição (edição, série) pedida, opcionalmente só algumas UFs e
+    colunas. Retorna None se a partição não existir.
+    """
+    if not existe_particao(tabela, serie, edicao):
+        return None
+
+    dataset, filtro = _abrir_particao(tabela, serie, edicao, ufs)
+    if colunas is not None:
+        colunas = [c for c in colunas if c in dataset.schema.names]
+
+    df = dataset.to_table(columns=colunas, filter=filtro).to_pandas()
+    return df.drop(columns=[COLUNA_PARTICAO_UF], errors='ignore')
+
+
+def iterar_particoes(tabela, serie, edicao, tamanho_lote, colunas=None, ufs=None):
+    """
+    Como carregar_particoes, mas gera DataFrames de até `tamanho_lote` linhas lidos em
+    fluxo (record batches do scanner), sem materializar a partição inteira.
+    Retorna None se a partição não existir.
+    """
+    if not existe_particao(tabela, serie, edicao):
+        return None
+
+    dataset, filtro = _abrir_particao(tabela, serie, edicao, ufs)
+    if colunas is not None:
+        colunas = [c for c in colunas if c in dataset.schema.names]
+
+    lotes = dataset.to_batches(columns=colunas, filter=filtro, batch_size=tamanho_lote)
+    return (lote.to_pandas().drop(columns=[COLUNA_PARTICAO_UF], errors='ignore') for lote in lotes)
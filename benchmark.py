@@ -0,0 +1,169 @@
+import argparse
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import leitura
+
+
+def _medir(funcao, repeticoes):
+    """Executa `funcao` `repeticoes` vezes e retorna (melhor tempo, resultado)."""
+    melhor = float('inf')
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def benchmark_leitura(caminho, colunas=None, chunksize=None, repeticoes=3, encoding='latin-1'):
+    """Compara linhas/s dos motores de leitura sobre o mesmo arquivo."""
+    motores = ['c'] + (['pyarrow'] if leitura.PYARROW_DISPONIVEL else [])
+    resultados = []
+
+    for motor in motores:
+        if chunksize:
+            def ler():
+                return sum(len(bloco) for bloco in leitura.ler_csv_em_blocos(
+                    caminho, chunksize, colunas=colunas, encoding=encoding, motor=motor))
+        else:
+            def ler():
+                return len(leitura.ler_csv(caminho, colunas=colunas, encoding=encoding, motor=motor))
+
+        segundos, linhas = _medir(ler, repeticoes)
+        resultados.append((motor, linhas, segundos, linhas / segundos))
+
+    print(f"\n--- Leitura de {caminho} ({'em blocos de ' + str(chunksize) if chunksize else 'completa'}) ---")
+    for motor, linhas, segundos, taxa in resultados:
+        print(f"{motor:>8}: {linhas} linhas em {segundos:.2f}s ({taxa:,.0f} linhas/s)")
+    return resultados
+
+
+def benchmark_relatorios(serie, edicao=None, n_relatorios=200, processos=None, plotlyjs='embutido', nivel='escola'):
+    """Mede relatórios/min da exportação em lote para diferentes números de processos."""
+    import armazenamento
+    import exportar_relatorios
+
+    edicao = edicao or armazenamento.EDICAO_ATUAL
+    resultados = []
+    for n_processos in processos or [1, os.cpu_count()]:
+        with tempfile.TemporaryDirectory() as diretorio:
+            resumo = exportar_relatorios.exportar_relatorios(
+                serie, edicao, nivel, diretorio_saida=diretorio, processos=n_processos,
+                plotlyjs=plotlyjs, refazer=True, limite=n_relatorios
+            )
+        if resumo is None:
+            return None
+        resultados.append((n_processos, resumo['GERADOS'], resumo['SEGUNDOS'], resumo['GERADOS'] / resumo['SEGUNDOS'] * 60))
+
+    print(f"\n--- Exportação de relatórios por {nivel} ({serie}, {edicao}, plotly.js {plotlyjs}) ---")
+    for n_processos, gerados, segundos, por_minuto in resultados:
+        print(f"{n_processos:>3} processos: {gerados} relatórios em {segundos:.2f}s ({por_minuto:,.0f} relatórios/min)")
+    return resultados
+
+
+def _requisitar(url, etag=None):
+    """Faz um GET e retorna (latência em segundos, status HTTP, ETag)."""
+    requisicao = urllib.request.Request(url, headers={'If-None-Match': etag} if etag else {})
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(requisicao) as resposta:
+            resposta.read()
+            status, etag_resposta = resposta.status, resposta.headers.get('ETag')
+    except urllib.error.HTTPError as e:
+        status, etag_resposta = e.code, e.headers.get('ETag')
+    return time.perf_counter() - inicio, status, etag_resposta
+
+
+def benchmark_api(serie, url_base=None, n_requisicoes=2000, concorrencia=16, revalidar=False):
+    """
+    Teste de carga da API: `n_requisicoes` GETs com `concorrencia` clientes simultâneos,
+    alternando rotas e filtros. Mede as latências p50/p99 da primeira requisição de cada
+    URL (cache vazio) e das seguintes; com `revalidar`, os clientes enviam If-None-Match.
+    """
+    servidor = None
+    if url_base is None:
+        import api
+        servidor = api.criar_servidor(porta=0)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        url_base = f'http://{servidor.server_address[0]}:{servidor.server_address[1]}'
+
+    consultas = [
+        f'kpis?serie={serie}', f'distribuicao-risco?serie={serie}', f'clusters?serie={serie}',
+        f'diagnostico?serie={serie}&disciplina=LP', f'diagnostico?serie={serie}&disciplina=MT',
+        f'kpis?serie={serie}&status=Alto%20Risco,Risco%20Moderado', f'clusters?serie={serie}&uf=35',
+    ] + [f'kpis?serie={serie}&uf={uf}' for uf in (11, 23, 29, 31, 33, 35, 41, 43, 52, 53)]
+    urls = [f'{url_base}/{consulta}' for consulta in consultas]
+
+    try:
+        # Primeira passada sequencial: latência sem cache de respostas (e carga dos dados).
+        frias = [_requisitar(url) for url in urls]
+        etags = {url: etag for url, (_, _, etag) in zip(urls, frias)}
+
+        def tarefa(i):
+            url = urls[i % len(urls)]
+            return _requisitar(url, etags[url] if revalidar else None)
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            quentes = list(executor.map(tarefa, range(n_requisicoes)))
+        segundos = time.perf_counter() - inicio
+    finally:
+        if servidor is not None:
+            servidor.shutdown()
+            servidor.server_close()
+
+    latencias_frias = np.array([latencia for latencia, _, _ in frias]) * 1000
+    latencias = np.array([latencia for latencia, _, _ in quentes]) * 1000
+    status = dict(Counter(s for _, s, _ in quentes))
+
+    print(f"\n--- API ({url_base}, {concorrencia} clientes, {'com' if revalidar else 'sem'} If-None-Match) ---")
+    print(f"Sem cache ({len(urls)} URLs): p50={np.percentile(latencias_frias, 50):.1f}ms "
+          f"p99={np.percentile(latencias_frias, 99):.1f}ms")
+    print(f"Com cache ({n_requisicoes} req.): p50={np.percentile(latencias, 50):.2f}ms "
+          f"p99={np.percentile(latencias, 99):.2f}ms ({n_requisicoes / segundos:,.0f} req/s) status={status}")
+    return latencias_frias, latencias
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline SAEB.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    p_leitura = subparsers.add_parser('leitura', help="Compara os motores de leitura de CSV.")
+    p_leitura.add_argument('caminho')
+    p_leitura.add_argument('--colunas', nargs='*', default=None)
+    p_leitura.add_argument('--chunksize', type=int, default=None)
+    p_leitura.add_argument('--repeticoes', type=int, default=3)
+    p_leitura.add_argument('--encoding', default='latin-1')
+
+    p_relatorios = subparsers.add_parser('relatorios', help="Mede relatórios/min da exportação em lote.")
+    p_relatorios.add_argument('serie')
+    p_relatorios.add_argument('--edicao', type=int, default=None)
+    p_relatorios.add_argument('--n', type=int, default=200)
+    p_relatorios.add_argument('--processos', type=int, nargs='*', default=None)
+    p_relatorios.add_argument('--plotlyjs', choices=['embutido', 'arquivo'], default='embutido')
+    p_relatorios.add_argument('--nivel', choices=['escola', 'uf'], default='escola')
+
+    p_api = subparsers.add_parser('api', help="Teste de carga da API (latências p50/p99).")
+    p_api.add_argument('serie')
+    p_api.add_argument('--url', default=None, help="URL de uma API já em execução (padrão: inicia uma local).")
+    p_api.add_argument('--n', type=int, default=2000)
+    p_api.add_argument('--concorrencia', type=int, default=16)
+    p_api.add_argument('--revalidar', action='store_true', help="Envia If-None-Match (respostas 304).")
+
+    args = parser.parse_args()
+
+    if args.comando == 'leitura':
+        benchmark_leitura(args.caminho, args.colunas, args.chunksize, args.repeticoes, args.encoding)
+    elif args.comando == 'relatorios':
+        benchmark_relatorios(args.serie, args.edicao, args.n, args.processos, args.plotlyjs, args.nivel)
+    elif args.comando == 'api':
+        benchmark_api(args.serie, args.url, args.n, args.concorrencia, args.revalidar)
@@ -0,0 +1,392 @@
+import gzip
+import io
+import os
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_DISPONIVEL = True
+except ImportError:
+    PYARROW_DISPONIVEL = False
+
+import leitura
+import armazenamento
+
+
+# Carregamento dos resultados do pipeline, sem dependência do Streamlit: usado pelo
+# painel (app.py, com cache) e pela exportação de relatórios em lote.
+
+ARQUIVOS_SERIES = {
+    '5EF': {
+        'resultados': 'data/resultados_finais_5EF.csv.gz',
+        'diagnostico': 'data/diagnostico_habilidades_5EF.csv.gz',
+        'itens': 'data/estatisticas_itens_5EF.csv.gz',
+        'alternativas': 'data/alternativas_itens_5EF.csv.gz',
+        'matriz': 'descritores_5EF.csv',
+        'dicionario': 'data/dicionario_descritores_5EF.csv',
+        'risco_escolas': 'data/processed/risco_por_escola_5ef.parquet',
+        'risco_ufs': 'data/processed/risco_por_uf_5ef.parquet',
+        'histogramas_risco': 'data/histogramas_risco_5EF.csv.gz'  
+    },
+    '9EF': {
+        'resultados': 'data/resultados_finais_9EF.csv.gz',
+        'diagnostico': 'data/diagnostico_habilidades_9EF.csv.gz',
+        'itens': 'data/estatisticas_itens_9EF.csv.gz',
+        'alternativas': 'data/alternativas_itens_9EF.csv.gz',
+        'matriz': 'descritores_9EF.csv',
+        'dicionario': 'data/dicionario_descritores_9EF.csv',
+        'risco_escolas': 'data/processed/risco_por_escola_9ef.parquet',
+        'risco_ufs': 'data/processed/risco_por_uf_9ef.parquet',
+        'histogramas_risco': 'data/histogramas_risco_9EF.csv.gz' 
+    }
+}
+# Os arquivos .csv.gz em data/ (saída direta do pipeline) correspondem à edição atual.
+EDICAO_ARQUIVOS_LEGADOS = armazenamento.EDICAO_ATUAL
+HABILIDADES_OCULTAR = {
+    '5EF': {
+        'LP': ['D20', 'D18'], 
+        'MT': ['D34', 'D35', 'D36'] 
+    },
+    '9EF': {
+        'LP': [],
+        'MT': []
+    }
+}
+MAPA_UF = {
+    11: 'RO - Rondônia', 12: 'AC - Acre', 13: 'AM - Amazonas', 14: 'RR - Roraima', 
+    15: 'PA - Pará', 16: 'AP - Amapá', 17: 'TO - Tocantins', 21: 'MA - Maranhão', 
+    22: 'PI - Piauí', 23: 'CE - Ceará', 24: 'RN - Rio Grande do Norte', 25: 'PB - Paraíba', 
+    26: 'PE - Pernambuco', 27: 'AL - Alagoas', 28: 'SE - Sergipe', 29: 'BA - Bahia', 
+    31: 'MG - Minas Gerais', 32: 'ES - Espírito Santo', 33: 'RJ - Rio de Janeiro', 
+    35: 'SP - São Paulo', 41: 'PR - Paraná', 42: 'SC - Santa Catarina', 
+    43: 'RS - Rio Grande do Sul', 50: 'MS - Mato Grosso do Sul', 51: 'MT - Mato Grosso', 
+    52: 'GO - Goiás', 53: 'DF - Distrito Federal', 
+    -1: 'Não Informado' 
+}
+CONFIG_APP_SERIES = { 
+    '5EF': {
+        'CLUSTER_LEGEND': {
+            '3': 'Dificuldade Crítica Generalizada', '1': 'Risco Extremo em LP (Dislexia)',   
+            '2': 'Risco Extremo em MT (Discalculia)', '0': 'Abaixo da Média Equilibrado',      
+            '6': 'Risco Extremo LP (Dislexia Forte)', '5': 'Risco MT (Discalculia Moderado)',   
+            '4': 'Alto Desempenho Equilibrado',       
+        },
+        'RISCO_PARA_CLUSTER': {
+            'Alto Risco': ['3', '1', '2', '6'], 'Risco Moderado': ['0', '5'], 'Normal': ['4']          
+        },
+        'CLUSTER_PARA_RISCO': {
+            '3': 'Alto Risco', '1': 'Alto Risco', '2': 'Alto Risco', '6': 'Alto Risco',
+            '0': 'Risco Moderado', '5': 'Risco Moderado', '4': 'Normal'
+        }
+    },
+    '9EF': {
+        'CLUSTER_LEGEND': {
+            '0': 'Grande Déficit em MT (Crítico)', '6': 'Grande Déficit em LP (Crítico)',
+            '3': 'Risco Extremo Dislexia (LP << MT)', '2': 'Risco Extremo Discalculia (LP >> MT)',
+            '5': 'Alto Desempenho Discrepante (LP Forte)', '1': 'Alto Desempenho Discrepante (MT Forte)',
+            '4': 'Perfil Mediano Equilibrado (Média Geral)', 
+        },
+        'RISCO_PARA_CLUSTER': {
+            'Alto Risco': ['0', '6', '3', '2'], 'Risco Moderado': ['5', '1'], 'Normal': ['4']         
+        },
+        'CLUSTER_PARA_RISCO': {
+            '4': 'Normal', '0': 'Alto Risco', '6': 'Alto Risco',
+            '3': 'Alto Risco', '2': 'Alto Risco', '5': 'Risco Moderado', 
+            '1': 'Risco Moderado'
+        }
+    }
+}
+STATUS_RISCO_FINAL = ['Normal', 'Risco Moderado', 'Alto Risco', 'Superdotação']
+RISK_SORT_KEY = {'Alto Risco': 0, 'Risco Moderado': 1, 'Superdotação': 2, 'Normal': 3, 'Desconhecido': 99}
+
+# Exportação da lista de alunos filtrada: lida, filtrada e gravada em lotes. Os IDs usam
+# o inteiro anulável do pandas, então IDs nulos e colunas ausentes saem vazios.
+COLUNAS_ID_EXPORTACAO = ['ID_ALUNO', 'ID_ESCOLA', 'ID_UF']
+TIPOS_EXPORTACAO_ALUNOS = {
+    'ID_ALUNO': 'Int64',
+    'ID_ESCOLA': 'Int64',
+    'ID_UF': 'Int64',
+    'UF_DESCRICAO': str,
+    'CLUSTER': str,
+    'STATUS_RISCO_FINAL': str,
+    'PROFICIENCIA_LP': 'float64',
+    'PROFICIENCIA_MT': 'float64',
+    'SCORE_ANOMALIA': 'float64',
+}
+FORMATOS_EXPORTACAO_ALUNOS = ['csv.gz', 'parquet'] if PYARROW_DISPONIVEL else ['csv.gz']
+TAMANHO_LOTE_EXPORTACAO = 100000
+
+
+def ler_tabela_edicao(tabela: str, serie: str, edicao: int, dtype: Dict[str, Any] | None = None,
+                      colunas: list | None = None, ufs: list | None = None) -> pd.DataFrame | None:
+    """Lê a tabela da partição (edição, série) ou, para a edição atual, do arquivo .csv.gz legado."""
+    df = armazenamento.carregar_particoes(tabela, serie, edicao, colunas=colunas, ufs=ufs)
+    if df is None:
+        caminho_legado = ARQUIVOS_SERIES[serie][tabela]
+        if edicao != EDICAO_ARQUIVOS_LEGADOS or not os.path.exists(caminho_legado):
+            return None
+        if caminho_legado.endswith('.parquet'):
+            df = pd.read_parquet(caminho_legado, columns=colunas)
+        else:
+            df = leitura.ler_csv(caminho_legado, colunas=colunas, sep=';', encoding='utf-8', dtype=dtype)
+        if ufs is not None and 'ID_UF' in df.columns:
+            df = df[df['ID_UF'].isin(ufs)]
+
+    for coluna, tipo in (dtype or {}).items():
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype(tipo)
+    return df
+
+
+def listar_edicoes_disponiveis(serie: str) -> list:
+    """Edições com resultados de alunos para a série (partições e arquivos legados)."""
+    edicoes = set(armazenamento.listar_edicoes('resultados', serie))
+    if os.path.exists(ARQUIVOS_SERIES[serie]['resultados']):
+        edicoes.add(EDICAO_ARQUIVOS_LEGADOS)
+    return sorted(edicoes)
+
+
+def carregar_dados(serie: str, edicao: int, avisar: Callable[[str], Any] = print) -> Tuple[pd.DataFrame | None, pd.DataFrame | None]:
+    """Função para carregar todos os dataframes necessários. Os erros são informados via `avisar`."""
+    
+    COLUNA_DESCRITOR_MATRIZ = 'NU_DESCRITOR_HABILIDADE' 
+    COLUNA_DESCRICAO_MATRIZ = 'DESCRICAO'
+    COLUNA_DISCIPLINA_MATRIZ = 'TP_DISCIPLINA' 
+    SEPARADOR_CSV = ';'
+    # Dicionário em UTF-8 canônico gerado pelo diagnóstico; a matriz original é o fallback.
+    caminho_matriz = ARQUIVOS_SERIES[serie]['dicionario']
+    if not os.path.exists(caminho_matriz):
+        caminho_matriz = ARQUIVOS_SERIES[serie]['matriz']
+
+    try:
+        df_alunos = ler_tabela_edicao('resultados', serie, edicao, dtype={'ID_ALUNO': str, 'CLUSTER': str})
+        df_diagnostico = ler_tabela_edicao('diagnostico', serie, edicao, dtype={'CLUSTER': str, COLUNA_DESCRITOR_MATRIZ: str})
+    except Exception as e:
+        avisar(f"Erro ao ler os resultados da série **{serie}** ({edicao}). Detalhe: {e}")
+        return None, None
+
+    if df_alunos is None or df_diagnostico is None:
+        avisar(f"ERRO: Arquivos principais da série **{serie}** para a edição **{edicao}** não encontrados. Verifique se eles estão em 'data/'")
+        return None, None
+        
+    df_alunos['STATUS_RISCO_FINAL'] = df_alunos['STATUS_RISCO_FINAL'].fillna('Normal').astype(str).replace('nan', 'Normal') 
+    
+    df_alunos['ID_UF'] = pd.to_numeric(df_alunos['ID_UF'], errors='coerce').fillna(-1).astype(int)
+    df_alunos['UF_DESCRICAO'] = df_alunos['ID_UF'].map(MAPA_UF).fillna('UF Desconhecida')
+
+    try:
+        df_matriz = leitura.ler_csv(
+            caminho_matriz,
+            sep=SEPARADOR_CSV,
+            encoding='utf-8',
+            dtype=str
+        )
+    except Exception as e:
+        avisar(f"Erro ao carregar arquivos de diagnóstico/matriz. Detalhe: {e}")
+        return None, None
+
+    try:
+        COLUNAS_MESCLAGEM = [COLUNA_DESCRITOR_MATRIZ, COLUNA_DISCIPLINA_MATRIZ]
+
+        df_diag_completo = pd.merge(
+            df_diagnostico,
+            df_matriz,
+            left_on=COLUNAS_MESCLAGEM,
+            right_on=COLUNAS_MESCLAGEM, 
+            how='left'
+        )
+    except KeyError as e:
+        avisar(f"KeyError durante o Merge: A coluna **{e}** não foi encontrada no seu arquivo de descritores.")
+        return None, None
+    
+    COLUNA_DISCIPLINA_MATRIZ = 'TP_DISCIPLINA' 
+    df_diag_completo[COLUNA_DISCIPLINA_MATRIZ] = df_diag_completo[COLUNA_DISCIPLINA_MATRIZ].astype(str).str.strip()
+    
+    if COLUNA_DESCRICAO_MATRIZ != 'DESCRICAO_HABILIDADE' and COLUNA_DESCRICAO_MATRIZ in df_diag_completo.columns:
+        df_diag_completo.rename(
+            columns={COLUNA_DESCRICAO_MATRIZ: 'DESCRICAO_HABILIDADE'}, 
+            inplace=True
+        )
+    
+    df_diag_completo['DESCRICAO_HABILIDADE'] = df_diag_completo['DESCRICAO_HABILIDADE'].fillna(
+        df_diag_completo[COLUNA_DESCRITOR_MATRIZ] + " (Descrição não disponível)"
+    )
+
+    return df_alunos, df_diag_completo
+
+
+def carregar_estatisticas_itens(serie: str, edicao: int) -> Tuple[pd.DataFrame | None, pd.DataFrame | None]:
+    """Carrega as estatísticas por item e a frequência das alternativas por cluster."""
+    df_itens = ler_tabela_edicao('itens', serie, edicao, dtype={'ID_ITEM': str})
+    df_alternativas = ler_tabela_edicao('alternativas', serie, edicao, dtype={'ID_ITEM': str, 'CLUSTER': str})
+    if df_itens is None or df_alternativas is None:
+        return None, None
+    return df_itens, df_alternativas
+
+
+def resumir_edicao(serie: str, edicao: int, ufs: Tuple[int, ...] | None) -> Tuple[Dict[str, Any] | None, pd.DataFrame | None]:
+    """KPIs e taxa de erro por habilidade de uma edição, lendo só as colunas e UFs necessárias."""
+    df_alunos = ler_tabela_edicao(
+        'resultados', serie, edicao,
+        colunas=['ID_UF', 'STATUS_RISCO_FINAL', 'PROFICIENCIA_LP', 'PROFICIENCIA_MT'],
+        ufs=list(ufs) if ufs is not None else None
+    )
+    if df_alunos is None:
+        return None, None
+
+    status = df_alunos['STATUS_RISCO_FINAL'].fillna('Normal')
+    resumo = {
+        'TOTAL_ALUNOS': len(df_alunos),
+        'TAXA_RISCO': status.isin(['Alto Risco', 'Risco Moderado']).mean(),
+        'MEDIA_LP': df_alunos['PROFICIENCIA_LP'].mean(),
+        'MEDIA_MT': df_alunos['PROFICIENCIA_MT'].mean(),
+        'DISTRIBUICAO_STATUS': status.value_counts(normalize=True).to_dict(),
+    }
+
+    # Os rótulos de cluster não são comparáveis entre edições: a taxa é consolidada por habilidade.
+    df_diag = ler_tabela_edicao('diagnostico', serie, edicao, dtype={'NU_DESCRITOR_HABILIDADE': str})
+    if df_diag is not None:
+        if 'N_RESPOSTAS' in df_diag.columns:
+            df_diag = df_diag.assign(N_ERROS=df_diag['TAXA_ERRO'] * df_diag['N_RESPOSTAS'])
+            df_diag = df_diag.groupby(['TP_DISCIPLINA', 'NU_DESCRITOR_HABILIDADE'])[['N_ERROS', 'N_RESPOSTAS']].sum()
+            df_diag['TAXA_ERRO'] = df_diag['N_ERROS'] / df_diag['N_RESPOSTAS']
+        else:
+            df_diag = df_diag.groupby(['TP_DISCIPLINA', 'NU_DESCRITOR_HABILIDADE'])[['TAXA_ERRO']].mean()
+        df_diag = df_diag[['TAXA_ERRO']].reset_index()
+    return resumo, df_diag
+
+
+def carregar_agregados(serie: str, edicao: int) -> Tuple[pd.DataFrame | None, pd.DataFrame | None]:
+    """Tabelas pré-agregadas de risco por UF e por escola geradas por main.py."""
+    df_ufs = ler_tabela_edicao('risco_ufs', serie, edicao)
+    df_escolas = ler_tabela_edicao('risco_escolas', serie, edicao)
+    if df_ufs is None or df_escolas is None:
+        return None, None
+
+    for df in (df_ufs, df_escolas):
+        df['UF_DESCRICAO'] = df['ID_UF'].map(MAPA_UF).fillna('UF Desconhecida')
+        if 'ALUNOS_ALTO_RISCO' in df.columns and 'ALUNOS_RISCO_MODERADO' in df.columns:
+            # Mesma definição de "Alunos em Risco (Alto ou Mod.)" dos KPIs do painel.
+            df['TAXA_RISCO_STATUS'] = ((df['ALUNOS_ALTO_RISCO'] + df['ALUNOS_RISCO_MODERADO']) / df['TOTAL_ALUNOS']).round(3)
+    return df_ufs, df_escolas
+
+
+def carregar_histogramas_risco(serie: str, edicao: int) -> pd.DataFrame | None:
+    """Histogramas conjuntos (média x discrepância x score de anomalia) gerados por analise.py."""
+    return ler_tabela_edicao('histogramas_risco', serie, edicao, dtype={'CLUSTER': 'category'})
+
+
+def paginar_escolas(df_escolas: pd.DataFrame, pagina: int, tamanho_pagina: int, ordenar_por: str,
+                    ascendente: bool = False, busca: str | None = None, ufs: list | None = None,
+                    min_alunos: int = 1) -> Tuple[pd.DataFrame, int]:
+    """
+    Retorna uma página (base 0) do ranking de escolas e o total de escolas filtradas.
+
+    Só as linhas até o fim da página são ordenadas (seleção parcial com argpartition);
+    empates são desfeitos pelo ID_ESCOLA, então as páginas não se sobrepõem.
+    """
+    condicao = df_escolas['TOTAL_ALUNOS'].to_numpy() >= min_alunos
+    if ufs is not None:
+        condicao &= df_escolas['ID_UF'].isin(ufs).to_numpy()
+    if busca:
+        condicao &= df_escolas['ID_ESCOLA'].astype(str).str.contains(busca.strip(), regex=False).to_numpy()
+    df_filtrado = df_escolas[condicao]
+
+    total = len(df_filtrado)
+    inicio = pagina * tamanho_pagina
+    fim = min(inicio + tamanho_pagina, total)
+    if inicio >= total:
+        return df_filtrado.iloc[:0], total
+
+    valores = df_filtrado[ordenar_por].to_numpy(dtype=float)
+    valores = np.where(np.isnan(valores), np.inf, valores if ascendente else -valores)
+    if fim < total:
+        limite = np.partition(valores, fim - 1)[fim - 1]
+        candidatos = np.flatnonzero(valores <= limite)
+    else:
+        candidatos = np.arange(total)
+    ids_escola = df_filtrado['ID_ESCOLA'].to_numpy()
+    candidatos = candidatos[np.lexsort((ids_escola[candidatos], valores[candidatos]))]
+    return df_filtrado.iloc[candidatos[inicio:fim]], total
+
+
+def iterar_alunos(serie: str, edicao: int, ufs: list | None = None, status: list | None = None,
+                  clusters: list | None = None, tamanho_lote: int = TAMANHO_LOTE_EXPORTACAO) -> Iterator[pd.DataFrame]:
+    """
+    Gera os alunos filtrados em lotes com as colunas de TIPOS_EXPORTACAO_ALUNOS.
+
+    Lê a partição em fluxo (só as colunas e UFs necessárias) ou, para a edição atual
+    sem partição, o .csv.gz legado em blocos. Colunas ausentes em edições antigas
+    (ex.: SCORE_ANOMALIA) saem vazias.
+    """
+    colunas = [c for c in TIPOS_EXPORTACAO_ALUNOS if c != 'UF_DESCRICAO']
+    lotes = armazenamento.iterar_particoes('resultados', serie, edicao, tamanho_lote, colunas=colunas, ufs=ufs)
+    if lotes is None:
+        caminho_legado = ARQUIVOS_SERIES[serie]['resultados']
+        if edicao != EDICAO_ARQUIVOS_LEGADOS or not os.path.exists(caminho_legado):
+            return
+        colunas_legado = [c for c in colunas if c in leitura.ler_cabecalho(caminho_legado, encoding='utf-8')]
+        lotes = leitura.ler_csv_em_blocos(
+            caminho_legado, tamanho_lote, colunas=colunas_legado,
+            dtype={c: TIPOS_EXPORTACAO_ALUNOS[c] for c in colunas_legado}, sep=';', encoding='utf-8'
+        )
+
+    for df in lotes:
+        df = df.reindex(columns=colunas)
+        # Mesma normalização de carregar_dados: status ausente é 'Normal'.
+        df['STATUS_RISCO_FINAL'] = df['STATUS_RISCO_FINAL'].fillna('Normal')
+        df['CLUSTER'] = df['CLUSTER'].astype(str)
+        for coluna in COLUNAS_ID_EXPORTACAO:
+            df[coluna] = pd.to_numeric(df[coluna], errors='coerce')
+        df['ID_UF'] = df['ID_UF'].fillna(-1)
+
+        condicao = pd.Series(True, index=df.index)
+        if ufs is not None:
+            condicao &= df['ID_UF'].isin(ufs)
+        if status is not None:
+            condicao &= df['STATUS_RISCO_FINAL'].isin(status)
+        if clusters is not None:
+            condicao &= df['CLUSTER'].isin(clusters)
+        df = df[condicao]
+        if df.empty:
+            continue
+
+        df.insert(colunas.index('ID_UF') + 1, 'UF_DESCRICAO', df['ID_UF'].map(MAPA_UF).fillna('UF Desconhecida'))
+        yield df.astype(TIPOS_EXPORTACAO_ALUNOS)
+
+
+def exportar_alunos(arquivo: BinaryIO, formato: str, serie: str, edicao: int, ufs: list | None = None,
+                    status: list | None = None, clusters: list | None = None,
+                    tamanho_lote: int = TAMANHO_LOTE_EXPORTACAO) -> int:
+    """
+    Grava os alunos filtrados em `arquivo` (binário) lote a lote, como CSV compactado
+    (';', UTF-8, gzip) ou Parquet. Retorna o número de alunos gravados.
+    """
+    if formato not in FORMATOS_EXPORTACAO_ALUNOS:
+        raise ValueError(f"Formato {formato!r} inválido. Use: {', '.join(FORMATOS_EXPORTACAO_ALUNOS)}.")
+
+    lotes = iterar_alunos(serie, edicao, ufs=ufs, status=status, clusters=clusters, tamanho_lote=tamanho_lote)
+    df_vazio = pd.DataFrame(columns=list(TIPOS_EXPORTACAO_ALUNOS)).astype(TIPOS_EXPORTACAO_ALUNOS)
+    n_alunos = 0
+
+    if formato == 'parquet':
+        esquema = pa.Schema.from_pandas(df_vazio, preserve_index=False)
+        with pq.ParquetWriter(arquivo, esquema, compression='zstd') as escritor:
+            for df in lotes:
+                escritor.write_table(pa.Table.from_pandas(df, schema=esquema, preserve_index=False))
+                n_alunos += len(df)
+        return n_alunos
+
+    with gzip.GzipFile(fileobj=arquivo, mode='wb') as compactado:
+        texto = io.TextIOWrapper(compactado, encoding='utf-8', newline='')
+        df_vazio.to_csv(texto, sep=';', index=False)
+        for df in lotes:
+            df.to_csv(texto, sep=';', index=False, header=False)
+            n_alunos += len(df)
+        texto.flush()
+        texto.detach()
+    return n_alunos
@@ -0,0 +1,23 @@
+# Constantes de configuração compartilhadas pelo pipeline (analise.py, main.py) e pelo
+# painel (app.py). Este módulo não importa o pipeline de treino, então o painel pode
+# ler a configuração sem carregar o scikit-learn.
+
+# Clusters de cada série por grupo de risco (rótulos do K-Means de analise.py).
+CONFIG_SERIES = {
+    '5EF': {
+        'N_CLUSTERS': 7,
+        'ALTO_RISCO': ['1', '2', '3'],
+        'MODERADO': ['5', '6'],
+        'NORMAL_BASE': ['4', '0']
+    },
+    '9EF': {
+        'N_CLUSTERS': 7,
+        'ALTO_RISCO': ['1', '2', '3'],
+        'MODERADO': ['5', '6'],
+        'NORMAL_BASE': ['4', '0']
+    }
+}
+
+# Quantis que definem os limiares de risco de aprendizagem em main.py.
+QUANTIL_RISCO = 0.3
+QUANTIL_DISCREPANCIA = 0.7
@@ -2,8 +2,15 @@ import pandas as pd
 import os 
 import numpy as np
 import re 
+import unicodedata
 from tqdm import tqdm 
 
+import leitura
+import perfis_habilidades
+import estatisticas_itens
+import armazenamento
+import validacao
+
 
 DIRETORIO_DADOS = 'D:/PI_SAEB/DADOS'
 
@@ -14,15 +21,24 @@ ARQUIVOS_SERIES = {
     'respostas': os.path.join(DIRETORIO_DADOS, 'TS_ALUNO_5EF.csv'),
     'cluster': 'data/resultados_finais_5EF.csv.gz', 
     'saida': 'data/diagnostico_habilidades_5EF.csv.gz',
+    'itens': 'data/estatisticas_itens_5EF.csv.gz',
+    'alternativas': 'data/alternativas_itens_5EF.csv.gz',
+    'matriz': 'descritores_5EF.csv',
+    'dicionario': 'data/dicionario_descritores_5EF.csv',
 },
     '9EF': {
     'respostas': os.path.join(DIRETORIO_DADOS, 'TS_ALUNO_9EF.csv'),
     'cluster': 'data/resultados_finais_9EF.csv.gz', 
     'saida': 'data/diagnostico_habilidades_9EF.csv.gz',
+    'itens': 'data/estatisticas_itens_9EF.csv.gz',
+    'alternativas': 'data/alternativas_itens_9EF.csv.gz',
+    'matriz': 'descritores_9EF.csv',
+    'dicionario': 'data/dicionario_descritores_9EF.csv',
     }
 }
 
 COLUNA_ID_ALUNO = 'ID_ALUNO'
+COLUNA_ID_ESCOLA = 'ID_ESCOLA'
 COLUNA_CLUSTER = 'CLUSTER'
 COLUNA_DESCRITOR = 'NU_DESCRITOR_HABILIDADE'
 COLUNA_DISCIPLINA = 'TP_DISCIPLINA'
@@ -30,8 +46,22 @@ COLUNA_GABARITO = 'TX_GABARITO'
 COLUNA_POSICAO = 'NU_POSICAO' 
 COLUNA_BLOCO = 'NU_BLOCO'
 COLUNA_ID_ITEM = 'ID_ITEM' 
+COLUNAS_PROFICIENCIA = ['PROFICIENCIA_LP', 'PROFICIENCIA_MT']
+
+COLUNAS_RESPOSTA = ['TX_RESP_BLOCO1_LP', 'TX_RESP_BLOCO2_LP', 
+                    'TX_RESP_BLOCO1_MT', 'TX_RESP_BLOCO2_MT']
 
 CHUNK_SIZE = 250000 
+PADRAO_DESCRITOR_SAEB = r'^D\d+$'
+
+Z_CONFIANCA = 1.959964  # Intervalo de confiança de 95%
+
+def filtrar_itens_saeb(df_itens):
+    """Mantém os itens com gabarito e descritor no formato SAEB (D<número>)."""
+    df_itens = df_itens.dropna(subset=[COLUNA_GABARITO])
+    return df_itens[
+        df_itens[COLUNA_DESCRITOR].astype(str).str.match(PADRAO_DESCRITOR_SAEB)
+    ].copy()
 
 def criar_map_itens(df_itens):
     """Cria um mapeamento eficiente de bloco/posição para descritor/gabarito."""
@@ -47,17 +77,70 @@ def criar_map_itens(df_itens):
             for i, item_row in itens_do_bloco.iterrows():
                 if item_row[COLUNA_GABARITO] not in ['X', 'E']:
                     map_itens[(chave_coluna, i)] = {
+                        COLUNA_ID_ITEM: item_row[COLUNA_ID_ITEM],
                         COLUNA_DESCRITOR: item_row[COLUNA_DESCRITOR],
                         COLUNA_GABARITO: item_row[COLUNA_GABARITO],
                         COLUNA_DISCIPLINA: disc
                     }
     return map_itens
 
+def normalizar_texto(texto):
+    """Corrige UTF-8 lido como latin-1 (mojibake) e normaliza o texto para UTF-8 NFC."""
+    if not isinstance(texto, str):
+        return texto
+    if 'Ã' in texto or 'Â' in texto:
+        try:
+            texto = texto.encode('latin-1').decode('utf-8')
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            pass
+    return unicodedata.normalize('NFC', texto.strip())
+
+def gerar_dicionario_descritores(serie_config):
+    """
+    Gera o dicionário de descritores da série em UTF-8 canônico, para o painel ler
+    as descrições sem nenhuma correção de codificação.
+    """
+    caminho_matriz = ARQUIVOS_SERIES[serie_config]['matriz']
+    with open(caminho_matriz, 'rb') as arquivo:
+        conteudo = arquivo.read()
+    try:
+        encoding = 'utf-8'
+        conteudo.decode(encoding)
+    except UnicodeDecodeError:
+        encoding = 'latin-1'
+
+    df_dicionario = pd.read_csv(caminho_matriz, sep=';', encoding=encoding, dtype=str)
+    df_dicionario = df_dicionario.rename(columns={'DESCRICAO': 'DESCRICAO_HABILIDADE'})
+    for coluna in df_dicionario.columns:
+        df_dicionario[coluna] = df_dicionario[coluna].map(normalizar_texto)
+    df_dicionario = df_dicionario.drop_duplicates(subset=[COLUNA_DISCIPLINA, COLUNA_DESCRITOR])
+
+    os.makedirs(os.path.dirname(ARQUIVOS_SERIES[serie_config]['dicionario']), exist_ok=True)
+    df_dicionario.to_csv(ARQUIVOS_SERIES[serie_config]['dicionario'], sep=';', encoding='utf-8', index=False)
+    print(f"Dicionário de descritores ({caminho_matriz}, lido como {encoding}) salvo em '{ARQUIVOS_SERIES[serie_config]['dicionario']}'.")
+    return df_dicionario
+
+def intervalo_wilson(sucessos, n, z=Z_CONFIANCA):
+    """
+    Limites inferior e superior do intervalo de Wilson para a proporção sucessos/n.
+    Sem observações (n = 0) o intervalo é [0, 1], o limite da fórmula quando n -> 0.
+    """
+    sucessos = np.asarray(sucessos, dtype=float)
+    n = np.asarray(n, dtype=float)
+    com_dados = n > 0
+    n_seguro = np.where(com_dados, n, 1.0)
+    p = sucessos / n_seguro
+    denominador = 1 + z ** 2 / n_seguro
+    centro = (p + z ** 2 / (2 * n_seguro)) / denominador
+    margem = z * np.sqrt(np.maximum(p * (1 - p), 0) / n_seguro + z ** 2 / (4 * n_seguro ** 2)) / denominador
+    inferior = np.where(com_dados, np.clip(centro - margem, 0, 1), 0.0)
+    superior = np.where(com_dados, np.clip(centro + margem, 0, 1), 1.0)
+    return inferior, superior
+
 def processar_chunk(df_chunk, map_itens):
     """Processa um bloco de alunos para gerar acertos/erros."""
     
-    colunas_resp_processar = ['TX_RESP_BLOCO1_LP', 'TX_RESP_BLOCO2_LP', 
-                              'TX_RESP_BLOCO1_MT', 'TX_RESP_BLOCO2_MT']
+    colunas_resp_processar = COLUNAS_RESPOSTA
     
     df_chunk = df_chunk[[COLUNA_ID_ALUNO] + colunas_resp_processar].copy()
 
@@ -111,39 +194,43 @@ def gerar_diagnostico_habilidades_chunked(serie_config):
     COLUNA_BLOCO = 'NU_BLOCO'
 
     try:
-        df_itens = pd.read_csv(CAMINHO_ITENS, sep=';', encoding='latin-1') 
-        df_itens = df_itens[[COLUNA_ID_ITEM, COLUNA_DESCRITOR, COLUNA_DISCIPLINA, 
-                             COLUNA_GABARITO, COLUNA_POSICAO, COLUNA_BLOCO]].copy()
-        df_itens.dropna(subset=[COLUNA_GABARITO], inplace=True)
-      
-        df_itens = df_itens[
-            df_itens[COLUNA_DESCRITOR].astype(str).str.match(r'^D\d+$')
-        ].copy()
+        df_itens = leitura.ler_csv(
+            CAMINHO_ITENS,
+            colunas=[COLUNA_ID_ITEM, COLUNA_DESCRITOR, COLUNA_DISCIPLINA,
+                     COLUNA_GABARITO, COLUNA_POSICAO, COLUNA_BLOCO]
+        )
+        df_itens = filtrar_itens_saeb(df_itens)
         
         if df_itens.empty:
             print("AVISO: Após a filtragem, o arquivo TS_ITEM.csv não contém descritores no formato SAEB (D<número>). Verifique a matriz de referência usada.")
             return None
         
-        df_clusters = pd.read_csv(
-            ARQUIVOS_SERIES[serie_config]['cluster'], 
-            sep=';', 
-            encoding='latin-1',
-            compression='gzip' 
+        df_clusters = leitura.ler_csv(
+            ARQUIVOS_SERIES[serie_config]['cluster'],
+            colunas=[COLUNA_ID_ALUNO, COLUNA_ID_ESCOLA, COLUNA_CLUSTER] + COLUNAS_PROFICIENCIA,
+            dtype={COLUNA_ID_ALUNO: str, COLUNA_CLUSTER: str},
+            encoding='utf-8'
         )
-        df_clusters = df_clusters[[COLUNA_ID_ALUNO, COLUNA_CLUSTER]].copy()
-        df_clusters[COLUNA_ID_ALUNO] = df_clusters[COLUNA_ID_ALUNO].astype(str)
         
         map_itens = criar_map_itens(df_itens)
+        indice_descritores = perfis_habilidades.criar_indice_descritores(map_itens)
+        estatisticas = estatisticas_itens.iniciar_estatisticas_itens(
+            map_itens, df_clusters[COLUNA_CLUSTER].astype(int).max() + 1
+        )
 
     except FileNotFoundError as e:
         print(f"ERRO: Arquivo não encontrado. Verifique se {e.filename} existe e se os caminhos estão corretos.")
         return None
 
     diagnosticos_chunks = []
+    perfis_chunks = []
     
-    chunk_reader = pd.read_csv(ARQUIVOS_SERIES[serie_config]['respostas'], 
-                             sep=';', encoding='latin-1', 
-                             low_memory=False, iterator=True, chunksize=CHUNK_SIZE)
+    chunk_reader = leitura.ler_csv_em_blocos(
+        ARQUIVOS_SERIES[serie_config]['respostas'],
+        CHUNK_SIZE,
+        colunas=[COLUNA_ID_ALUNO] + COLUNAS_RESPOSTA,
+        dtype={coluna: str for coluna in [COLUNA_ID_ALUNO] + COLUNAS_RESPOSTA}
+    )
     
     chunk_num = 0
     for df_chunk_resp in chunk_reader:
@@ -152,12 +239,24 @@ def gerar_diagnostico_habilidades_chunked(serie_config):
         
         df_chunk_resp[COLUNA_ID_ALUNO] = df_chunk_resp[COLUNA_ID_ALUNO].astype(str)
         
+        # Estatísticas por item (p-valor, ponto-bisserial, alternativas) na mesma passada
+        estatisticas_itens.acumular_estatisticas_itens(
+            estatisticas,
+            pd.merge(df_chunk_resp, df_clusters, on=COLUNA_ID_ALUNO, how='inner')
+        )
+        
         df_acertos_chunk = processar_chunk(df_chunk_resp, map_itens)
         
         if not df_acertos_chunk.empty:
             df_final_chunk = pd.merge(df_acertos_chunk, df_clusters, on=COLUNA_ID_ALUNO, how='inner')
             
-            df_diagnostico_chunk = df_final_chunk.groupby([COLUNA_CLUSTER, COLUNA_DISCIPLINA, COLUNA_DESCRITOR])['ACERTO'].mean().reset_index()
+            # Perfil individual (acerto/tentativa por descritor) para consultas por aluno e escola
+            perfis_chunks.append(perfis_habilidades.montar_perfis_chunk(df_final_chunk, indice_descritores))
+            
+            # Somas parciais (acertos e respostas) para consolidar a taxa e o intervalo de confiança no final
+            df_diagnostico_chunk = df_final_chunk.groupby([COLUNA_CLUSTER, COLUNA_DISCIPLINA, COLUNA_DESCRITOR])['ACERTO'].agg(
+                N_ACERTOS='sum', N_RESPOSTAS='count'
+            ).reset_index()
             diagnosticos_chunks.append(df_diagnostico_chunk)
            
             del df_chunk_resp, df_acertos_chunk, df_final_chunk, df_diagnostico_chunk
@@ -168,10 +267,16 @@ def gerar_diagnostico_habilidades_chunked(serie_config):
         
     df_consolidado = pd.concat(diagnosticos_chunks, ignore_index=True)
     
-    df_diagnostico_final = df_consolidado.groupby([COLUNA_CLUSTER, COLUNA_DISCIPLINA, COLUNA_DESCRITOR])['ACERTO'].mean().reset_index()
+    df_diagnostico_final = df_consolidado.groupby([COLUNA_CLUSTER, COLUNA_DISCIPLINA, COLUNA_DESCRITOR])[
+        ['N_ACERTOS', 'N_RESPOSTAS']
+    ].sum().reset_index()
     
-    df_diagnostico_final['TAXA_ERRO'] = 1 - df_diagnostico_final['ACERTO']
-    df_diagnostico_final.drop(columns=['ACERTO'], inplace=True)
+    n_erros = df_diagnostico_final['N_RESPOSTAS'] - df_diagnostico_final['N_ACERTOS']
+    df_diagnostico_final['TAXA_ERRO'] = n_erros / df_diagnostico_final['N_RESPOSTAS']
+    df_diagnostico_final['TAXA_ERRO_IC_INF'], df_diagnostico_final['TAXA_ERRO_IC_SUP'] = intervalo_wilson(
+        n_erros.to_numpy(), df_diagnostico_final['N_RESPOSTAS'].to_numpy()
+    )
+    df_diagnostico_final.drop(columns=['N_ACERTOS'], inplace=True)
     
     os.makedirs(os.path.dirname(ARQUIVOS_SERIES[serie_config]['saida']), exist_ok=True)
     
@@ -183,10 +288,34 @@ def gerar_diagnostico_habilidades_chunked(serie_config):
         index=False
     )
     print(f"Diagnóstico de habilidades para {serie_config} concluído e salvo em '{ARQUIVOS_SERIES[serie_config]['saida']}'.")
+    armazenamento.gravar_particoes(df_diagnostico_final, 'diagnostico', serie_config)
+    
+    perfis_habilidades.gravar_perfis(armazenamento.diretorio_perfis(serie_config), perfis_chunks, indice_descritores)
+    
+    df_estatisticas_itens, df_alternativas_itens = estatisticas_itens.finalizar_estatisticas_itens(estatisticas)
+    for chave, df_saida in [('itens', df_estatisticas_itens), ('alternativas', df_alternativas_itens)]:
+        df_saida.to_csv(
+            ARQUIVOS_SERIES[serie_config][chave], 
+            sep=';', 
+            encoding='utf-8', 
+            compression='gzip', 
+            index=False
+        )
+        armazenamento.gravar_particoes(df_saida, chave, serie_config)
+    print(f"Estatísticas de itens para {serie_config} salvas em '{ARQUIVOS_SERIES[serie_config]['itens']}'.")
+    
+    gerar_dicionario_descritores(serie_config)
     
     return df_diagnostico_final
 
 if __name__ == "__main__":
+    # Interrompe antes do processamento em blocos se a amostra das entradas tiver erros.
+    validacao.exigir_entradas_validas(
+        {serie: config['respostas'] for serie, config in ARQUIVOS_SERIES.items()},
+        [COLUNA_ID_ALUNO] + COLUNAS_RESPOSTA, 'diagnostico',
+        caminho_itens=CAMINHO_ITENS, filtrar_itens=filtrar_itens_saeb
+    )
+
     df_5ef = gerar_diagnostico_habilidades_chunked('5EF')
    
     df_9ef = gerar_diagnostico_habilidades_chunked('9EF')
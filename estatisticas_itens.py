@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+
+COLUNA_ID_ITEM = 'ID_ITEM'
+COLUNA_DESCRITOR = 'NU_DESCRITOR_HABILIDADE'
+COLUNA_DISCIPLINA = 'TP_DISCIPLINA'
+COLUNA_GABARITO = 'TX_GABARITO'
+COLUNA_CLUSTER = 'CLUSTER'
+
+# Categorias de resposta contadas por item. 'OUTRO' agrupa branco, rasura e dupla marcação.
+ALTERNATIVAS = ['A', 'B', 'C', 'D', 'E', 'OUTRO']
+CODIGOS_ALTERNATIVA = np.full(256, len(ALTERNATIVAS) - 1, dtype=np.int64)
+for _codigo, _letra in enumerate(ALTERNATIVAS[:-1]):
+    CODIGOS_ALTERNATIVA[ord(_letra)] = _codigo
+
+
+def matriz_respostas(serie_respostas, largura):
+    """Converte as strings de resposta de um bloco em uma matriz (alunos x posições) de bytes."""
+    textos = serie_respostas.fillna('').astype(str).str.ljust(largura).str.slice(0, largura)
+    return np.frombuffer(''.join(textos).encode('ascii', errors='replace'), dtype=np.uint8).reshape(-1, largura)
+
+
+def iniciar_estatisticas_itens(map_itens, n_clusters):
+    """Cria o acumulador das somas parciais por item usadas na passada de correção."""
+    chaves = sorted(map_itens.keys())
+    df_itens = pd.DataFrame([
+        {
+            COLUNA_ID_ITEM: map_itens[chave][COLUNA_ID_ITEM],
+            COLUNA_DISCIPLINA: map_itens[chave][COLUNA_DISCIPLINA],
+            COLUNA_DESCRITOR: map_itens[chave][COLUNA_DESCRITOR],
+            COLUNA_GABARITO: map_itens[chave][COLUNA_GABARITO],
+            'COLUNA_RESPOSTA': chave[0],
+            'POSICAO_BLOCO': chave[1],
+        }
+        for chave in chaves
+    ])
+    n_itens = len(chaves)
+    return {
+        'itens': df_itens,
+        'n_clusters': n_clusters,
+        'n': np.zeros(n_itens),
+        'acertos': np.zeros(n_itens),
+        'soma_prof': np.zeros(n_itens),
+        'soma_prof2': np.zeros(n_itens),
+        'soma_prof_acerto': np.zeros(n_itens),
+        'alternativas': np.zeros((n_itens, n_clusters, len(ALTERNATIVAS)), dtype=np.int64),
+    }
+
+
+def acumular_estatisticas_itens(estatisticas, df_chunk):
+    """
+    Soma as estatísticas de um bloco de alunos ao acumulador.
+
+    `df_chunk` deve ter as colunas de resposta, CLUSTER e PROFICIENCIA_LP/MT. Apenas
+    somas e contagens são guardadas, então os blocos (e processos) podem ser
+    combinados em qualquer ordem.
+    """
+    df_itens = estatisticas['itens']
+    clusters = df_chunk[COLUNA_CLUSTER].astype(int).to_numpy()
+    codigo_gabarito = df_itens[COLUNA_GABARITO].map(lambda g: CODIGOS_ALTERNATIVA[ord(g)]).to_numpy()
+
+    for coluna_resposta, df_coluna in df_itens.groupby('COLUNA_RESPOSTA'):
+        indices_item = df_coluna.index.to_numpy()
+        posicoes = df_coluna['POSICAO_BLOCO'].to_numpy()
+        disciplina = df_coluna[COLUNA_DISCIPLINA].iloc[0]
+        proficiencia = df_chunk[f'PROFICIENCIA_{disciplina}'].to_numpy(dtype=float)
+
+        respostas = matriz_respostas(df_chunk[coluna_resposta], posicoes.max() + 1)[:, posicoes]
+        codigos = CODIGOS_ALTERNATIVA[respostas]
+
+        respondeu = codigos < len(ALTERNATIVAS) - 1
+        acertou = codigos == codigo_gabarito[indices_item]
+        prof_coluna = proficiencia[:, None]
+
+        estatisticas['n'][indices_item] += respondeu.sum(axis=0)
+        estatisticas['acertos'][indices_item] += acertou.sum(axis=0)
+        estatisticas['soma_prof'][indices_item] += (respondeu * prof_coluna).sum(axis=0)
+        estatisticas['soma_prof2'][indices_item] += (respondeu * prof_coluna ** 2).sum(axis=0)
+        estatisticas['soma_prof_acerto'][indices_item] += (acertou * prof_coluna).sum(axis=0)
+
+        # Frequência das alternativas por (item, cluster) com um único bincount
+        n_clusters = estatisticas['n_clusters']
+        chave = (
+            (np.arange(len(indices_item))[None, :] * n_clusters + clusters[:, None]) * len(ALTERNATIVAS)
+            + codigos
+        )
+        contagens = np.bincount(chave.ravel(), minlength=len(indices_item) * n_clusters * len(ALTERNATIVAS))
+        estatisticas['alternativas'][indices_item] += contagens.reshape(len(indices_item), n_clusters, len(ALTERNATIVAS))
+
+
+def finalizar_estatisticas_itens(estatisticas):
+    """Calcula p-valor e ponto-bisserial e retorna (estatísticas por item, frequência das alternativas)."""
+    df_estatisticas = estatisticas['itens'].drop(columns=['COLUNA_RESPOSTA', 'POSICAO_BLOCO']).copy()
+
+    n = estatisticas['n']
+    acertos = estatisticas['acertos']
+    erros = n - acertos
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = acertos / n
+        media = estatisticas['soma_prof'] / n
+        desvio = np.sqrt(np.maximum(estatisticas['soma_prof2'] / n - media ** 2, 0))
+        media_acerto = estatisticas['soma_prof_acerto'] / acertos
+        media_erro = (estatisticas['soma_prof'] - estatisticas['soma_prof_acerto']) / erros
+        ponto_bisserial = (media_acerto - media_erro) / desvio * np.sqrt(p * (1 - p))
+
+    df_estatisticas['N_RESPOSTAS'] = n.astype(np.int64)
+    df_estatisticas['P_VALOR'] = p
+    df_estatisticas['PONTO_BISSERIAL'] = ponto_bisserial
+
+    alternativas = estatisticas['alternativas']
+    n_itens, n_clusters, n_alternativas = alternativas.shape
+    df_alternativas = pd.DataFrame({
+        COLUNA_ID_ITEM: np.repeat(df_estatisticas[COLUNA_ID_ITEM].to_numpy(), n_clusters * n_alternativas),
+        COLUNA_CLUSTER: np.tile(np.repeat(np.arange(n_clusters).astype(str), n_alternativas), n_itens),
+        'ALTERNATIVA': np.tile(ALTERNATIVAS, n_itens * n_clusters),
+        'N_RESPOSTAS': alternativas.ravel(),
+    })
+    df_alternativas = df_alternativas[df_alternativas['N_RESPOSTAS'] > 0].reset_index(drop=True)
+
+    return df_estatisticas, df_alternativas
@@ -0,0 +1,318 @@
+import argparse
+import html
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import plotly.offline
+
+import armazenamento
+import carregamento
+import graficos
+import perfis_habilidades
+
+
+DIRETORIO_SAIDA = 'data/relatorios'
+NIVEIS = {'escola': 'ID_ESCOLA', 'uf': 'ID_UF'}
+FORMATOS = ['html', 'csv']
+N_PIORES_HABILIDADES = 10
+CHUNKSIZE_POOL = 8
+ARQUIVO_PLOTLYJS = 'plotly.min.js'
+
+COLUNAS_ALUNOS = ['ID_ALUNO', 'ID_ESCOLA', 'ID_UF', 'CLUSTER', 'STATUS_RISCO_FINAL', 'PROFICIENCIA_LP', 'PROFICIENCIA_MT']
+
+ESTILO_HTML = """
+body { font-family: Arial, Helvetica, sans-serif; margin: 24px; color: #222; }
+h1 { color: #1f77b4; }
+.kpis { display: flex; gap: 16px; margin: 16px 0; }
+.kpi { border: 1px solid #ddd; border-radius: 6px; padding: 12px 16px; min-width: 160px; }
+.kpi span { display: block; font-size: 0.85em; color: #666; }
+.kpi b { font-size: 1.4em; }
+.graficos { display: flex; flex-wrap: wrap; }
+.graficos > div { flex: 1 1 480px; }
+table { border-collapse: collapse; width: 100%; font-size: 0.9em; }
+th, td { border: 1px solid #ddd; padding: 6px; text-align: left; }
+th { background: #f0f4fa; }
+.nota { color: #666; font-size: 0.85em; }
+"""
+
+# Dados compartilhados com cada processo trabalhador (enviados uma única vez).
+_CONTEXTO = None
+
+
+def _iniciar_trabalhador(contexto):
+    global _CONTEXTO
+    _CONTEXTO = dict(contexto)
+    # O mmap é aberto em cada processo: os arrays não são copiados entre processos.
+    _CONTEXTO['perfis'] = perfis_habilidades.abrir_perfis(contexto['diretorio_perfis'])
+
+
+def caminhos_relatorio(diretorio, nivel, chave, formatos):
+    return {formato: os.path.join(diretorio, f'{nivel}_{chave}.{formato}') for formato in formatos}
+
+
+def _gravar_atomico(caminho, conteudo):
+    """Grava em um arquivo temporário e renomeia, para que uma interrupção não deixe relatório parcial."""
+    temporario = f'{caminho}.tmp'
+    with open(temporario, 'w', encoding='utf-8', newline='') as arquivo:
+        arquivo.write(conteudo)
+    os.replace(temporario, caminho)
+
+
+def taxa_erro_habilidades(contexto, df_grupo):
+    """
+    Taxa de erro por habilidade dos alunos do grupo (escola ou UF).
+
+    Usa os perfis individuais quando existem para a edição; caso contrário, estima a
+    taxa pela média das taxas nacionais de cada cluster ponderada pela composição de
+    clusters do grupo. Retorna (DataFrame, estimado).
+    """
+    perfis = contexto['perfis']
+    if perfis is not None:
+        df_habilidades = perfis_habilidades.buscar_escolas(perfis, df_grupo['ID_ESCOLA'].unique())
+        if df_habilidades is not None:
+            df_habilidades = df_habilidades.rename(columns={'N_ALUNOS': 'N_RESPOSTAS'}).merge(
+                contexto['descricoes'], on=['TP_DISCIPLINA', 'NU_DESCRITOR_HABILIDADE'], how='left'
+            )
+            return df_habilidades.dropna(subset=['TAXA_ERRO']), False
+
+    df_diag = contexto['diagnostico']
+    pesos = df_diag['CLUSTER'].map(df_grupo['CLUSTER'].value_counts()).fillna(0)
+    df_diag = df_diag.assign(PESO=pesos, ERRO_PONDERADO=df_diag['TAXA_ERRO'] * pesos)
+    df_habilidades = df_diag.groupby(
+        ['TP_DISCIPLINA', 'NU_DESCRITOR_HABILIDADE', 'DESCRICAO_HABILIDADE'], as_index=False
+    )[['ERRO_PONDERADO', 'PESO']].sum()
+    df_habilidades = df_habilidades[df_habilidades['PESO'] > 0]
+    df_habilidades['TAXA_ERRO'] = df_habilidades['ERRO_PONDERADO'] / df_habilidades['PESO']
+    return df_habilidades.drop(columns=['ERRO_PONDERADO', 'PESO']), True
+
+
+def _ocultar_habilidades(df_habilidades, serie):
+    ocultar = carregamento.HABILIDADES_OCULTAR.get(serie, {})
+    manter = pd.Series(True, index=df_habilidades.index)
+    for disciplina, descritores in ocultar.items():
+        manter &= ~((df_habilidades['TP_DISCIPLINA'] == disciplina) &
+                    (df_habilidades['NU_DESCRITOR_HABILIDADE'].isin(descritores)))
+    return df_habilidades[manter]
+
+
+def _titulo_grupo(nivel, chave, df_grupo):
+    if nivel == 'uf':
+        return f"UF {carregamento.MAPA_UF.get(int(chave), chave)}"
+    uf = carregamento.MAPA_UF.get(int(df_grupo['ID_UF'].iloc[0]), 'UF Desconhecida')
+    return f"Escola {chave} ({uf})"
+
+
+def renderizar_html(contexto, nivel, chave, df_grupo, df_habilidades, estimado):
+    """Monta o relatório HTML do grupo com os mesmos gráficos e tabelas do painel."""
+    titulo = _titulo_grupo(nivel, chave, df_grupo)
+    kpis = graficos.calcular_kpis(df_grupo)
+
+    # O plotly.js vai embutido na primeira figura (relatório autocontido) ou em um arquivo compartilhado.
+    plotlyjs = [True if contexto['plotlyjs'] == 'embutido' else ARQUIVO_PLOTLYJS]
+
+    def figura_html(fig):
+        incluir = plotlyjs[0]
+        plotlyjs[0] = False
+        return fig.to_html(full_html=False, include_plotlyjs=incluir)
+
+    partes = [
+        '<!DOCTYPE html>',
+        '<html lang="pt-BR"><head><meta charset="utf-8">',
+        f'<title>{html.escape(titulo)} - SAEB {contexto["edicao"]} {contexto["serie"]}</title>',
+        f'<style>{ESTILO_HTML}</style></head><body>',
+        f'<h1>Relatório de Diagnóstico - {html.escape(titulo)}</h1>',
+        f'<p>SAEB {contexto["edicao"]} - Série {contexto["serie"]}</p>',
+        '<div class="kpis">',
+        f'<div class="kpi"><span>Total de Alunos</span><b>{kpis["TOTAL_ALUNOS"]:,}</b></div>'.replace(",", "."),
+        f'<div class="kpi"><span>Alunos em Risco (Alto ou Mod.)</span><b>{kpis["ALUNOS_RISCO"]:,}</b></div>'.replace(",", "."),
+        f'<div class="kpi"><span>Proficiência Média (LP)</span><b>{kpis["MEDIA_LP"]:.2f}</b></div>',
+        f'<div class="kpi"><span>Proficiência Média (MT)</span><b>{kpis["MEDIA_MT"]:.2f}</b></div>',
+        '</div>',
+        '<div class="graficos">',
+        f'<div>{figura_html(graficos.figura_risco(df_grupo))}</div>',
+        f'<div>{figura_html(graficos.figura_cluster(df_grupo, contexto["cluster_legend"]))}</div>',
+        '</div>',
+    ]
+
+    if estimado:
+        partes.append(
+            '<p class="nota">Taxas de erro por habilidade estimadas a partir da composição de clusters '
+            'do grupo (perfis individuais indisponíveis para esta edição).</p>'
+        )
+
+    for disciplina, df_disciplina in df_habilidades.groupby('TP_DISCIPLINA'):
+        partes.append(f'<h2>Habilidades com Maior Dificuldade - {html.escape(disciplina)}</h2>')
+        partes.append(figura_html(graficos.figura_top_habilidades(df_disciplina, disciplina, N_PIORES_HABILIDADES)))
+        df_tabela = graficos.tabela_habilidades(df_disciplina, ordenar_por_erro=True).head(N_PIORES_HABILIDADES)
+        partes.append(df_tabela.to_html(index=False, border=0))
+
+    partes.append('</body></html>')
+    return '\n'.join(partes)
+
+
+def gerar_relatorio(tarefa):
+    """Gera os arquivos de um grupo. Retorna (chave, erro), com erro None em caso de sucesso."""
+    nivel, chave, df_grupo = tarefa
+    contexto = _CONTEXTO
+    try:
+        df_habilidades, estimado = taxa_erro_habilidades(contexto, df_grupo)
+        df_habilidades = _ocultar_habilidades(df_habilidades, contexto['serie'])
+        caminhos = caminhos_relatorio(contexto['diretorio'], nivel, chave, contexto['formatos'])
+
+        if 'csv' in caminhos:
+            df_csv = df_habilidades.sort_values(by=['TP_DISCIPLINA', 'TAXA_ERRO'], ascending=[True, False])
+            df_csv = df_csv.assign(**{NIVEIS[nivel]: chave, 'ESTIMADO': int(estimado)})
+            _gravar_atomico(caminhos['csv'], df_csv.to_csv(sep=';', index=False))
+        if 'html' in caminhos:
+            _gravar_atomico(caminhos['html'], renderizar_html(contexto, nivel, chave, df_grupo, df_habilidades, estimado))
+        return chave, None
+    except Exception as e:
+        return chave, f'{type(e).__name__}: {e}'
+
+
+def resumir_grupos(df_alunos, nivel):
+    """Tabela com uma linha por grupo: KPIs, contagem por status de risco e por cluster."""
+    coluna = NIVEIS[nivel]
+    agrupado = df_alunos.groupby(coluna)
+    df_resumo = pd.DataFrame({
+        'TOTAL_ALUNOS': agrupado['ID_ALUNO'].nunique(),
+        'MEDIA_LP': agrupado['PROFICIENCIA_LP'].mean().round(2),
+        'MEDIA_MT': agrupado['PROFICIENCIA_MT'].mean().round(2),
+    })
+    if nivel == 'escola':
+        df_resumo.insert(0, 'ID_UF', agrupado['ID_UF'].first())
+    status = pd.crosstab(df_alunos[coluna], df_alunos['STATUS_RISCO_FINAL'])
+    clusters = pd.crosstab(df_alunos[coluna], df_alunos['CLUSTER']).add_prefix('CLUSTER_')
+    return df_resumo.join(status).join(clusters).reset_index()
+
+
+def _imprimir_progresso(concluidos, total, inicio, falhas):
+    decorrido = time.perf_counter() - inicio
+    por_minuto = concluidos / decorrido * 60 if decorrido > 0 else 0.0
+    restante = (total - concluidos) / por_minuto if por_minuto > 0 else float('nan')
+    sys.stdout.write(
+        f"\r{concluidos}/{total} relatórios ({por_minuto:,.0f}/min, ~{restante:.1f} min restantes, {falhas} falhas)"
+    )
+    sys.stdout.flush()
+
+
+def exportar_relatorios(serie, edicao=armazenamento.EDICAO_ATUAL, nivel='escola', formatos=FORMATOS,
+                        diretorio_saida=DIRETORIO_SAIDA, processos=None, plotlyjs='embutido',
+                        refazer=False, limite=None, ufs=None):
+    """
+    Gera um relatório (HTML e/ou CSV) por escola ou por UF em um pool de processos.
+
+    Relatórios já existentes são pulados, então uma exportação interrompida é retomada
+    de onde parou (use `refazer=True` para regerar tudo). Retorna um dicionário com o
+    número de relatórios gerados, pulados e com falha e o tempo gasto.
+    """
+    df_alunos, df_diag_completo = carregamento.carregar_dados(serie, edicao)
+    if df_alunos is None:
+        return None
+
+    df_alunos = df_alunos[COLUNAS_ALUNOS]
+    if ufs is not None:
+        df_alunos = df_alunos[df_alunos['ID_UF'].isin(ufs)]
+
+    # Alunos sem escola/UF não formam grupo: uma chave nula nunca seria gravada e a
+    # retomada não terminaria. As chaves viram inteiros para nomear os arquivos ('escola_50001').
+    coluna = NIVEIS[nivel]
+    sem_chave = df_alunos[coluna].isna()
+    if sem_chave.any():
+        print(f"AVISO: {int(sem_chave.sum())} alunos sem {coluna} ignorados na exportação por {nivel}.")
+        df_alunos = df_alunos[~sem_chave]
+    df_alunos = df_alunos.assign(**{coluna: df_alunos[coluna].astype('int64')})
+
+    diretorio = os.path.join(diretorio_saida, str(edicao), serie, nivel)
+    os.makedirs(diretorio, exist_ok=True)
+    if 'html' in formatos and plotlyjs == 'arquivo':
+        caminho_plotlyjs = os.path.join(diretorio, ARQUIVO_PLOTLYJS)
+        if not os.path.exists(caminho_plotlyjs):
+            _gravar_atomico(caminho_plotlyjs, plotly.offline.get_plotlyjs())
+
+    caminho_resumo = os.path.join(diretorio, f'resumo_{nivel}.csv')
+    resumir_grupos(df_alunos, nivel).to_csv(caminho_resumo, sep=';', index=False, encoding='utf-8')
+    print(f"Resumo por {nivel} salvo em '{caminho_resumo}'.")
+
+    chaves = np.sort(df_alunos[coluna].unique())
+    pendentes = [
+        chave for chave in chaves
+        if refazer or not all(os.path.exists(c) for c in caminhos_relatorio(diretorio, nivel, chave, formatos).values())
+    ]
+    pulados = len(chaves) - len(pendentes)
+    if limite is not None:
+        pendentes = pendentes[:limite]
+    print(f"{len(chaves)} grupos por {nivel}: {pulados} já exportados, {len(pendentes)} a gerar.")
+
+    contexto = {
+        'serie': serie,
+        'edicao': edicao,
+        'diretorio': diretorio,
+        'formatos': list(formatos),
+        'plotlyjs': plotlyjs,
+        'cluster_legend': carregamento.CONFIG_APP_SERIES[serie]['CLUSTER_LEGEND'],
+        'diagnostico': df_diag_completo[['CLUSTER', 'TP_DISCIPLINA', 'NU_DESCRITOR_HABILIDADE', 'DESCRICAO_HABILIDADE', 'TAXA_ERRO']],
+        'descricoes': df_diag_completo[
+            ['TP_DISCIPLINA', 'NU_DESCRITOR_HABILIDADE', 'DESCRICAO_HABILIDADE']
+        ].drop_duplicates(subset=['TP_DISCIPLINA', 'NU_DESCRITOR_HABILIDADE']),
+        'diretorio_perfis': armazenamento.diretorio_perfis(serie, edicao),
+    }
+
+    grupos = df_alunos[df_alunos[coluna].isin(pendentes)].groupby(coluna)
+    tarefas = ((nivel, chave, df_grupo) for chave, df_grupo in grupos)
+
+    inicio = time.perf_counter()
+    concluidos = 0
+    falhas = []
+    if pendentes:
+        with ProcessPoolExecutor(
+            max_workers=processos or os.cpu_count(),
+            initializer=_iniciar_trabalhador,
+            initargs=(contexto,)
+        ) as executor:
+            for chave, erro in executor.map(gerar_relatorio, tarefas, chunksize=CHUNKSIZE_POOL):
+                concluidos += 1
+                if erro is not None:
+                    falhas.append((chave, erro))
+                if concluidos % CHUNKSIZE_POOL == 0 or concluidos == len(pendentes):
+                    _imprimir_progresso(concluidos, len(pendentes), inicio, len(falhas))
+        print()
+
+    segundos = time.perf_counter() - inicio
+    for chave, erro in falhas:
+        print(f"AVISO: relatório de {nivel} {chave} não gerado ({erro}).")
+    print(f"{concluidos - len(falhas)} relatórios gerados em '{diretorio}' em {segundos:.1f}s.")
+
+    return {
+        'GERADOS': concluidos - len(falhas),
+        'PULADOS': pulados,
+        'FALHAS': len(falhas),
+        'SEGUNDOS': segundos,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta relatórios de diagnóstico por escola ou por UF.")
+    parser.add_argument('series', nargs='*', default=list(carregamento.ARQUIVOS_SERIES.keys()))
+    parser.add_argument('--edicao', type=int, default=armazenamento.EDICAO_ATUAL)
+    parser.add_argument('--nivel', choices=list(NIVEIS), default='escola')
+    parser.add_argument('--formatos', nargs='+', choices=FORMATOS, default=FORMATOS)
+    parser.add_argument('--saida', default=DIRETORIO_SAIDA)
+    parser.add_argument('--processos', type=int, default=None)
+    parser.add_argument('--plotlyjs', choices=['embutido', 'arquivo'], default='embutido',
+                        help="'embutido' gera HTML autocontido; 'arquivo' grava o plotly.js uma vez no diretório (relatórios menores).")
+    parser.add_argument('--ufs', type=int, nargs='*', default=None, help="Exporta apenas as UFs informadas (ID_UF).")
+    parser.add_argument('--limite', type=int, default=None, help="Gera no máximo N relatórios nesta execução.")
+    parser.add_argument('--refazer', action='store_true', help="Regera relatórios já existentes.")
+    args = parser.parse_args()
+
+    for serie in args.series:
+        print(f"\n--- Exportação de relatórios por {args.nivel} ({serie}, edição {args.edicao}) ---")
+        exportar_relatorios(
+            serie, args.edicao, args.nivel, args.formatos, args.saida, args.processos,
+            args.plotlyjs, args.refazer, args.limite, args.ufs
+        )
@@ -0,0 +1,274 @@
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+# Construtores de gráficos e tabelas do painel, sem dependência do Streamlit: o painel
+# (app.py) exibe as figuras e a exportação em lote as grava em HTML.
+
+COR_PRIMARIA_AZUL = '#1f77b4'
+COR_SECUNDARIA_VERDE = '#2ca02c'
+COR_ALTO_RISCO = '#17becf'
+COR_MODERADO = '#9467bd'
+COR_NORMAL = COR_SECUNDARIA_VERDE
+COR_SUPERDOTACAO = '#ff7f0e'
+COR_MAPA_RISCO = {
+    'Alto Risco': COR_ALTO_RISCO, 'Risco Moderado': COR_MODERADO,
+    'Normal': COR_NORMAL, 'Superdotação': COR_SUPERDOTACAO
+}
+
+# Mapa em grade (tile grid) das UFs: (coluna, linha) de cada ID_UF, aproximando a
+# posição geográfica sem depender de arquivos de fronteiras (GeoJSON).
+GRADE_UF = {
+    14: ('RR', 2, 0), 16: ('AP', 4, 0),
+    13: ('AM', 2, 1), 15: ('PA', 3, 1), 21: ('MA', 4, 1), 23: ('CE', 5, 1), 24: ('RN', 6, 1),
+    12: ('AC', 0, 2), 11: ('RO', 1, 2), 51: ('MT', 2, 2), 17: ('TO', 3, 2), 22: ('PI', 4, 2), 26: ('PE', 5, 2), 25: ('PB', 6, 2),
+    50: ('MS', 2, 3), 52: ('GO', 3, 3), 53: ('DF', 4, 3), 29: ('BA', 5, 3), 27: ('AL', 6, 3),
+    35: ('SP', 3, 4), 31: ('MG', 4, 4), 32: ('ES', 5, 4), 28: ('SE', 6, 4),
+    41: ('PR', 3, 5), 33: ('RJ', 4, 5),
+    42: ('SC', 3, 6),
+    43: ('RS', 3, 7),
+}
+
+
+def calcular_kpis(df_alunos: pd.DataFrame) -> Dict[str, Any]:
+    """Total de alunos, alunos em risco (alto ou moderado) e proficiências médias."""
+    return {
+        'TOTAL_ALUNOS': df_alunos['ID_ALUNO'].nunique(),
+        'ALUNOS_RISCO': df_alunos[
+            df_alunos['STATUS_RISCO_FINAL'].isin(['Alto Risco', 'Risco Moderado'])
+        ]['ID_ALUNO'].nunique(),
+        'MEDIA_LP': df_alunos['PROFICIENCIA_LP'].mean(),
+        'MEDIA_MT': df_alunos['PROFICIENCIA_MT'].mean(),
+    }
+
+
+def figura_risco(df_alunos: pd.DataFrame) -> go.Figure:
+    """Gráfico de pizza de Status de Risco."""
+    df_pizza = df_alunos['STATUS_RISCO_FINAL'].value_counts().reset_index()
+
+    return px.pie(
+        df_pizza,
+        names='STATUS_RISCO_FINAL',
+        values='count',
+        title="Alunos por Status de Risco",
+        hole=0.3,
+        color='STATUS_RISCO_FINAL',
+        color_discrete_map=COR_MAPA_RISCO
+    )
+
+
+def figura_cluster(df_alunos: pd.DataFrame, cluster_legend: Dict[str, str]) -> go.Figure:
+    """Gráfico de barras de Contagem por Cluster."""
+    df_barras = df_alunos['CLUSTER'].value_counts().reset_index().sort_values(by='CLUSTER')
+
+    df_barras['CLUSTER_DESCRICAO'] = df_barras['CLUSTER'].map(cluster_legend).fillna(
+        df_barras['CLUSTER'].apply(lambda c: f"Cluster {c} (Sem Legenda)")
+    )
+
+    fig_barras = px.bar(
+        df_barras,
+        x='CLUSTER_DESCRICAO',
+        y='count',
+        title="Alunos por Cluster",
+        labels={'count': 'Número de Alunos', 'CLUSTER_DESCRICAO': 'Cluster de Risco'},
+        color_discrete_sequence=[COR_PRIMARIA_AZUL]
+    )
+    fig_barras.update_xaxes(tickangle=45)
+    return fig_barras
+
+
+def figura_heatmap_habilidade(df_diag: pd.DataFrame, cluster_legend: Dict[str, str], disciplina_selec: str) -> go.Figure:
+    """Mapa de calor da Taxa de Erro por Habilidade e Cluster."""
+    df_heatmap_pivot = df_diag.pivot_table(
+        index='NU_DESCRITOR_HABILIDADE',
+        columns='CLUSTER',
+        values='TAXA_ERRO'
+    )
+
+    z_values = df_heatmap_pivot.values
+    x_clusters = df_heatmap_pivot.columns.tolist()
+    y_descritores = df_heatmap_pivot.index.tolist()
+
+    # Intervalo de confiança (Wilson, 95%) gerado pelo diagnóstico; ausente em arquivos antigos
+    tem_intervalo = {'TAXA_ERRO_IC_INF', 'TAXA_ERRO_IC_SUP', 'N_RESPOSTAS'}.issubset(df_diag.columns)
+    if tem_intervalo:
+        df_intervalo_pivot = df_diag.pivot_table(
+            index='NU_DESCRITOR_HABILIDADE',
+            columns='CLUSTER',
+            values=['TAXA_ERRO_IC_INF', 'TAXA_ERRO_IC_SUP', 'N_RESPOSTAS']
+        )
+
+    df_descricoes = df_diag[['NU_DESCRITOR_HABILIDADE', 'DESCRICAO_HABILIDADE']].drop_duplicates()
+    descricoes_lookup = df_descricoes.set_index('NU_DESCRITOR_HABILIDADE')['DESCRICAO_HABILIDADE'].to_dict()
+
+    hover_text = []
+    annotations = []
+
+    for i, descritor in enumerate(y_descritores):
+        row_text = []
+        descricao = descricoes_lookup.get(descritor, "Descrição não encontrada")
+
+        for j, cluster in enumerate(x_clusters):
+            erro = df_heatmap_pivot.loc[descritor, cluster]
+            cluster_desc = cluster_legend.get(cluster, f"Cluster {cluster}")
+
+            if not pd.isna(erro):
+                hover_item = (
+                    f"<b>Cluster:</b> {cluster} ({cluster_desc})<br>"
+                    f"<b>Código:</b> {descritor}<br>"
+                    f"<b>Habilidade:</b> {descricao}<br>"
+                    f"<b>Taxa de Erro:</b> {erro:.2%}"
+                )
+                if tem_intervalo:
+                    hover_item += (
+                        f"<br><b>IC 95%:</b> {df_intervalo_pivot.loc[descritor, ('TAXA_ERRO_IC_INF', cluster)]:.2%}"
+                        f" a {df_intervalo_pivot.loc[descritor, ('TAXA_ERRO_IC_SUP', cluster)]:.2%}"
+                        f" (n = {df_intervalo_pivot.loc[descritor, ('N_RESPOSTAS', cluster)]:,.0f})".replace(",", ".")
+                    )
+                row_text.append(hover_item)
+
+                annotations.append({
+                    'x': x_clusters[j], 'y': y_descritores[i], 'text': f"{erro:.0%}",
+                    'xref': 'x1', 'yref': 'y1', 'showarrow': False,
+                    'font': {'color': 'black', 'size': 10}
+                })
+            else:
+                hover_item = f"<b>Código:</b> {descritor}<br><b>Habilidade:</b> {descricao}<br>Dados não disponíveis<extra></extra>"
+                row_text.append(hover_item)
+        hover_text.append(row_text)
+
+    fig_heatmap = go.Figure(data=go.Heatmap(
+        z=z_values, x=x_clusters, y=y_descritores, colorscale='Greens',
+        text=hover_text, hoverinfo="text", name='Taxa de Erro',
+        hovertemplate="%{text}<extra></extra>"
+    ))
+
+    fig_heatmap.update_layout(
+        title_text=f"Mapa de Calor: Taxa de Erro por Habilidade e Cluster ({disciplina_selec})",
+        yaxis_title='', xaxis_title='Cluster',
+        height=max(600, len(y_descritores) * 25),
+        annotations=annotations # Adiciona as anotações aqui
+    )
+    return fig_heatmap
+
+
+def figura_top_habilidades(df_diag: pd.DataFrame, disciplina_selec: str, n: int = 10) -> go.Figure:
+    """Gráfico de barras das `n` habilidades com maior taxa de erro média."""
+    df_top10 = df_diag.groupby(['NU_DESCRITOR_HABILIDADE', 'DESCRICAO_HABILIDADE'])['TAXA_ERRO'].mean()
+    df_top10 = df_top10.nlargest(n).reset_index()
+
+    fig_top10 = px.bar(
+        df_top10,
+        x='NU_DESCRITOR_HABILIDADE',
+        y='TAXA_ERRO',
+        hover_data={
+            'NU_DESCRITOR_HABILIDADE': False,
+            'TAXA_ERRO': ':.2%'
+        },
+        title=f"Top {n} Dificuldades - {disciplina_selec}",
+        labels={'TAXA_ERRO': 'Taxa de Erro Média', 'NU_DESCRITOR_HABILIDADE': 'Habilidade (Código)'},
+        color_discrete_sequence=[COR_SECUNDARIA_VERDE],
+    )
+
+    fig_top10.update_traces(
+        hovertemplate=
+            "<b>Código:</b> %{x}<br>" +
+            "<b>Habilidade:</b> %{customdata[0]}<br>" +
+            "<b>Taxa de Erro:</b> %{y}<extra></extra>",
+        customdata=df_top10[['DESCRICAO_HABILIDADE']]
+    )
+
+    fig_top10.update_layout(
+        xaxis={'categoryorder':'total descending'}
+    )
+
+    fig_top10.update_yaxes(tickformat=".0%")
+    return fig_top10
+
+
+def tabela_habilidades(df_diag: pd.DataFrame, ordenar_por_erro: bool = False) -> pd.DataFrame:
+    """Tabela de taxa de erro média por habilidade, com colunas renomeadas e taxa formatada."""
+    df_tabela_completa = df_diag.groupby(['NU_DESCRITOR_HABILIDADE', 'DESCRICAO_HABILIDADE'])['TAXA_ERRO'].mean().reset_index()
+
+    df_tabela_completa.rename(
+        columns={'NU_DESCRITOR_HABILIDADE': 'Habilidade', 'DESCRICAO_HABILIDADE': 'Descrição', 'TAXA_ERRO': 'Taxa de Erro Média'},
+        inplace=True
+    )
+
+    if ordenar_por_erro:
+        df_tabela_completa = df_tabela_completa.sort_values(by='Taxa de Erro Média', ascending=False)
+    else:
+        df_tabela_completa = df_tabela_completa.sort_values(
+            by=['Habilidade', 'Taxa de Erro Média'],
+            ascending=[True, False]
+        )
+
+    df_tabela_completa['Taxa de Erro Média'] = df_tabela_completa['Taxa de Erro Média'].apply(lambda x: f"{x:.2%}")
+    return df_tabela_completa
+
+
+def figura_mapa_uf(df_ufs: pd.DataFrame, coluna: str, titulo: str, formato: str = '.1%') -> go.Figure:
+    """Mapa em grade das UFs colorido por `coluna`; UFs sem dados aparecem em cinza."""
+    valores = df_ufs.set_index('ID_UF')[coluna].to_dict()
+    alunos = df_ufs.set_index('ID_UF')['TOTAL_ALUNOS'].to_dict()
+
+    ids_uf = list(GRADE_UF)
+    siglas = [GRADE_UF[uf][0] for uf in ids_uf]
+    x = [GRADE_UF[uf][1] for uf in ids_uf]
+    y = [-GRADE_UF[uf][2] for uf in ids_uf]
+    z = [valores.get(uf, np.nan) for uf in ids_uf]
+    hover = [
+        f"<b>{sigla}</b><br>{titulo}: {valor:{formato}}<br>Alunos: {alunos.get(uf, 0):,.0f}".replace(",", ".")
+        if pd.notna(valor) else f"<b>{sigla}</b><br>Sem dados"
+        for uf, sigla, valor in zip(ids_uf, siglas, z)
+    ]
+
+    fig_mapa = go.Figure()
+    com_dados = [i for i, valor in enumerate(z) if pd.notna(valor)]
+    sem_dados = [i for i, valor in enumerate(z) if pd.isna(valor)]
+    for indices, marcador in [
+        (sem_dados, {'color': '#dddddd'}),
+        (com_dados, {'color': [z[i] for i in com_dados], 'colorscale': 'Greens',
+                     'colorbar': {'title': titulo, 'tickformat': formato}, 'showscale': True}),
+    ]:
+        if not indices:
+            continue
+        fig_mapa.add_trace(go.Scatter(
+            x=[x[i] for i in indices], y=[y[i] for i in indices],
+            text=[siglas[i] for i in indices], customdata=[hover[i] for i in indices],
+            mode='markers+text', textfont={'color': 'black', 'size': 12},
+            marker={'symbol': 'square', 'size': 46, 'line': {'color': 'white', 'width': 1}, **marcador},
+            hovertemplate="%{customdata}<extra></extra>", showlegend=False
+        ))
+
+    fig_mapa.update_layout(
+        title_text=f"{titulo} por UF",
+        height=560,
+        plot_bgcolor='white',
+        xaxis={'visible': False, 'range': [-0.7, 6.7]},
+        yaxis={'visible': False, 'range': [-7.7, 0.7], 'scaleanchor': 'x'},
+    )
+    return fig_mapa
+
+
+def figura_simulacao_status(contagens_atuais: pd.Series, contagens_simuladas: pd.Series) -> go.Figure:
+    """Barras agrupadas de alunos por status: limiares atuais x simulados."""
+    df_barras = pd.DataFrame({'Atual': contagens_atuais, 'Simulado': contagens_simuladas}).fillna(0)
+    df_barras.index.name = 'STATUS_RISCO_FINAL'
+    df_barras = df_barras.reset_index().melt(id_vars='STATUS_RISCO_FINAL', var_name='CENARIO', value_name='N_ALUNOS')
+
+    return px.bar(
+        df_barras,
+        x='STATUS_RISCO_FINAL',
+        y='N_ALUNOS',
+        color='CENARIO',
+        barmode='group',
+        title="Alunos por Status de Risco: Atual x Simulado",
+        labels={'STATUS_RISCO_FINAL': 'Status de Risco', 'N_ALUNOS': 'Número de Alunos', 'CENARIO': 'Cenário'},
+        category_orders={'STATUS_RISCO_FINAL': list(COR_MAPA_RISCO)},
+        color_discrete_sequence=[COR_PRIMARIA_AZUL, COR_MODERADO]
+    )
@@ -0,0 +1,178 @@
+import gzip
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    PYARROW_DISPONIVEL = True
+except ImportError:
+    PYARROW_DISPONIVEL = False
+
+
+# Motor usado por padrão: 'pyarrow' (multithread, com projeção de colunas e tipos
+# explícitos) quando disponível, ou o leitor C do pandas usado originalmente.
+MOTOR_PADRAO = os.environ.get('SAEB_MOTOR_LEITURA', 'pyarrow' if PYARROW_DISPONIVEL else 'c')
+
+# Tamanho do bloco de bytes lido por vez pelo pyarrow no modo em blocos.
+TAMANHO_BLOCO_BYTES = 16 * 1024 * 1024
+
+ENCODINGS_PYARROW = {'latin-1': 'latin1', 'latin1': 'latin1', 'utf-8': 'utf8', 'utf8': 'utf8'}
+
+TIPOS_PYARROW = {
+    str: 'string', 'str': 'string', 'string': 'string', object: 'string',
+    int: 'int64', 'int': 'int64', 'int64': 'int64', 'int32': 'int32', 'Int64': 'int64',
+    float: 'float64', 'float': 'float64', 'float64': 'float64', 'float32': 'float32',
+}
+
+
+def ler_cabecalho(caminho, sep=';', encoding='latin-1'):
+    """Retorna a lista de colunas do arquivo (gzip ou texto) sem ler os dados."""
+    abrir = gzip.open if str(caminho).endswith('.gz') else open
+    with abrir(caminho, 'rb') as arquivo:
+        primeira_linha = arquivo.readline()
+    return [c.strip().strip('"') for c in primeira_linha.decode(encoding).rstrip('\r\n').split(sep)]
+
+
+def _colunas_projetadas(caminho, colunas, sep, encoding):
+    """
+    Retorna as colunas pedidas na ordem do arquivo. Como o `usecols` do pandas, falha
+    com ValueError se alguma coluna pedida não existir no arquivo.
+    """
+    if colunas is None:
+        return None
+    cabecalho = ler_cabecalho(caminho, sep, encoding)
+    ausentes = [c for c in colunas if c not in cabecalho]
+    if ausentes:
+        raise ValueError(f"Colunas ausentes em {caminho}: {', '.join(ausentes)}.")
+    pedidas = set(colunas)
+    return [c for c in cabecalho if c in pedidas]
+
+
+def _tipos_por_coluna(caminho, colunas, dtype, sep, encoding):
+    """Expande um tipo único (ex.: dtype=str) para todas as colunas lidas."""
+    if dtype is None or isinstance(dtype, dict):
+        return dtype
+    return {coluna: dtype for coluna in (colunas or ler_cabecalho(caminho, sep, encoding))}
+
+
+def _opcoes_pyarrow(colunas, dtype, sep, encoding, usar_threads, tamanho_bloco=None):
+    tipos = {}
+    for coluna, tipo in (dtype or {}).items():
+        nome_tipo = TIPOS_PYARROW.get(tipo, tipo if isinstance(tipo, str) else None)
+        if nome_tipo is None:
+            raise ValueError(f"Tipo {tipo!r} da coluna {coluna} não suportado pelo motor pyarrow.")
+        tipos[coluna] = pa.type_for_alias(nome_tipo)
+
+    read_options = pa_csv.ReadOptions(
+        encoding=ENCODINGS_PYARROW.get(encoding.lower(), encoding),
+        use_threads=usar_threads,
+        **({'block_size': tamanho_bloco} if tamanho_bloco else {})
+    )
+    parse_options = pa_csv.ParseOptions(delimiter=sep)
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=colunas,
+        column_types=tipos,
+        strings_can_be_null=True
+    )
+    return read_options, parse_options, convert_options
+
+
+def _ler_pyarrow(caminho, colunas, dtype, sep, encoding):
+    opcoes = _opcoes_pyarrow(colunas, dtype, sep, encoding, usar_threads=True)
+    tabela = pa_csv.read_csv(caminho, *opcoes)
+    return tabela.to_pandas()
+
+
+def _ler_pandas(caminho, colunas, dtype, sep, encoding, **kwargs):
+    return pd.read_csv(
+        caminho,
+        sep=sep,
+        encoding=encoding,
+        usecols=colunas,
+        dtype=dtype,
+        low_memory=False,
+        **kwargs
+    )
+
+
+def ler_csv(caminho, colunas=None, dtype=None, sep=';', encoding='latin-1', motor=None):
+    """
+    Lê um CSV do INEP (ou uma saída .csv.gz do pipeline) para um DataFrame.
+
+    Com o motor 'pyarrow' o parsing é multithread e apenas as colunas pedidas são
+    convertidas. Em caso de falha do pyarrow, volta para o leitor C do pandas.
+    """
+    motor = motor or MOTOR_PADRAO
+    colunas = _colunas_projetadas(caminho, colunas, sep, encoding)
+    dtype = _tipos_por_coluna(caminho, colunas, dtype, sep, encoding)
+
+    if motor == 'pyarrow' and PYARROW_DISPONIVEL:
+        try:
+            return _ler_pyarrow(caminho, colunas, dtype, sep, encoding)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, ValueError) as e:
+            print(f"AVISO: leitura com pyarrow falhou para {caminho} ({e}). Usando o leitor do pandas.")
+
+    return _ler_pandas(caminho, colunas, dtype, sep, encoding)
+
+
+def _blocos_pyarrow(caminho, colunas, dtype, sep, encoding, chunksize):
+    opcoes = _opcoes_pyarrow(colunas, dtype, sep, encoding, usar_threads=True,
+                             tamanho_bloco=TAMANHO_BLOCO_BYTES)
+    leitor = pa_csv.open_csv(caminho, *opcoes)
+
+    pendentes = []
+    linhas_pendentes = 0
+    for lote in leitor:
+        pendentes.append(lote)
+        linhas_pendentes += lote.num_rows
+
+        while linhas_pendentes >= chunksize:
+            tabela = pa.Table.from_batches(pendentes)
+            yield tabela.slice(0, chunksize).to_pandas()
+            resto = tabela.slice(chunksize)
+            pendentes = resto.to_batches()
+            linhas_pendentes = resto.num_rows
+
+    if linhas_pendentes:
+        yield pa.Table.from_batches(pendentes).to_pandas()
+
+
+def _blocos_com_alternativa(caminho, colunas, dtype, sep, encoding, chunksize):
+    """
+    Lê em blocos com o pyarrow e, se ele falhar, continua com o leitor do pandas a
+    partir da primeira linha ainda não entregue (como ler_csv faz na leitura única).
+    """
+    linhas_entregues = 0
+    try:
+        for df_bloco in _blocos_pyarrow(caminho, colunas, dtype, sep, encoding, chunksize):
+            yield df_bloco
+            linhas_entregues += len(df_bloco)
+        return
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, ValueError) as e:
+        print(f"AVISO: leitura em blocos com pyarrow falhou para {caminho} após {linhas_entregues} linhas ({e}). "
+              "Usando o leitor do pandas.")
+
+    # A linha 0 é o cabeçalho; as linhas de dados já entregues são puladas.
+    yield from _ler_pandas(caminho, colunas, dtype, sep, encoding, iterator=True, chunksize=chunksize,
+                           skiprows=lambda i: 0 < i <= linhas_entregues)
+
+
+def ler_csv_em_blocos(caminho, chunksize, colunas=None, dtype=None, sep=';', encoding='latin-1', motor=None):
+    """
+    Gera DataFrames de até `chunksize` linhas lendo o arquivo em fluxo.
+
+    No motor 'pyarrow' os lotes (record batches) são lidos em fluxo e reagrupados no
+    tamanho pedido. Colunas sem tipo em `dtype` têm o tipo inferido pelo primeiro
+    lote, então os caminhos em blocos devem informar o tipo de todas as colunas.
+    Em caso de falha do pyarrow, a leitura continua com o leitor C do pandas.
+    """
+    motor = motor or MOTOR_PADRAO
+    colunas = _colunas_projetadas(caminho, colunas, sep, encoding)
+    dtype = _tipos_por_coluna(caminho, colunas, dtype, sep, encoding)
+
+    if motor == 'pyarrow' and PYARROW_DISPONIVEL:
+        return _blocos_com_alternativa(caminho, colunas, dtype, sep, encoding, chunksize)
+
+    return _ler_pandas(caminho, colunas, dtype, sep, encoding, iterator=True, chunksize=chunksize)
@@ -1,82 +1,300 @@
-def calculate_risk_indicators(self):
-    """Calcula indicadores de risco de aprendizagem para ambos os anos"""
-    print("\n=== CÁLCULO DE INDICADORES DE RISCO ===")
-    
-    # Para o 5º EF
-    self.df_5ef_clean['MEDIA_PROFICIENCIAS'] = (
-        self.df_5ef_clean['PROFICIENCIA_LP'] + self.df_5ef_clean['PROFICIENCIA_MT']
-    ) / 2
-    
-    self.df_5ef_clean['DISCREPANCIA_LP_MT'] = (
-        abs(self.df_5ef_clean['PROFICIENCIA_LP'] - self.df_5ef_clean['PROFICIENCIA_MT'])
+import os
+
+import numpy as np
+import pandas as pd
+
+import armazenamento
+import leitura
+import quantis
+from configuracao import CONFIG_SERIES, QUANTIL_DISCREPANCIA, QUANTIL_RISCO
+
+
+ARQUIVOS_RESULTADOS = {
+    '5EF': 'data/resultados_finais_5EF.csv.gz',
+    '9EF': 'data/resultados_finais_9EF.csv.gz'
+}
+DIRETORIO_RELATORIOS = 'data/processed'
+
+COLUNAS_RELATORIO = ['ID_ESCOLA', 'ID_UF', 'PROFICIENCIA_LP', 'PROFICIENCIA_MT', 'STATUS_RISCO_FINAL']
+# IDs lidos como float: um ID_ESCOLA nulo faz o pandas gravar a coluna como '123.0'.
+# Alunos sem escola são descartados e os IDs voltam a ser int64 na agregação.
+TIPOS_RELATORIO = {
+    'ID_ESCOLA': 'float64',
+    'ID_UF': 'float64',
+    'PROFICIENCIA_LP': 'float64',
+    'PROFICIENCIA_MT': 'float64',
+    'STATUS_RISCO_FINAL': str
+}
+TAMANHO_BLOCO = 500000
+TOP_N = 10
+
+
+def adicionar_medidas_risco(df):
+    """Adiciona a média das proficiências e a discrepância absoluta LP x MT."""
+    df['MEDIA_PROFICIENCIAS'] = (df['PROFICIENCIA_LP'] + df['PROFICIENCIA_MT']) / 2
+    df['DISCREPANCIA_LP_MT'] = (df['PROFICIENCIA_LP'] - df['PROFICIENCIA_MT']).abs()
+    return df
+
+
+def criar_sketches_risco():
+    """Sketches de quantis (mescláveis entre blocos e processos) usados nos limiares de risco."""
+    return {'MEDIA_PROFICIENCIAS': quantis.criar_sketch(), 'DISCREPANCIA_LP_MT': quantis.criar_sketch()}
+
+
+def atualizar_sketches_risco(sketches, df):
+    """Soma um bloco de alunos (já com as medidas de risco) aos sketches."""
+    for coluna, sketch in sketches.items():
+        quantis.atualizar_sketch(sketch, df[coluna].to_numpy())
+    return sketches
+
+
+def calcular_limiares_risco(sketches):
+    """Retorna (limiar_risco, limiar_discrepancia) a partir dos sketches mesclados."""
+    return (
+        quantis.quantil_sketch(sketches['MEDIA_PROFICIENCIAS'], QUANTIL_RISCO),
+        quantis.quantil_sketch(sketches['DISCREPANCIA_LP_MT'], QUANTIL_DISCREPANCIA)
     )
-    
-    # Para o 9º EF
-    self.df_9ef_clean['MEDIA_PROFICIENCIAS'] = (
-        self.df_9ef_clean['PROFICIENCIA_LP'] + self.df_9ef_clean['PROFICIENCIA_MT']
-    ) / 2
-    
-    self.df_9ef_clean['DISCREPANCIA_LP_MT'] = (
-        abs(self.df_9ef_clean['PROFICIENCIA_LP'] - self.df_9ef_clean['PROFICIENCIA_MT'])
+
+
+def calculate_risk_indicators(df, limiar_risco=None, limiar_discrepancia=None):
+    """
+    Calcula indicadores de risco de aprendizagem de uma série (qualquer série).
+
+    Sem limiares informados, eles são calculados com os sketches sobre o próprio `df`;
+    na execução em blocos os limiares vêm dos sketches mesclados de todos os blocos.
+    """
+    if 'MEDIA_PROFICIENCIAS' not in df.columns:
+        adicionar_medidas_risco(df)
+
+    if limiar_risco is None or limiar_discrepancia is None:
+        limiar_risco, limiar_discrepancia = calcular_limiares_risco(
+            atualizar_sketches_risco(criar_sketches_risco(), df)
+        )
+
+    df['RISCO_APRENDIZAGEM'] = (
+        (df['MEDIA_PROFICIENCIAS'] < limiar_risco) |
+        (df['DISCREPANCIA_LP_MT'] > limiar_discrepancia)
+    ).astype(np.int8)
+
+    return df
+
+
+def ler_serie_em_blocos(caminho, tamanho_bloco=TAMANHO_BLOCO):
+    """Gera os blocos de alunos de uma série com proficiências, já com as medidas de risco."""
+    for df_bloco in leitura.ler_csv_em_blocos(caminho, tamanho_bloco, colunas=COLUNAS_RELATORIO,
+                                              dtype=TIPOS_RELATORIO, encoding='utf-8'):
+        df_bloco = df_bloco.dropna(subset=['PROFICIENCIA_LP', 'PROFICIENCIA_MT'])
+        df_bloco['ID_UF'] = df_bloco['ID_UF'].fillna(-1).astype(np.int64)
+        yield adicionar_medidas_risco(df_bloco)
+
+
+def descartar_alunos_sem_escola(df, serie):
+    """Remove alunos sem ID_ESCOLA (nulos viram NaN na leitura), que não entram no relatório por escola."""
+    sem_escola = df['ID_ESCOLA'].isna()
+    if sem_escola.any():
+        print(f"AVISO: {sem_escola.sum()} alunos sem ID_ESCOLA ({serie}) ignorados no relatório por escola.")
+        return df[~sem_escola]
+    return df
+
+
+def somar_por_escola(df):
+    """
+    Somas e contagens por escola de um conjunto de alunos com RISCO_APRENDIZAGEM e
+    ID_ESCOLA preenchido. Usa códigos inteiros de ID_ESCOLA e np.bincount, sem groupby.
+    """
+    grupos, escolas = pd.factorize(df['ID_ESCOLA'].to_numpy(dtype=np.int64))
+    n_grupos = len(escolas)
+
+    def somar(pesos=None):
+        return np.bincount(grupos, weights=pesos, minlength=n_grupos)
+
+    id_uf = np.empty(n_grupos, dtype=df['ID_UF'].dtype)
+    id_uf[grupos] = df['ID_UF'].to_numpy()
+
+    df_somas = pd.DataFrame({
+        'ID_UF': id_uf,
+        'ID_ESCOLA': escolas,
+        'TOTAL_ALUNOS': somar().astype(np.int64),
+        'ALUNOS_RISCO': somar(df['RISCO_APRENDIZAGEM'].to_numpy(dtype=float)).astype(np.int64),
+        'SOMA_LP': somar(df['PROFICIENCIA_LP'].to_numpy(dtype=float)),
+        'SOMA_MT': somar(df['PROFICIENCIA_MT'].to_numpy(dtype=float)),
+    })
+
+    if 'STATUS_RISCO_FINAL' in df.columns:
+        for coluna, status in [('ALUNOS_ALTO_RISCO', 'Alto Risco'), ('ALUNOS_RISCO_MODERADO', 'Risco Moderado')]:
+            df_somas[coluna] = somar((df['STATUS_RISCO_FINAL'] == status).to_numpy(dtype=float)).astype(np.int64)
+
+    return df_somas
+
+
+def mesclar_somas_escolas(partes):
+    """Combina as somas por escola de blocos diferentes (uma escola pode aparecer em vários blocos)."""
+    df = pd.concat(partes, ignore_index=True)
+    colunas_soma = [c for c in df.columns if c not in ('ID_UF', 'ID_ESCOLA')]
+    agrupado = df.groupby('ID_ESCOLA', sort=False)
+    return agrupado[colunas_soma].sum().assign(ID_UF=agrupado['ID_UF'].first()).reset_index()[df.columns]
+
+
+def agregar_serie_em_blocos(caminho, serie, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Calcula o risco de uma série sem manter os alunos em memória, em duas passadas em
+    blocos: a primeira monta os sketches de quantis e a segunda aplica os limiares
+    mesclados e acumula as somas por escola. Retorna as somas por escola (ou None).
+    """
+    sketches = criar_sketches_risco()
+    for df_bloco in ler_serie_em_blocos(caminho, tamanho_bloco):
+        atualizar_sketches_risco(sketches, df_bloco)
+
+    limiar_risco, limiar_discrepancia = calcular_limiares_risco(sketches)
+    print(f"Limiares: média < {limiar_risco:.2f} ou discrepância > {limiar_discrepancia:.2f}")
+
+    df_somas = None
+    n_alunos = n_risco = n_sem_escola = 0
+    for df_bloco in ler_serie_em_blocos(caminho, tamanho_bloco):
+        df_bloco = calculate_risk_indicators(df_bloco, limiar_risco, limiar_discrepancia)
+        n_alunos += len(df_bloco)
+        n_risco += int(df_bloco['RISCO_APRENDIZAGEM'].sum())
+
+        sem_escola = df_bloco['ID_ESCOLA'].isna()
+        n_sem_escola += int(sem_escola.sum())
+        partes = [somar_por_escola(df_bloco[~sem_escola])]
+        df_somas = mesclar_somas_escolas(partes if df_somas is None else [df_somas] + partes)
+
+    if df_somas is None:
+        print(f"AVISO: Nenhum aluno com proficiências em '{caminho}'. Série {serie} ignorada.")
+        return None
+    if n_sem_escola:
+        print(f"AVISO: {n_sem_escola} alunos sem ID_ESCOLA ({serie}) ignorados no relatório por escola.")
+    print(f"Alunos em risco ({serie}): {n_risco}")
+    print(f"Taxa de risco ({serie}): {n_risco / n_alunos:.2%}")
+    return df_somas
+
+
+def montar_relatorio_escolas(somas_series):
+    """Monta o relatório por escola de todas as séries a partir das somas por escola de cada série."""
+    df = pd.concat(
+        [df_somas.assign(SERIE=serie) for serie, df_somas in somas_series.items()],
+        ignore_index=True
+    )
+    total_alunos = df['TOTAL_ALUNOS']
+
+    df_escolas = pd.DataFrame({
+        'SERIE': df['SERIE'],
+        'ID_UF': df['ID_UF'],
+        'ID_ESCOLA': df['ID_ESCOLA'],
+        'TOTAL_ALUNOS': total_alunos,
+        'ALUNOS_RISCO': df['ALUNOS_RISCO'],
+        'TAXA_RISCO': (df['ALUNOS_RISCO'] / total_alunos).round(3),
+        'MEDIA_LP': (df['SOMA_LP'] / total_alunos).round(3),
+        'MEDIA_MT': (df['SOMA_MT'] / total_alunos).round(3),
+    })
+    df_escolas['TAXA_RISCO_PCT'] = (df_escolas['TAXA_RISCO'] * 100).round(1)
+
+    for coluna in ['ALUNOS_ALTO_RISCO', 'ALUNOS_RISCO_MODERADO']:
+        if coluna in df.columns:
+            df_escolas[coluna] = df[coluna]
+
+    return df_escolas
+
+
+def generate_reports(dados_series):
+    """
+    Gera o relatório por escola de todas as séries e UFs.
+
+    `dados_series` mapeia a série para o DataFrame de alunos já com RISCO_APRENDIZAGEM.
+    Alunos sem ID_ESCOLA são descartados (com aviso) antes do agrupamento. Na execução
+    em blocos, as somas por escola vêm de agregar_serie_em_blocos.
+    """
+    return montar_relatorio_escolas({
+        serie: somar_por_escola(descartar_alunos_sem_escola(df, serie))
+        for serie, df in dados_series.items()
+    })
+
+
+def generate_uf_reports(df_escolas):
+    """
+    Consolida o relatório por escola em um relatório por (série, UF).
+
+    As médias de proficiência são ponderadas pelo número de alunos de cada escola.
+    """
+    colunas_soma = [c for c in ['TOTAL_ALUNOS', 'ALUNOS_RISCO', 'ALUNOS_ALTO_RISCO', 'ALUNOS_RISCO_MODERADO']
+                    if c in df_escolas.columns]
+    df = df_escolas.assign(
+        SOMA_LP=df_escolas['MEDIA_LP'] * df_escolas['TOTAL_ALUNOS'],
+        SOMA_MT=df_escolas['MEDIA_MT'] * df_escolas['TOTAL_ALUNOS'],
     )
-    
-    # Define risco para 5º EF
-    limiar_risco_5ef = self.df_5ef_clean['MEDIA_PROFICIENCIAS'].quantile(0.3)
-    limiar_discrepancia_5ef = self.df_5ef_clean['DISCREPANCIA_LP_MT'].quantile(0.7)
-    
-    self.df_5ef_clean['RISCO_APRENDIZAGEM'] = (
-        (self.df_5ef_clean['MEDIA_PROFICIENCIAS'] < limiar_risco_5ef) | 
-        (self.df_5ef_clean['DISCREPANCIA_LP_MT'] > limiar_discrepancia_5ef)
-    ).astype(int)
-    
-    # Define risco para 9º EF
-    limiar_risco_9ef = self.df_9ef_clean['MEDIA_PROFICIENCIAS'].quantile(0.3)
-    limiar_discrepancia_9ef = self.df_9ef_clean['DISCREPANCIA_LP_MT'].quantile(0.7)
-    
-    self.df_9ef_clean['RISCO_APRENDIZAGEM'] = (
-        (self.df_9ef_clean['MEDIA_PROFICIENCIAS'] < limiar_risco_9ef) | 
-        (self.df_9ef_clean['DISCREPANCIA_LP_MT'] > limiar_discrepancia_9ef)
-    ).astype(int)
-    
-    print(f"Alunos em risco (5º EF): {self.df_5ef_clean['RISCO_APRENDIZAGEM'].sum()}")
-    print(f"Taxa de risco (5º EF): {self.df_5ef_clean['RISCO_APRENDIZAGEM'].mean():.2%}")
-    print(f"Alunos em risco (9º EF): {self.df_9ef_clean['RISCO_APRENDIZAGEM'].sum()}")
-    print(f"Taxa de risco (9º EF): {self.df_9ef_clean['RISCO_APRENDIZAGEM'].mean():.2%}")
-
-def generate_reports(self):
-    """Gera relatórios analíticos para ambos os anos"""
-    print("\n=== RELATÓRIOS ANALÍTICOS ===")
-    
-    # Análise por escola - 5º EF
-    risco_por_escola_5ef = self.df_5ef_clean.groupby('ID_ESCOLA').agg({
-        'RISCO_APRENDIZAGEM': ['count', 'sum', 'mean'],
-        'PROFICIENCIA_LP': 'mean',
-        'PROFICIENCIA_MT': 'mean'
-    }).round(3)
-    
-    risco_por_escola_5ef.columns = ['TOTAL_ALUNOS', 'ALUNOS_RISCO', 'TAXA_RISCO', 'MEDIA_LP', 'MEDIA_MT']
-    risco_por_escola_5ef['TAXA_RISCO_PCT'] = (risco_por_escola_5ef['TAXA_RISCO'] * 100).round(1)
-    
-    # Análise por escola - 9º EF
-    risco_por_escola_9ef = self.df_9ef_clean.groupby('ID_ESCOLA').agg({
-        'RISCO_APRENDIZAGEM': ['count', 'sum', 'mean'],
-        'PROFICIENCIA_LP': 'mean',
-        'PROFICIENCIA_MT': 'mean'
-    }).round(3)
-    
-    risco_por_escola_9ef.columns = ['TOTAL_ALUNOS', 'ALUNOS_RISCO', 'TAXA_RISCO', 'MEDIA_LP', 'MEDIA_MT']
-    risco_por_escola_9ef['TAXA_RISCO_PCT'] = (risco_por_escola_9ef['TAXA_RISCO'] * 100).round(1)
-    
-    print("\nTop 10 escolas com maior taxa de risco (5º EF):")
-    print(risco_por_escola_5ef.nlargest(10, 'TAXA_RISCO'))
-    
-    print("\nTop 10 escolas com maior taxa de risco (9º EF):")
-    print(risco_por_escola_9ef.nlargest(10, 'TAXA_RISCO'))
-    
-    # Salva relatórios
-    risco_por_escola_5ef.to_csv('data/processed/risco_por_escola_5ef.csv')
-    risco_por_escola_9ef.to_csv('data/processed/risco_por_escola_9ef.csv')
-    self.df_5ef_clean.to_csv('data/processed/alunos_5ef_analisados.csv', index=False)
-    self.df_9ef_clean.to_csv('data/processed/alunos_9ef_analisados.csv', index=False)
-    
-    return risco_por_escola_5ef, risco_por_escola_9ef
\ No newline at end of file
+    agrupado = df.groupby(['SERIE', 'ID_UF'])
+    df_ufs = agrupado[colunas_soma + ['SOMA_LP', 'SOMA_MT']].sum()
+    df_ufs.insert(0, 'N_ESCOLAS', agrupado.size())
+
+    df_ufs['TAXA_RISCO'] = (df_ufs['ALUNOS_RISCO'] / df_ufs['TOTAL_ALUNOS']).round(3)
+    df_ufs['MEDIA_LP'] = (df_ufs.pop('SOMA_LP') / df_ufs['TOTAL_ALUNOS']).round(3)
+    df_ufs['MEDIA_MT'] = (df_ufs.pop('SOMA_MT') / df_ufs['TOTAL_ALUNOS']).round(3)
+    df_ufs['TAXA_RISCO_PCT'] = (df_ufs['TAXA_RISCO'] * 100).round(1)
+    return df_ufs.reset_index()
+
+
+def top_n_escolas(df_escolas, n=TOP_N, coluna='TAXA_RISCO', min_alunos=1):
+    """Retorna as `n` escolas com maior `coluna` usando seleção parcial (argpartition)."""
+    df_elegiveis = df_escolas[df_escolas['TOTAL_ALUNOS'] >= min_alunos]
+    valores = df_elegiveis[coluna].to_numpy()
+    if len(valores) > n:
+        selecionadas = np.argpartition(-valores, n - 1)[:n]
+    else:
+        selecionadas = np.arange(len(valores))
+    selecionadas = selecionadas[np.argsort(-valores[selecionadas], kind='stable')]
+    return df_elegiveis.iloc[selecionadas]
+
+
+def salvar_relatorio(df, caminho_base):
+    """Salva em Parquet (colunar) quando o pyarrow está disponível, ou em CSV gzip."""
+    if leitura.PYARROW_DISPONIVEL:
+        caminho = f'{caminho_base}.parquet'
+        df.to_parquet(caminho, index=False)
+    else:
+        caminho = f'{caminho_base}.csv.gz'
+        df.to_csv(caminho, sep=';', encoding='utf-8', compression='gzip', index=False)
+    return caminho
+
+
+if __name__ == "__main__":
+    print("\n=== CÁLCULO DE INDICADORES DE RISCO ===")
+
+    somas_series = {}
+    for serie in CONFIG_SERIES:
+        caminho = ARQUIVOS_RESULTADOS[serie]
+        if not os.path.exists(caminho):
+            print(f"AVISO: Arquivo '{caminho}' não encontrado. Série {serie} ignorada.")
+            continue
+
+        df_somas = agregar_serie_em_blocos(caminho, serie)
+        if df_somas is not None:
+            somas_series[serie] = df_somas
+
+    if not somas_series:
+        print("AVISO: Nenhuma série encontrada. Execute analise.py antes de gerar os relatórios.")
+    else:
+        print("\n=== RELATÓRIOS ANALÍTICOS ===")
+        df_escolas = montar_relatorio_escolas(somas_series)
+
+        os.makedirs(DIRETORIO_RELATORIOS, exist_ok=True)
+        for serie, df_escolas_serie in df_escolas.groupby('SERIE'):
+            print(f"\nTop {TOP_N} escolas com maior taxa de risco ({serie}):")
+            print(top_n_escolas(df_escolas_serie).to_string(index=False))
+
+            caminho = salvar_relatorio(
+                df_escolas_serie.drop(columns=['SERIE']),
+                os.path.join(DIRETORIO_RELATORIOS, f'risco_por_escola_{serie.lower()}')
+            )
+            print(f"Relatório por escola ({serie}) salvo em '{caminho}'.")
+            armazenamento.gravar_particoes(df_escolas_serie.drop(columns=['SERIE']), 'risco_escolas', serie)
+
+        # Tabelas pré-agregadas lidas pelo mapa por UF e pelo ranking de escolas do painel.
+        df_ufs = generate_uf_reports(df_escolas)
+        for serie, df_ufs_serie in df_ufs.groupby('SERIE'):
+            caminho = salvar_relatorio(
+                df_ufs_serie.drop(columns=['SERIE']),
+                os.path.join(DIRETORIO_RELATORIOS, f'risco_por_uf_{serie.lower()}')
+            )
+            print(f"Relatório por UF ({serie}) salvo em '{caminho}'.")
+            armazenamento.gravar_particoes(df_ufs_serie.drop(columns=['SERIE']), 'risco_ufs', serie)
@@ -0,0 +1,195 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+
+COLUNA_ID_ALUNO = 'ID_ALUNO'
+COLUNA_ID_ESCOLA = 'ID_ESCOLA'
+COLUNA_DESCRITOR = 'NU_DESCRITOR_HABILIDADE'
+COLUNA_DISCIPLINA = 'TP_DISCIPLINA'
+
+# Arquivos que compõem o armazenamento de perfis de uma série. Os arrays .npy são
+# abertos com mmap, então uma consulta lê apenas as linhas do aluno/escola pedidos.
+ARQUIVO_IDS = 'id_aluno.npy'
+ARQUIVO_ESCOLAS = 'id_escola.npy'
+ARQUIVO_ACERTOS = 'acertos.npy'
+ARQUIVO_TENTATIVAS = 'tentativas.npy'
+ARQUIVO_ORDEM_ESCOLA = 'ordem_escola.npy'
+# Índice por escola: IDs únicos ordenados e, para cada um, o início do seu trecho em
+# ordem_escola (o último elemento é o total de alunos).
+ARQUIVO_ESCOLAS_UNICAS = 'escolas_unicas.npy'
+ARQUIVO_INICIO_ESCOLA = 'inicio_escola.npy'
+ARQUIVO_DESCRITORES = 'descritores.csv'
+
+# Linhas desempacotadas por vez nas consultas que somam muitas escolas.
+TAMANHO_BLOCO_CONSULTA = 100000
+
+
+def criar_indice_descritores(map_itens):
+    """Lista ordenada de (disciplina, descritor) que define a posição de cada bit do perfil."""
+    pares = {(info[COLUNA_DISCIPLINA], str(info[COLUNA_DESCRITOR])) for info in map_itens.values()}
+    return pd.DataFrame(sorted(pares), columns=[COLUNA_DISCIPLINA, COLUNA_DESCRITOR])
+
+
+def montar_perfis_chunk(df_acertos_chunk, indice_descritores):
+    """
+    Converte o formato longo (aluno, descritor, acerto) de um bloco em perfis
+    bit-packed: uma linha por aluno, um bit por descritor para acerto e tentativa.
+    """
+    ids_aluno, linhas = np.unique(df_acertos_chunk[COLUNA_ID_ALUNO].astype('int64').to_numpy(), return_inverse=True)
+
+    chaves_indice = pd.MultiIndex.from_frame(indice_descritores[[COLUNA_DISCIPLINA, COLUNA_DESCRITOR]])
+    colunas = chaves_indice.get_indexer(pd.MultiIndex.from_arrays([
+        df_acertos_chunk[COLUNA_DISCIPLINA].astype(str),
+        df_acertos_chunk[COLUNA_DESCRITOR].astype(str)
+    ]))
+    validos = colunas >= 0
+    linhas, colunas = linhas[validos], colunas[validos]
+    acerto = df_acertos_chunk['ACERTO'].to_numpy()[validos] == 1
+
+    n_descritores = len(indice_descritores)
+    tentativas = np.zeros((len(ids_aluno), n_descritores), dtype=bool)
+    acertos = np.zeros((len(ids_aluno), n_descritores), dtype=bool)
+    tentativas[linhas, colunas] = True
+    acertos[linhas[acerto], colunas[acerto]] = True
+
+    id_escola = (
+        df_acertos_chunk.drop_duplicates(COLUNA_ID_ALUNO)
+        .assign(**{COLUNA_ID_ALUNO: lambda d: d[COLUNA_ID_ALUNO].astype('int64')})
+        .set_index(COLUNA_ID_ALUNO)[COLUNA_ID_ESCOLA]
+        .reindex(ids_aluno)
+    )
+
+    return {
+        'id_aluno': ids_aluno,
+        'id_escola': pd.to_numeric(id_escola, errors='coerce').fillna(-1).astype('int64').to_numpy(),
+        'acertos': np.packbits(acertos, axis=1),
+        'tentativas': np.packbits(tentativas, axis=1),
+    }
+
+
+def _indice_escolas(escolas_ordenadas):
+    """IDs únicos de escola e os deslocamentos de cada um na coluna de escolas ordenada."""
+    escolas_unicas, inicio_escola = np.unique(escolas_ordenadas, return_index=True)
+    return escolas_unicas, np.append(inicio_escola, len(escolas_ordenadas)).astype('int64')
+
+
+def gravar_perfis(diretorio, partes, indice_descritores):
+    """Consolida os perfis dos blocos e grava o armazenamento indexado por aluno e por escola."""
+    id_aluno = np.concatenate([p['id_aluno'] for p in partes])
+    id_escola = np.concatenate([p['id_escola'] for p in partes])
+    acertos = np.concatenate([p['acertos'] for p in partes])
+    tentativas = np.concatenate([p['tentativas'] for p in partes])
+
+    # Ordena por ID_ALUNO (busca binária) e mantém a primeira ocorrência de IDs repetidos entre blocos.
+    ordem = np.argsort(id_aluno, kind='stable')
+    id_aluno = id_aluno[ordem]
+    primeira_ocorrencia = np.concatenate(([True], id_aluno[1:] != id_aluno[:-1]))
+    ordem = ordem[primeira_ocorrencia]
+    id_aluno = id_aluno[primeira_ocorrencia]
+    id_escola = id_escola[ordem]
+
+    # Grava em um diretório temporário e só então substitui o armazenamento anterior,
+    # como nas partições: as demais edições e séries não são tocadas.
+    temporario = f'{diretorio}.tmp'
+    shutil.rmtree(temporario, ignore_errors=True)
+    os.makedirs(temporario)
+    np.save(os.path.join(temporario, ARQUIVO_IDS), id_aluno)
+    np.save(os.path.join(temporario, ARQUIVO_ESCOLAS), id_escola)
+    np.save(os.path.join(temporario, ARQUIVO_ACERTOS), acertos[ordem])
+    np.save(os.path.join(temporario, ARQUIVO_TENTATIVAS), tentativas[ordem])
+    ordem_escola = np.argsort(id_escola, kind='stable')
+    escolas_unicas, inicio_escola = _indice_escolas(id_escola[ordem_escola])
+    np.save(os.path.join(temporario, ARQUIVO_ORDEM_ESCOLA), ordem_escola)
+    np.save(os.path.join(temporario, ARQUIVO_ESCOLAS_UNICAS), escolas_unicas)
+    np.save(os.path.join(temporario, ARQUIVO_INICIO_ESCOLA), inicio_escola)
+    indice_descritores.to_csv(os.path.join(temporario, ARQUIVO_DESCRITORES), sep=';', index=False, encoding='utf-8')
+
+    shutil.rmtree(diretorio, ignore_errors=True)
+    os.replace(temporario, diretorio)
+
+    print(f"Perfis de {len(id_aluno)} alunos salvos em '{diretorio}'.")
+
+
+def abrir_perfis(diretorio):
+    """Abre o armazenamento de perfis com mmap (sem carregar a tabela nacional em memória)."""
+    if not os.path.exists(os.path.join(diretorio, ARQUIVO_IDS)):
+        return None
+
+    perfis = {
+        'id_aluno': np.load(os.path.join(diretorio, ARQUIVO_IDS), mmap_mode='r'),
+        'id_escola': np.load(os.path.join(diretorio, ARQUIVO_ESCOLAS), mmap_mode='r'),
+        'acertos': np.load(os.path.join(diretorio, ARQUIVO_ACERTOS), mmap_mode='r'),
+        'tentativas': np.load(os.path.join(diretorio, ARQUIVO_TENTATIVAS), mmap_mode='r'),
+        'ordem_escola': np.load(os.path.join(diretorio, ARQUIVO_ORDEM_ESCOLA), mmap_mode='r'),
+        'escolas_unicas': np.load(os.path.join(diretorio, ARQUIVO_ESCOLAS_UNICAS), mmap_mode='r'),
+        'inicio_escola': np.load(os.path.join(diretorio, ARQUIVO_INICIO_ESCOLA), mmap_mode='r'),
+        'descritores': pd.read_csv(os.path.join(diretorio, ARQUIVO_DESCRITORES), sep=';', encoding='utf-8', dtype=str),
+    }
+    return perfis
+
+
+def _desempacotar(perfis, linhas):
+    n_descritores = len(perfis['descritores'])
+    acertos = np.unpackbits(perfis['acertos'][linhas], axis=1, count=n_descritores).astype(bool)
+    tentativas = np.unpackbits(perfis['tentativas'][linhas], axis=1, count=n_descritores).astype(bool)
+    return acertos, tentativas
+
+
+def buscar_aluno(perfis, id_aluno):
+    """Retorna o perfil de habilidades de um aluno (um descritor por linha) ou None."""
+    id_aluno = int(id_aluno)
+    posicao = np.searchsorted(perfis['id_aluno'], id_aluno)
+    if posicao >= len(perfis['id_aluno']) or perfis['id_aluno'][posicao] != id_aluno:
+        return None
+
+    acertos, tentativas = _desempacotar(perfis, [posicao])
+    df_perfil = perfis['descritores'].copy()
+    df_perfil['RESULTADO'] = np.where(
+        ~tentativas[0], 'Não respondeu', np.where(acertos[0], 'Acertou', 'Errou')
+    )
+    df_perfil[COLUNA_ID_ESCOLA] = int(perfis['id_escola'][posicao])
+    return df_perfil
+
+
+def buscar_escola(perfis, id_escola):
+    """Retorna a taxa de erro por descritor dos alunos de uma escola ou None."""
+    return buscar_escolas(perfis, [id_escola])
+
+
+def buscar_escolas(perfis, ids_escola, tamanho_bloco=TAMANHO_BLOCO_CONSULTA):
+    """
+    Retorna a taxa de erro por descritor somando os alunos de várias escolas (por
+    exemplo, todas as escolas de uma UF) ou None se nenhuma for encontrada.
+    """
+    ids_escola = np.unique(np.asarray(ids_escola, dtype='int64'))
+    escolas_unicas = perfis['escolas_unicas']
+    posicoes = np.searchsorted(escolas_unicas, ids_escola)
+    encontradas = posicoes < len(escolas_unicas)
+    encontradas[encontradas] = escolas_unicas[posicoes[encontradas]] == ids_escola[encontradas]
+    if not encontradas.any():
+        return None
+
+    inicio_escola = perfis['inicio_escola']
+    linhas = np.sort(np.concatenate([
+        np.asarray(perfis['ordem_escola'][inicio_escola[posicao]:inicio_escola[posicao + 1]])
+        for posicao in posicoes[encontradas]
+    ]))
+
+    # Desempacota em blocos para limitar a memória em consultas de UFs inteiras.
+    n_descritores = len(perfis['descritores'])
+    n_alunos = np.zeros(n_descritores, dtype=np.int64)
+    n_acertos = np.zeros(n_descritores, dtype=np.int64)
+    for inicio in range(0, len(linhas), tamanho_bloco):
+        acertos, tentativas = _desempacotar(perfis, linhas[inicio:inicio + tamanho_bloco])
+        n_alunos += tentativas.sum(axis=0)
+        n_acertos += acertos.sum(axis=0)
+
+    df_escola = perfis['descritores'].copy()
+    df_escola['N_ALUNOS'] = n_alunos
+    df_escola['N_ACERTOS'] = n_acertos
+    df_escola['TAXA_ERRO'] = 1 - df_escola['N_ACERTOS'] / df_escola['N_ALUNOS'].replace(0, np.nan)
+    df_escola.attrs['total_alunos'] = len(linhas)
+    return df_escola
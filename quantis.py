@@ -0,0 +1,122 @@
+import numpy as np
+
+
+# Grade padrão para proficiências e discrepâncias do SAEB (escala até ~500 pontos).
+INICIO_PADRAO = -1000.0
+FIM_PADRAO = 1000.0
+LARGURA_PADRAO = 0.01
+
+
+def criar_sketch(inicio=INICIO_PADRAO, fim=FIM_PADRAO, largura=LARGURA_PADRAO):
+    """
+    Cria um histograma de faixas finas para quantis aproximados em fluxo.
+
+    O sketch guarda apenas contagens por faixa de largura fixa (mais as contagens
+    abaixo de `inicio` e acima de `fim`) e o mínimo/máximo exatos. Sketches com a
+    mesma grade podem ser somados (blocos, processos ou máquinas) em qualquer ordem.
+
+    Limite de erro: para quantis cujos valores vizinhos estão dentro de [inicio, fim),
+    |quantil_sketch(q) - Series.quantile(q)| <= largura. Fora da grade o erro é limitado
+    apenas pelo mínimo/máximo observados.
+    """
+    n_faixas = int(np.ceil((fim - inicio) / largura))
+    return {
+        'inicio': float(inicio),
+        'largura': float(largura),
+        'n_faixas': n_faixas,
+        # Posição 0: abaixo de `inicio`; última posição: acima de `fim`.
+        'contagens': np.zeros(n_faixas + 2, dtype=np.int64),
+        'minimo': np.inf,
+        'maximo': -np.inf,
+    }
+
+
+def atualizar_sketch(sketch, valores):
+    """Soma um bloco de valores ao sketch (valores ausentes são ignorados)."""
+    valores = np.asarray(valores, dtype=float)
+    valores = valores[~np.isnan(valores)]
+    if valores.size == 0:
+        return sketch
+
+    faixas = np.floor((valores - sketch['inicio']) / sketch['largura']).astype(np.int64) + 1
+    np.clip(faixas, 0, sketch['n_faixas'] + 1, out=faixas)
+    sketch['contagens'] += np.bincount(faixas, minlength=sketch['n_faixas'] + 2)
+    sketch['minimo'] = min(sketch['minimo'], valores.min())
+    sketch['maximo'] = max(sketch['maximo'], valores.max())
+    return sketch
+
+
+def mesclar_sketches(*sketches):
+    """Combina sketches de blocos ou processos diferentes (mesma grade)."""
+    base = sketches[0]
+    for outro in sketches[1:]:
+        if (outro['inicio'], outro['largura'], outro['n_faixas']) != (base['inicio'], base['largura'], base['n_faixas']):
+            raise ValueError("Só é possível mesclar sketches com a mesma grade de faixas.")
+
+    mesclado = dict(base)
+    mesclado['contagens'] = np.sum([s['contagens'] for s in sketches], axis=0)
+    mesclado['minimo'] = min(s['minimo'] for s in sketches)
+    mesclado['maximo'] = max(s['maximo'] for s in sketches)
+    return mesclado
+
+
+def _estatistica_ordem(sketch, acumulado, posicoes):
+    """Estima o k-ésimo menor valor (k base 0) espalhando os valores de cada faixa uniformemente."""
+    faixas = np.searchsorted(acumulado, posicoes, side='right')
+    contagem_faixa = sketch['contagens'][faixas]
+    antes = acumulado[faixas] - contagem_faixa
+    inicio_faixa = sketch['inicio'] + (faixas - 1) * sketch['largura']
+    estimativa = inicio_faixa + sketch['largura'] * (posicoes - antes + 0.5) / contagem_faixa
+
+    # Valores fora da grade só são conhecidos pelos extremos observados.
+    estimativa = np.where(faixas == 0, sketch['minimo'], estimativa)
+    estimativa = np.where(faixas == sketch['n_faixas'] + 1, sketch['maximo'], estimativa)
+    return np.clip(estimativa, sketch['minimo'], sketch['maximo'])
+
+
+def quantil_sketch(sketch, q):
+    """Quantil `q` com a mesma interpolação linear de pandas.Series.quantile."""
+    total = sketch['contagens'].sum()
+    if total == 0:
+        return np.nan
+
+    acumulado = np.cumsum(sketch['contagens'])
+    posicao = np.asarray(q, dtype=float) * (total - 1)
+    abaixo = np.floor(posicao)
+    acima = np.minimum(abaixo + 1, total - 1)
+    fracao = posicao - abaixo
+
+    valor_abaixo = _estatistica_ordem(sketch, acumulado, abaixo)
+    valor_acima = _estatistica_ordem(sketch, acumulado, acima)
+    resultado = valor_abaixo + fracao * (valor_acima - valor_abaixo)
+    return float(resultado) if np.ndim(resultado) == 0 else resultado
+
+
+def verificar_contra_pandas(n=1_000_000, n_blocos=8, seed=42):
+    """Compara os quantis do sketch (montado em blocos e mesclado) com os quantis exatos do pandas."""
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    valores = np.concatenate([
+        rng.normal(210, 45, n // 2),
+        rng.gamma(2, 30, n - n // 2),
+    ])
+    quantis = [0.0, 0.01, 0.1, 0.3, 0.5, 0.7, 0.9, 0.99, 1.0]
+
+    parciais = [atualizar_sketch(criar_sketch(), bloco) for bloco in np.array_split(valores, n_blocos)]
+    sketch = mesclar_sketches(*parciais)
+
+    exatos = pd.Series(valores).quantile(quantis).to_numpy()
+    aproximados = quantil_sketch(sketch, quantis)
+    erro = np.abs(exatos - aproximados).max()
+
+    for q, exato, aproximado in zip(quantis, exatos, aproximados):
+        print(f"q={q:<5} exato={exato:12.5f} sketch={aproximado:12.5f} erro={abs(exato - aproximado):.6f}")
+    print(f"Erro máximo: {erro:.6f} (limite: {sketch['largura']})")
+    return erro <= sketch['largura']
+
+
+if __name__ == "__main__":
+    if not verificar_contra_pandas():
+        raise SystemExit("ERRO: quantis do sketch fora do limite de erro documentado.")
+    print("Quantis do sketch dentro do limite de erro.")
@@ -0,0 +1,161 @@
+import argparse
+import itertools
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.metrics import adjusted_rand_score, davies_bouldin_score, silhouette_score
+from threadpoolctl import threadpool_limits
+
+import leitura
+from analise import ARQUIVOS_ALUNO, COLUNAS_MANTER, SEED, TIPOS_COLUNAS, preparar_dados_modelo
+from configuracao import CONFIG_SERIES
+
+
+K_MIN = 3
+K_MAX = 12
+TAMANHO_AMOSTRA = 200000
+TAMANHO_AMOSTRA_SILHUETA = 20000
+N_SEEDS = 3
+ORCAMENTO_SEGUNDOS = 15 * 60
+COLUNA_ESTRATO = 'ID_UF'
+
+# Matriz padronizada da amostra, enviada uma única vez para cada processo trabalhador.
+_MATRIZ_AMOSTRA = None
+
+
+def amostrar_estratificado(df, tamanho, coluna_estrato=COLUNA_ESTRATO, seed=SEED):
+    """Amostra `tamanho` linhas mantendo a proporção de cada estrato (UF)."""
+    if len(df) <= tamanho:
+        return df
+    fracao = tamanho / len(df)
+    return df.groupby(coluna_estrato, group_keys=False).sample(frac=fracao, random_state=seed)
+
+
+def _iniciar_trabalhador(matriz):
+    global _MATRIZ_AMOSTRA
+    _MATRIZ_AMOSTRA = matriz
+
+
+def avaliar_k(k, seed, tamanho_silhueta):
+    """Ajusta o K-Means para um (K, seed) e calcula as métricas de qualidade."""
+    inicio = time.perf_counter()
+    # Um thread por processo: o paralelismo vem dos processos da varredura.
+    with threadpool_limits(limits=1):
+        kmeans = KMeans(n_clusters=k, random_state=seed, n_init=1)
+        rotulos = kmeans.fit_predict(_MATRIZ_AMOSTRA)
+
+    return {
+        'K': k,
+        'SEED': seed,
+        'INERCIA': kmeans.inertia_,
+        'SILHUETA': silhouette_score(
+            _MATRIZ_AMOSTRA, rotulos,
+            sample_size=min(tamanho_silhueta, len(rotulos)), random_state=seed
+        ),
+        'DAVIES_BOULDIN': davies_bouldin_score(_MATRIZ_AMOSTRA, rotulos),
+        'SEGUNDOS': time.perf_counter() - inicio,
+        'ROTULOS': rotulos.astype(np.int8),
+    }
+
+
+def _avaliar_tarefa(tarefa):
+    k, seed, tamanho_silhueta = tarefa
+    return avaliar_k(k, seed, tamanho_silhueta)
+
+
+def resumir_resultados(resultados):
+    """Agrega as métricas por K e mede a estabilidade (ARI médio entre pares de seeds)."""
+    linhas = []
+    for k, grupo in itertools.groupby(sorted(resultados, key=lambda r: (r['K'], r['SEED'])), key=lambda r: r['K']):
+        grupo = list(grupo)
+        pares = list(itertools.combinations([r['ROTULOS'] for r in grupo], 2))
+        linhas.append({
+            'K': k,
+            'N_SEEDS': len(grupo),
+            'INERCIA': np.mean([r['INERCIA'] for r in grupo]),
+            'SILHUETA': np.mean([r['SILHUETA'] for r in grupo]),
+            'DAVIES_BOULDIN': np.mean([r['DAVIES_BOULDIN'] for r in grupo]),
+            'ESTABILIDADE_ARI': np.mean([adjusted_rand_score(a, b) for a, b in pares]) if pares else np.nan,
+            'SEGUNDOS_MEDIO': np.mean([r['SEGUNDOS'] for r in grupo]),
+        })
+    return pd.DataFrame(linhas)
+
+
+def selecionar_k(caminho_csv, k_min=K_MIN, k_max=K_MAX, tamanho_amostra=TAMANHO_AMOSTRA, n_seeds=N_SEEDS,
+                 tamanho_silhueta=TAMANHO_AMOSTRA_SILHUETA, processos=None, orcamento_segundos=ORCAMENTO_SEGUNDOS):
+    """
+    Executa a varredura de K em paralelo sobre uma amostra estratificada por UF.
+
+    Os ajustes são enviados em ordem crescente de K; ao esgotar o orçamento de tempo
+    os ajustes pendentes são cancelados e o relatório usa apenas os concluídos.
+    """
+    inicio = time.perf_counter()
+    try:
+        df = leitura.ler_csv(caminho_csv, colunas=COLUNAS_MANTER, dtype=TIPOS_COLUNAS)
+    except Exception as e:
+        print(f"Erro ao carregar {caminho_csv}: {e}")
+        return None
+
+    df = amostrar_estratificado(df, tamanho_amostra)
+    _, matriz = preparar_dados_modelo(df)
+    print(f"Amostra de {len(matriz)} alunos carregada em {time.perf_counter() - inicio:.1f}s.")
+
+    tarefas = [(k, SEED + i) for k in range(k_min, k_max + 1) for i in range(n_seeds)]
+    resultados = []
+
+    pool = multiprocessing.Pool(
+        processes=processos or os.cpu_count(),
+        initializer=_iniciar_trabalhador,
+        initargs=(matriz,)
+    )
+    resultados_pool = pool.imap_unordered(_avaliar_tarefa, [(k, seed, tamanho_silhueta) for k, seed in tarefas])
+    try:
+        while len(resultados) < len(tarefas):
+            restante = orcamento_segundos - (time.perf_counter() - inicio)
+            resultado = resultados_pool.next(timeout=max(restante, 0))
+            resultados.append(resultado)
+            print(f"K={resultado['K']} seed={resultado['SEED']} concluído em {resultado['SEGUNDOS']:.1f}s "
+                  f"({len(resultados)}/{len(tarefas)})")
+    except multiprocessing.TimeoutError:
+        print(f"AVISO: Orçamento de {orcamento_segundos}s esgotado. {len(resultados)}/{len(tarefas)} ajustes concluídos.")
+    finally:
+        # Interrompe os ajustes em andamento e os pendentes para não estourar o orçamento.
+        pool.terminate()
+        pool.join()
+
+    if not resultados:
+        print("AVISO: Nenhum ajuste concluído dentro do orçamento de tempo.")
+        return None
+
+    return resumir_resultados(resultados)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Varredura de K (N_CLUSTERS) para o K-Means de cada série.")
+    parser.add_argument('series', nargs='*', default=list(CONFIG_SERIES.keys()))
+    parser.add_argument('--k-min', type=int, default=K_MIN)
+    parser.add_argument('--k-max', type=int, default=K_MAX)
+    parser.add_argument('--amostra', type=int, default=TAMANHO_AMOSTRA)
+    parser.add_argument('--amostra-silhueta', type=int, default=TAMANHO_AMOSTRA_SILHUETA)
+    parser.add_argument('--seeds', type=int, default=N_SEEDS)
+    parser.add_argument('--processos', type=int, default=None)
+    parser.add_argument('--orcamento', type=float, default=ORCAMENTO_SEGUNDOS, help="Tempo máximo por série, em segundos.")
+    args = parser.parse_args()
+
+    os.makedirs('data', exist_ok=True)
+
+    for serie in args.series:
+        print(f"\n--- Seleção de K para {serie} (K={args.k_min}..{args.k_max}, atual={CONFIG_SERIES[serie]['N_CLUSTERS']}) ---")
+        df_selecao = selecionar_k(
+            ARQUIVOS_ALUNO[serie], args.k_min, args.k_max, args.amostra, args.seeds,
+            args.amostra_silhueta, args.processos, args.orcamento
+        )
+        if df_selecao is not None:
+            print(df_selecao.to_string(index=False))
+            caminho_saida = f'data/selecao_k_{serie}.csv'
+            df_selecao.to_csv(caminho_saida, sep=';', encoding='utf-8', index=False)
+            print(f"Relatório de seleção de K salvo em '{caminho_saida}'.")
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+
+
+# Histogramas conjuntos para a simulação de limiares de risco. Cada linha é uma célula
+# ocupada de (ID_UF, CLUSTER, SUPERDOTACAO_DECLARADA, faixa da média, faixa da
+# discrepância |LP - MT|, faixa do score de anomalia) com o número de alunos.
+# Limiares sobre as bordas das faixas reproduzem as contagens exatamente.
+
+LARGURA_MEDIA = 2.5
+LARGURA_DISCREPANCIA = 2.5
+LARGURA_SCORE = 0.01
+# O score do IsolationForest (decision_function) fica em torno de [-0.5, 0.5]; 0 é o
+# limiar usado pelo modelo e coincide com uma borda de faixa.
+INICIO_SCORE = -1.0
+MAX_FAIXA = 32000
+
+COLUNAS_CHAVE = ['ID_UF', 'CLUSTER', 'SUPERDOTACAO_DECLARADA']
+COLUNAS_FAIXA = ['FAIXA_MEDIA', 'FAIXA_DISCREPANCIA', 'FAIXA_SCORE']
+STATUS_SIMULADOS = ['Normal', 'Risco Moderado', 'Alto Risco', 'Superdotação']
+
+
+def _faixas(valores, inicio, largura):
+    faixas = np.floor((np.asarray(valores, dtype=float) - inicio) / largura)
+    return np.clip(faixas, 0, MAX_FAIXA).astype(np.int16)
+
+
+def gerar_histogramas_risco(df):
+    """
+    Monta o histograma conjunto esparso a partir dos alunos já classificados por
+    analise.py (PROFICIENCIA_LP/MT, SCORE_ANOMALIA, CLUSTER, ID_UF e TX_RESP_Q05c).
+    """
+    df_faixas = pd.DataFrame({
+        'ID_UF': pd.to_numeric(df['ID_UF'], errors='coerce').fillna(-1).astype(np.int16).to_numpy(),
+        'CLUSTER': df['CLUSTER'].astype(str).to_numpy(),
+        'SUPERDOTACAO_DECLARADA': (df['TX_RESP_Q05c'] == 'B').astype(np.int8).to_numpy(),
+        'FAIXA_MEDIA': _faixas((df['PROFICIENCIA_LP'] + df['PROFICIENCIA_MT']) / 2, 0.0, LARGURA_MEDIA),
+        'FAIXA_DISCREPANCIA': _faixas((df['PROFICIENCIA_LP'] - df['PROFICIENCIA_MT']).abs(), 0.0, LARGURA_DISCREPANCIA),
+        'FAIXA_SCORE': _faixas(df['SCORE_ANOMALIA'], INICIO_SCORE, LARGURA_SCORE),
+    })
+    df_hist = df_faixas.groupby(COLUNAS_CHAVE + COLUNAS_FAIXA, sort=False).size().rename('N_ALUNOS').reset_index()
+    df_hist['N_ALUNOS'] = df_hist['N_ALUNOS'].astype(np.int32)
+    return df_hist
+
+
+def faixa_por_quantil(df_hist, coluna_faixa, q):
+    """Primeira borda de faixa com pelo menos a fração `q` dos alunos abaixo dela."""
+    contagens = np.bincount(df_hist[coluna_faixa].to_numpy(), weights=df_hist['N_ALUNOS'].to_numpy())
+    acumulado = np.cumsum(contagens)
+    return int(np.searchsorted(acumulado, q * acumulado[-1], side='left')) + 1
+
+
+def fracao_abaixo(df_hist, coluna_faixa, faixa_limite):
+    """Fração dos alunos em faixas abaixo de `faixa_limite`."""
+    n_alunos = df_hist['N_ALUNOS'].to_numpy()
+    return n_alunos[df_hist[coluna_faixa].to_numpy() < faixa_limite].sum() / n_alunos.sum()
+
+
+def faixa_media(limiar):
+    return int(round(limiar / LARGURA_MEDIA))
+
+
+def faixa_discrepancia(limiar):
+    return int(round(limiar / LARGURA_DISCREPANCIA))
+
+
+def faixa_score(limiar):
+    return int(round((limiar - INICIO_SCORE) / LARGURA_SCORE))
+
+
+def limiar_da_faixa(faixa, coluna_faixa):
+    """Valor da borda inferior de uma faixa, na escala original."""
+    if coluna_faixa == 'FAIXA_MEDIA':
+        return faixa * LARGURA_MEDIA
+    if coluna_faixa == 'FAIXA_DISCREPANCIA':
+        return faixa * LARGURA_DISCREPANCIA
+    return INICIO_SCORE + faixa * LARGURA_SCORE
+
+
+def simular_risco(df_hist, faixa_limite_media, faixa_limite_discrepancia, faixa_limite_score, config_risco):
+    """
+    Aplica as regras de risco às células do histograma com os limiares informados.
+
+    RISCO_APRENDIZAGEM segue main.py (média abaixo do limiar ou discrepância acima);
+    o status segue analise.classificar_risco_final, com anomalia quando o score fica
+    abaixo do limiar. O status é devolvido como CODIGO_STATUS (índice em
+    STATUS_SIMULADOS) para que a simulação não manipule strings célula a célula.
+    """
+    media = df_hist['FAIXA_MEDIA'].to_numpy()
+    discrepancia = df_hist['FAIXA_DISCREPANCIA'].to_numpy()
+    anomalia = df_hist['FAIXA_SCORE'].to_numpy() < faixa_limite_score
+    superdotacao = df_hist['SUPERDOTACAO_DECLARADA'].to_numpy() == 1
+
+    # Os grupos de risco são resolvidos por categoria de cluster e expandidos pelos códigos.
+    cluster = df_hist['CLUSTER'].astype('category')
+    categorias = cluster.cat.categories.astype(str)
+    codigos_cluster = cluster.cat.codes.to_numpy()
+    alto_risco = np.isin(categorias, config_risco['ALTO_RISCO'])[codigos_cluster]
+    moderado = np.isin(categorias, config_risco['MODERADO'])[codigos_cluster]
+    normal_base = np.isin(categorias, config_risco['NORMAL_BASE'])[codigos_cluster]
+
+    normal, risco_moderado, risco_alto, superdotado = range(len(STATUS_SIMULADOS))
+    codigo_status = np.select(
+        [
+            superdotacao & normal_base,
+            alto_risco,
+            moderado & anomalia,
+            moderado,
+            normal_base & anomalia,
+        ],
+        [superdotado, risco_alto, risco_alto, risco_moderado, risco_moderado],
+        default=normal
+    ).astype(np.int8)
+
+    return df_hist.assign(
+        RISCO_APRENDIZAGEM=((media < faixa_limite_media) | (discrepancia >= faixa_limite_discrepancia)).astype(np.int8),
+        ANOMALIA=anomalia.astype(np.int8),
+        CODIGO_STATUS=codigo_status,
+    )
+
+
+def resumir_simulacao(df_simulado, agrupar_por=None):
+    """Alunos por status simulado, em risco de aprendizagem e anômalos, no total ou por grupo."""
+    n_alunos = df_simulado['N_ALUNOS'].to_numpy()
+    if agrupar_por is None:
+        contagens_status = np.bincount(df_simulado['CODIGO_STATUS'].to_numpy(), weights=n_alunos,
+                                       minlength=len(STATUS_SIMULADOS))
+        return pd.Series({
+            'N_ALUNOS': n_alunos.sum(),
+            'RISCO_APRENDIZAGEM': n_alunos[df_simulado['RISCO_APRENDIZAGEM'].to_numpy() == 1].sum(),
+            'ANOMALIA': n_alunos[df_simulado['ANOMALIA'].to_numpy() == 1].sum(),
+            **dict(zip(STATUS_SIMULADOS, contagens_status.astype(np.int64))),
+        })
+
+    df_extra = df_simulado[[agrupar_por, 'N_ALUNOS']].assign(
+        RISCO_APRENDIZAGEM=n_alunos * df_simulado['RISCO_APRENDIZAGEM'].to_numpy(),
+        ANOMALIA=n_alunos * df_simulado['ANOMALIA'].to_numpy(),
+    ).groupby(agrupar_por, observed=True).sum()
+    df_status = df_simulado.groupby([agrupar_por, 'CODIGO_STATUS'], observed=True)['N_ALUNOS'].sum().unstack(fill_value=0)
+    df_status = df_status.reindex(columns=range(len(STATUS_SIMULADOS)), fill_value=0)
+    df_status.columns = STATUS_SIMULADOS
+    return df_extra.join(df_status).reset_index()
@@ -0,0 +1,168 @@
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import psutil
+    PSUTIL_DISPONIVEL = True
+except ImportError:
+    PSUTIL_DISPONIVEL = False
+
+
+# Telemetria de desenvolvimento do painel: tempo por etapa de cada rerun, tamanho
+# serializado das figuras, faltas de cache e memória do processo. Desativada, cada
+# medição custa apenas a leitura de uma ContextVar.
+
+MAX_LINHAS_HISTORICO = 5000
+ETAPA_RERUN = 'rerun_total'
+COLUNAS_HISTORICO = [
+    'TIMESTAMP', 'RERUN', 'ETAPA', 'CHAMADAS', 'SEGUNDOS', 'FALTAS_CACHE',
+    'FIGURAS', 'BYTES_FIGURAS', 'SEGUNDOS_SERIALIZACAO', 'RSS_MB'
+]
+
+_COLETOR = contextvars.ContextVar('coletor_telemetria', default=None)
+
+
+class Coletor:
+    """Medições de um único rerun do painel."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.segundos_total = None
+        self.etapas = {}
+        self.pilha = []
+
+    def etapa(self, nome):
+        return self.etapas.setdefault(nome, {
+            'CHAMADAS': 0, 'SEGUNDOS': 0.0, 'FALTAS_CACHE': 0,
+            'FIGURAS': 0, 'BYTES_FIGURAS': 0, 'SEGUNDOS_SERIALIZACAO': 0.0,
+        })
+
+    def para_dataframe(self):
+        df = pd.DataFrame.from_dict(self.etapas, orient='index')
+        df.index.name = 'ETAPA'
+        return df.reset_index()
+
+
+def iniciar():
+    """Inicia a coleta do rerun atual (chamada no topo do script)."""
+    coletor = Coletor()
+    _COLETOR.set(coletor)
+    return coletor
+
+
+def finalizar():
+    """Encerra a coleta do rerun atual e retorna o coletor (ou None se inativa)."""
+    coletor = _COLETOR.get()
+    _COLETOR.set(None)
+    if coletor is not None:
+        coletor.segundos_total = time.perf_counter() - coletor.inicio
+    return coletor
+
+
+@contextmanager
+def medir(etapa):
+    """Soma o tempo do bloco à etapa no rerun atual."""
+    coletor = _COLETOR.get()
+    if coletor is None:
+        yield
+        return
+
+    coletor.pilha.append(etapa)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        dados = coletor.etapa(etapa)
+        dados['CHAMADAS'] += 1
+        dados['SEGUNDOS'] += time.perf_counter() - inicio
+        coletor.pilha.pop()
+
+
+def cronometrar(etapa=None):
+    """Decorador que mede cada chamada da função (etapa padrão: nome da função)."""
+    def decorador(funcao):
+        nome = etapa or funcao.__name__
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            with medir(nome):
+                return funcao(*args, **kwargs)
+        return envoltorio
+    return decorador
+
+
+def registrar_falta_cache(etapa):
+    """Chamada dentro do corpo de uma função cacheada: o corpo só executa em uma falta."""
+    coletor = _COLETOR.get()
+    if coletor is not None:
+        coletor.etapa(etapa)['FALTAS_CACHE'] += 1
+
+
+def registrar_figura(fig):
+    """Mede o tamanho do JSON da figura e o atribui à etapa em execução."""
+    coletor = _COLETOR.get()
+    if coletor is None:
+        return
+
+    inicio = time.perf_counter()
+    n_bytes = len(fig.to_json().encode('utf-8'))
+    dados = coletor.etapa(coletor.pilha[-1] if coletor.pilha else 'sem_etapa')
+    dados['FIGURAS'] += 1
+    dados['BYTES_FIGURAS'] += n_bytes
+    dados['SEGUNDOS_SERIALIZACAO'] += time.perf_counter() - inicio
+
+
+def memoria_rss_mb():
+    """Memória residente (RSS) atual do processo em MB, ou None se indisponível."""
+    if PSUTIL_DISPONIVEL:
+        return psutil.Process().memory_info().rss / 2 ** 20
+    try:
+        with open('/proc/self/statm') as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Historico:
+    """Histórico circular das medições de todos os reruns do processo (seguro entre sessões)."""
+
+    def __init__(self, max_linhas=MAX_LINHAS_HISTORICO):
+        self.linhas = deque(maxlen=max_linhas)
+        self.n_reruns = 0
+        self._trava = threading.Lock()
+
+    def adicionar(self, coletor):
+        rss = memoria_rss_mb()
+        momento = datetime.now().isoformat(timespec='seconds')
+        with self._trava:
+            self.n_reruns += 1
+            for etapa, dados in coletor.etapas.items():
+                self.linhas.append({'TIMESTAMP': momento, 'RERUN': self.n_reruns, 'ETAPA': etapa, **dados, 'RSS_MB': rss})
+            self.linhas.append({
+                'TIMESTAMP': momento, 'RERUN': self.n_reruns, 'ETAPA': ETAPA_RERUN, 'CHAMADAS': 1,
+                'SEGUNDOS': coletor.segundos_total, 'FALTAS_CACHE': 0,
+                'FIGURAS': sum(d['FIGURAS'] for d in coletor.etapas.values()),
+                'BYTES_FIGURAS': sum(d['BYTES_FIGURAS'] for d in coletor.etapas.values()),
+                'SEGUNDOS_SERIALIZACAO': sum(d['SEGUNDOS_SERIALIZACAO'] for d in coletor.etapas.values()),
+                'RSS_MB': rss,
+            })
+
+    def para_dataframe(self):
+        with self._trava:
+            return pd.DataFrame(list(self.linhas), columns=COLUNAS_HISTORICO)
+
+
+def taxas_acerto_cache(df_historico, etapas_cacheadas):
+    """Chamadas, faltas e taxa de acerto de cada função cacheada no histórico."""
+    df = df_historico[df_historico['ETAPA'].isin(etapas_cacheadas)]
+    df = df.groupby('ETAPA')[['CHAMADAS', 'FALTAS_CACHE']].sum()
+    df['TAXA_ACERTO'] = 1 - df['FALTAS_CACHE'] / df['CHAMADAS']
+    return df.reset_index()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os módulos do pipeline ficam na raiz do repositório e são importados pelo nome.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+import api
+
+
+def test_cache_lru_descarta_o_menos_usado():
+    cache = api.CacheLRU(2)
+    cache.guardar('a', 1)
+    cache.guardar('b', 2)
+    assert cache.obter('a') == 1
+    cache.guardar('c', 3)
+
+    assert cache.obter('b') is None
+    assert cache.obter('a') == 1 and cache.obter('c') == 3
+    assert (cache.acertos, cache.faltas) == (3, 1)
+
+
+def test_chave_resposta_ignora_ordem_dos_parametros():
+    chave = api._chave_resposta('/kpis', {'serie': ['5EF'], 'cluster': ['2,1'], 'uf': ['35', '11']})
+    assert chave == api._chave_resposta('/kpis', {'uf': ['11,35'], 'cluster': ['1', '2'], 'serie': ['5EF']})
+    assert chave != api._chave_resposta('/clusters', {'serie': ['5EF'], 'cluster': ['1,2'], 'uf': ['11,35']})
+
+
+def test_responder_usa_o_cache_e_etag_estavel(monkeypatch):
+    chamadas = []
+
+    def rota_teste(parametros):
+        chamadas.append(parametros)
+        return {'serie': api.ler_filtros(parametros)['serie'], 'total': 3}
+
+    monkeypatch.setitem(api.ROTAS, '/teste', rota_teste)
+    monkeypatch.setattr(api, '_CACHE_RESPOSTAS', api.CacheLRU(8))
+
+    corpo, etag = api.responder('/teste', {'serie': ['5EF'], 'uf': ['11,29']})
+    assert json.loads(corpo) == {'serie': '5EF', 'total': 3}
+    assert api.responder('/teste', {'uf': ['29', '11'], 'serie': ['5EF']}) == (corpo, etag)
+    assert len(chamadas) == 1
+
+
+def test_erros_de_requisicao():
+    with pytest.raises(api.ErroRequisicao) as erro:
+        api.responder('/inexistente', {})
+    assert erro.value.status == 404
+
+    for parametros in [{}, {'serie': ['5EF'], 'uf': ['SP']}, {'serie': ['5EF'], 'disciplina': ['CN']}]:
+        with pytest.raises(api.ErroRequisicao) as erro:
+            api.ler_filtros(parametros)
+        assert erro.value.status == 400
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+import armazenamento
+
+
+@pytest.fixture(autouse=True)
+def diretorio_particoes(tmp_path, monkeypatch):
+    if not armazenamento.PYARROW_DISPONIVEL:
+        pytest.skip('pyarrow não instalado')
+    monkeypatch.setattr(armazenamento, 'DIRETORIO_PARTICOES', str(tmp_path / 'particoes'))
+
+
+@pytest.fixture
+def df_resultados():
+    return pd.DataFrame({
+        'ID_ALUNO': range(6),
+        'ID_UF': [11, 11, 29, 29, 35, 35],
+        'PROFICIENCIA_LP': [150.0, 160.0, 170.0, 180.0, 190.0, 200.0],
+    })
+
+
+def test_gravar_e_carregar_por_uf(df_resultados):
+    armazenamento.gravar_particoes(df_resultados, 'resultados', '5EF', edicao=2023)
+
+    df = armazenamento.carregar_particoes('resultados', '5EF', 2023)
+    assert sorted(df['ID_ALUNO']) == list(range(6))
+    assert armazenamento.COLUNA_PARTICAO_UF not in df.columns
+
+    df = armazenamento.carregar_particoes('resultados', '5EF', 2023, colunas=['ID_ALUNO', 'INEXISTENTE'], ufs=[29])
+    assert list(df.columns) == ['ID_ALUNO']
+    assert sorted(df['ID_ALUNO']) == [2, 3]
+    assert armazenamento.carregar_particoes('resultados', '9EF', 2023) is None
+
+
+def test_nova_edicao_nao_reescreve_as_anteriores(df_resultados):
+    armazenamento.gravar_particoes(df_resultados, 'resultados', '5EF', edicao=2021)
+    armazenamento.gravar_particoes(df_resultados.head(2), 'resultados', '5EF', edicao=2023)
+    armazenamento.gravar_particoes(df_resultados.head(1), 'resultados', '5EF', edicao=2023)
+
+    assert armazenamento.listar_edicoes('resultados', '5EF') == [2021, 2023]
+    assert armazenamento.listar_edicoes('resultados', '9EF') == []
+    assert len(armazenamento.carregar_particoes('resultados', '5EF', 2021)) == 6
+    assert len(armazenamento.carregar_particoes('resultados', '5EF', 2023)) == 1
+
+
+def test_iterar_particoes_em_lotes(df_resultados):
+    armazenamento.gravar_particoes(df_resultados.drop(columns=['ID_UF']), 'itens', '5EF', edicao=2023)
+    lotes = list(armazenamento.iterar_particoes('itens', '5EF', 2023, 4, colunas=['ID_ALUNO'], ufs=[11]))
+    assert all(len(lote) <= 4 for lote in lotes)
+    # Sem partição por UF, o filtro de UFs não se aplica.
+    assert sorted(pd.concat(lotes)['ID_ALUNO']) == list(range(6))
+    assert armazenamento.iterar_particoes('itens', '9EF', 2023, 4) is None
@@ -0,0 +1,108 @@
+import gzip
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import armazenamento
+import carregamento
+
+
+@pytest.fixture
+def df_escolas():
+    return pd.DataFrame({
+        'ID_ESCOLA': [10, 11, 12, 13, 14, 15, 16],
+        'ID_UF': [11, 11, 29, 29, 35, 35, 35],
+        'TOTAL_ALUNOS': [30, 5, 40, 40, 12, 50, 8],
+        'TAXA_RISCO': [0.5, 0.9, 0.5, 0.2, np.nan, 0.7, 0.5],
+    })
+
+
+def test_paginar_escolas_sem_sobreposicao(df_escolas):
+    paginas = [carregamento.paginar_escolas(df_escolas, pagina, 3, 'TAXA_RISCO') for pagina in range(3)]
+    assert [total for _, total in paginas] == [7, 7, 7]
+    ids = [i for df, _ in paginas for i in df['ID_ESCOLA']]
+    # Empates na taxa (0.5) são desfeitos pelo ID_ESCOLA e o NaN fica por último.
+    assert ids == [11, 15, 10, 12, 16, 13, 14]
+
+
+def test_paginar_escolas_com_filtros(df_escolas):
+    df, total = carregamento.paginar_escolas(df_escolas, 0, 10, 'TOTAL_ALUNOS', ascendente=True,
+                                             ufs=[29, 35], min_alunos=10)
+    assert total == 4
+    assert df['ID_ESCOLA'].tolist() == [14, 12, 13, 15]
+
+    df, total = carregamento.paginar_escolas(df_escolas, 5, 10, 'TAXA_RISCO', busca='1')
+    assert total == 7 and df.empty
+
+
+@pytest.fixture
+def particoes(tmp_path, monkeypatch):
+    if not carregamento.PYARROW_DISPONIVEL:
+        pytest.skip('pyarrow não instalado')
+    monkeypatch.setattr(armazenamento, 'DIRETORIO_PARTICOES', str(tmp_path / 'particoes'))
+    df = pd.DataFrame({
+        'ID_ALUNO': np.arange(1, 11),
+        'ID_ESCOLA': [100.0, 100.0, np.nan, 200.0, 200.0, 200.0, 300.0, 300.0, 300.0, 300.0],
+        'ID_UF': [11, 11, 11, 29, 29, 29, 35, 35, 35, 35],
+        'CLUSTER': ['1', '4', '2', '5', '0', '1', '3', '6', '4', '2'],
+        'STATUS_RISCO_FINAL': ['Alto Risco', None, 'Alto Risco', 'Risco Moderado', 'Normal',
+                               'Alto Risco', 'Alto Risco', 'Risco Moderado', 'Superdotação', 'Alto Risco'],
+        'PROFICIENCIA_LP': np.linspace(150, 250, 10),
+        'PROFICIENCIA_MT': np.linspace(160, 260, 10),
+        'SCORE_ANOMALIA': np.linspace(-0.1, 0.1, 10),
+    })
+    armazenamento.gravar_particoes(df, 'resultados', '5EF', edicao=2023)
+    # Edição antiga, sem o score de anomalia.
+    armazenamento.gravar_particoes(df.drop(columns=['SCORE_ANOMALIA']), 'resultados', '5EF', edicao=2021)
+    return df
+
+
+def _exportar(formato, **filtros):
+    arquivo = io.BytesIO()
+    n_alunos = carregamento.exportar_alunos(arquivo, formato, '5EF', filtros.pop('edicao', 2023),
+                                            tamanho_lote=3, **filtros)
+    arquivo.seek(0)
+    if formato == 'parquet':
+        return n_alunos, pd.read_parquet(arquivo)
+    return n_alunos, pd.read_csv(gzip.GzipFile(fileobj=arquivo), sep=';', dtype={'CLUSTER': str})
+
+
+@pytest.mark.parametrize('formato', carregamento.FORMATOS_EXPORTACAO_ALUNOS)
+def test_exportar_alunos_filtrados(particoes, formato):
+    n_alunos, df = _exportar(formato, ufs=[11, 29], status=['Alto Risco', 'Normal'])
+    assert n_alunos == len(df) == 5
+    assert list(df.columns) == list(carregamento.TIPOS_EXPORTACAO_ALUNOS)
+    assert sorted(df['ID_ALUNO']) == [1, 2, 3, 5, 6]
+    # Status ausente conta como 'Normal'; escola nula sai vazia em vez de falhar.
+    assert df['ID_ESCOLA'].isna().sum() == 1
+    assert set(df['UF_DESCRICAO']) == {carregamento.MAPA_UF[11], carregamento.MAPA_UF[29]}
+
+
+@pytest.mark.parametrize('formato', carregamento.FORMATOS_EXPORTACAO_ALUNOS)
+def test_exportar_edicao_sem_coluna_e_resultado_vazio(particoes, formato):
+    n_alunos, df = _exportar(formato, edicao=2021, clusters=['4'])
+    assert n_alunos == 2
+    assert df['SCORE_ANOMALIA'].isna().all()
+
+    n_alunos, df = _exportar(formato, ufs=[53])
+    assert n_alunos == 0 and df.empty
+    assert list(df.columns) == list(carregamento.TIPOS_EXPORTACAO_ALUNOS)
+
+
+def test_exportar_formato_invalido():
+    with pytest.raises(ValueError):
+        carregamento.exportar_alunos(io.BytesIO(), 'xlsx', '5EF', 2023)
+
+
+def test_exportar_do_csv_legado(particoes, tmp_path, monkeypatch):
+    caminho = tmp_path / 'resultados_finais_5EF.csv.gz'
+    particoes.drop(columns=['SCORE_ANOMALIA']).to_csv(caminho, sep=';', encoding='utf-8', index=False)
+    monkeypatch.setitem(carregamento.ARQUIVOS_SERIES['5EF'], 'resultados', str(caminho))
+    monkeypatch.setattr(armazenamento, 'DIRETORIO_PARTICOES', str(tmp_path / 'sem_particoes'))
+
+    n_alunos, df = _exportar('csv.gz', edicao=carregamento.EDICAO_ARQUIVOS_LEGADOS, ufs=[11])
+    assert n_alunos == 3
+    assert df['ID_ESCOLA'].isna().sum() == 1
+    assert df['SCORE_ANOMALIA'].isna().all()
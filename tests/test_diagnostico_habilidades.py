@@ -0,0 +1,71 @@
+import unicodedata
+
+import numpy as np
+import pytest
+
+import diagnostico_habilidades
+from diagnostico_habilidades import intervalo_wilson
+
+
+def test_intervalo_wilson_valores_conhecidos():
+    inferior, superior = intervalo_wilson([3, 50, 0, 10], [10, 100, 10, 10])
+    np.testing.assert_allclose(inferior, [0.1078, 0.4038, 0.0, 0.7225], atol=1e-4)
+    np.testing.assert_allclose(superior, [0.6032, 0.5962, 0.2775, 1.0], atol=1e-4)
+
+
+def test_intervalo_wilson_sem_observacoes():
+    inferior, superior = intervalo_wilson([0, 2], [0, 4])
+    assert (inferior[0], superior[0]) == (0.0, 1.0)
+    assert 0 < inferior[1] < 0.5 < superior[1] < 1
+
+
+def test_intervalo_wilson_escalar_e_nivel_de_confianca():
+    inferior_95, superior_95 = intervalo_wilson(3, 10)
+    inferior_99, superior_99 = intervalo_wilson(3, 10, z=2.5758)
+    assert np.ndim(inferior_95) == 0
+    assert inferior_99 < inferior_95 and superior_99 > superior_95
+    assert inferior_95 == pytest.approx(0.1078, abs=1e-4)
+
+
+DESCRICOES = {
+    'D1': 'Localizar informações explícitas em um texto.',
+    'D3': 'Inferir o sentido de uma palavra ou expressão.',
+    'D5': 'Interpretar texto com auxílio de material gráfico – SÃO PAULO.',
+}
+
+
+def _matriz(descricoes):
+    linhas = ['NU_DESCRITOR_HABILIDADE;TP_DISCIPLINA;DESCRICAO']
+    linhas += [f'{descritor};LP;{descricao}' for descritor, descricao in descricoes.items()]
+    return '\n'.join(linhas) + '\n'
+
+
+@pytest.mark.parametrize('codificar', [
+    lambda texto: texto.encode('utf-8'),
+    lambda texto: texto.replace('–', '-').encode('latin-1'),
+    # UTF-8 decodificado como latin-1 e gravado de novo em UTF-8 (mojibake).
+    lambda texto: texto.encode('utf-8').decode('latin-1').encode('utf-8'),
+    lambda texto: unicodedata.normalize('NFD', texto).encode('utf-8'),
+], ids=['utf8', 'latin1', 'utf8_duplo', 'nfd'])
+def test_dicionario_descritores_em_utf8_nfc(tmp_path, monkeypatch, codificar):
+    caminho_matriz = tmp_path / 'descritores.csv'
+    caminho_matriz.write_bytes(codificar(_matriz(DESCRICOES)))
+    monkeypatch.setitem(diagnostico_habilidades.ARQUIVOS_SERIES, 'TESTE', {
+        'matriz': str(caminho_matriz), 'dicionario': str(tmp_path / 'saida' / 'dicionario.csv'),
+    })
+
+    df = diagnostico_habilidades.gerar_dicionario_descritores('TESTE')
+    gravado = (tmp_path / 'saida' / 'dicionario.csv').read_bytes().decode('utf-8')
+
+    for descritor, descricao in DESCRICOES.items():
+        obtido = df.set_index('NU_DESCRITOR_HABILIDADE').loc[descritor, 'DESCRICAO_HABILIDADE']
+        assert obtido.replace('–', '-') == descricao.replace('–', '-')
+        assert unicodedata.is_normalized('NFC', obtido)
+        assert obtido in gravado
+
+
+def test_normalizar_texto():
+    assert diagnostico_habilidades.normalizar_texto('  informaÃ§Ãµes ') == 'informações'
+    # 'Ã' legítimo não é alterado.
+    assert diagnostico_habilidades.normalizar_texto('SÃO PAULO') == 'SÃO PAULO'
+    assert np.isnan(diagnostico_habilidades.normalizar_texto(float('nan')))
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+import estatisticas_itens as ei
+
+
+N_CLUSTERS = 3
+GABARITOS = {('TX_RESP_BLOCO1_LP', 0): 'A', ('TX_RESP_BLOCO1_LP', 1): 'C', ('TX_RESP_BLOCO1_LP', 2): 'E',
+             ('TX_RESP_BLOCO1_MT', 0): 'B', ('TX_RESP_BLOCO1_MT', 1): 'D'}
+MAP_ITENS = {
+    chave: {ei.COLUNA_ID_ITEM: f'{chave[0][-2:]}{chave[1]}', ei.COLUNA_DISCIPLINA: chave[0][-2:],
+            ei.COLUNA_DESCRITOR: f'D{chave[1] + 1}', ei.COLUNA_GABARITO: gabarito}
+    for chave, gabarito in GABARITOS.items()
+}
+
+
+@pytest.fixture
+def df_alunos():
+    rng = np.random.default_rng(11)
+    n = 400
+    simbolos = np.array(list('ABCDE.*'))
+
+    def respostas(largura):
+        textos = [''.join(linha) for linha in rng.choice(simbolos, (n, largura), p=[.2, .2, .2, .15, .15, .05, .05])]
+        return pd.Series(textos).mask(rng.random(n) < 0.03)
+
+    return pd.DataFrame({
+        'TX_RESP_BLOCO1_LP': respostas(3),
+        # Algumas respostas de MT truncadas: posições ausentes contam como 'OUTRO'.
+        'TX_RESP_BLOCO1_MT': respostas(2).where(rng.random(n) > 0.05, 'B'),
+        ei.COLUNA_CLUSTER: rng.integers(0, N_CLUSTERS, n).astype(str),
+        'PROFICIENCIA_LP': rng.normal(210, 45, n),
+        'PROFICIENCIA_MT': rng.normal(220, 45, n),
+    })
+
+
+def _calcular(df_alunos, n_blocos):
+    estatisticas = ei.iniciar_estatisticas_itens(MAP_ITENS, N_CLUSTERS)
+    for indices in np.array_split(np.arange(len(df_alunos)), n_blocos):
+        ei.acumular_estatisticas_itens(estatisticas, df_alunos.iloc[indices])
+    return ei.finalizar_estatisticas_itens(estatisticas)
+
+
+def _respostas_item(df_alunos, coluna, posicao):
+    return df_alunos[coluna].fillna('').str.ljust(posicao + 1).str[posicao].replace(' ', '.')
+
+
+def test_estatisticas_iguais_ao_calculo_direto(df_alunos):
+    df_estatisticas, _ = _calcular(df_alunos, 1)
+    df_estatisticas = df_estatisticas.set_index(ei.COLUNA_ID_ITEM)
+
+    for (coluna, posicao), gabarito in GABARITOS.items():
+        item = MAP_ITENS[(coluna, posicao)]
+        respostas = _respostas_item(df_alunos, coluna, posicao)
+        # Branco, rasura e dupla marcação ficam fora do denominador do p-valor.
+        respondeu = respostas.isin(list('ABCDE'))
+        acertou = (respostas[respondeu] == gabarito).astype(int)
+        proficiencia = df_alunos.loc[respondeu, f"PROFICIENCIA_{item[ei.COLUNA_DISCIPLINA]}"]
+
+        linha = df_estatisticas.loc[item[ei.COLUNA_ID_ITEM]]
+        assert linha['N_RESPOSTAS'] == respondeu.sum()
+        assert linha['P_VALOR'] == pytest.approx(acertou.mean())
+        assert linha['PONTO_BISSERIAL'] == pytest.approx(stats.pointbiserialr(acertou, proficiencia).statistic)
+
+
+def test_blocos_nao_alteram_o_resultado(df_alunos):
+    inteiro = _calcular(df_alunos, 1)
+    em_blocos = _calcular(df_alunos, 7)
+    pd.testing.assert_frame_equal(inteiro[0], em_blocos[0], check_exact=False, rtol=1e-10)
+    pd.testing.assert_frame_equal(inteiro[1], em_blocos[1])
+
+
+def test_frequencia_das_alternativas_por_cluster(df_alunos):
+    _, df_alternativas = _calcular(df_alunos, 3)
+    for (coluna, posicao), item in MAP_ITENS.items():
+        respostas = _respostas_item(df_alunos, coluna, posicao).where(lambda r: r.isin(list('ABCDE')), 'OUTRO')
+        esperado = pd.crosstab(df_alunos[ei.COLUNA_CLUSTER], respostas).stack()
+        esperado = esperado[esperado > 0]
+
+        obtido = df_alternativas[df_alternativas[ei.COLUNA_ID_ITEM] == item[ei.COLUNA_ID_ITEM]]
+        obtido = obtido.set_index([ei.COLUNA_CLUSTER, 'ALTERNATIVA'])['N_RESPOSTAS']
+        assert obtido.sort_index().to_dict() == esperado.sort_index().to_dict()
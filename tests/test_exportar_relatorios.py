@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import armazenamento
+import carregamento
+import exportar_relatorios as er
+
+
+@pytest.fixture
+def dados(monkeypatch, tmp_path):
+    # Escolas lidas como float (IDs nulos no relatório): 50001.0, 50002.0, 50003.0 e um aluno sem escola.
+    df_alunos = pd.DataFrame({
+        'ID_ALUNO': np.arange(1, 9),
+        'ID_ESCOLA': [50001.0, 50001.0, 50002.0, 50002.0, 50003.0, 50003.0, 50003.0, np.nan],
+        'ID_UF': [11, 11, 29, 29, 35, 35, 35, 35],
+        'CLUSTER': ['0', '3', '4', '0', '1', '4', '3', '0'],
+        'STATUS_RISCO_FINAL': ['Risco Moderado', 'Alto Risco', 'Normal', 'Risco Moderado',
+                               'Alto Risco', 'Normal', 'Alto Risco', 'Risco Moderado'],
+        'PROFICIENCIA_LP': [180.0, 150.0, 240.0, 190.0, 160.0, 250.0, 140.0, 200.0],
+        'PROFICIENCIA_MT': [185.0, 155.0, 245.0, 195.0, 210.0, 255.0, 145.0, 205.0],
+    })
+    df_diag = pd.DataFrame([
+        {'CLUSTER': cluster, 'TP_DISCIPLINA': 'LP', 'NU_DESCRITOR_HABILIDADE': descritor,
+         'DESCRICAO_HABILIDADE': f'Habilidade {descritor}', 'TAXA_ERRO': taxa}
+        for cluster, taxa in [('0', 0.5), ('1', 0.7), ('3', 0.8), ('4', 0.2)]
+        for descritor in ['D1', 'D2']
+    ])
+    monkeypatch.setattr(carregamento, 'carregar_dados', lambda serie, edicao: (df_alunos, df_diag))
+    # Sem perfis gravados: as taxas por habilidade são estimadas pela composição de clusters.
+    monkeypatch.setattr(armazenamento, 'DIRETORIO_PARTICOES', str(tmp_path / 'particoes'))
+    return tmp_path / 'relatorios'
+
+
+def _exportar(saida, **kwargs):
+    return er.exportar_relatorios('5EF', 2023, 'escola', formatos=['html', 'csv'], diretorio_saida=str(saida),
+                                  processos=1, **kwargs)
+
+
+def test_exportacao_retomada(dados):
+    diretorio = dados / '2023' / '5EF' / 'escola'
+
+    primeira = _exportar(dados, limite=2)
+    assert primeira['GERADOS'] == 2 and primeira['PULADOS'] == 0 and primeira['FALHAS'] == 0
+
+    segunda = _exportar(dados)
+    assert segunda['GERADOS'] == 1 and segunda['PULADOS'] == 2
+
+    # Nenhuma chave nula ou fracionária: a terceira execução não tem nada a fazer.
+    terceira = _exportar(dados)
+    assert terceira['GERADOS'] == 0 and terceira['PULADOS'] == 3
+
+    relatorios = sorted(f for f in os.listdir(diretorio) if f.startswith('escola_'))
+    assert relatorios == [f'escola_{escola}.{formato}' for escola in (50001, 50002, 50003) for formato in ('csv', 'html')]
+
+    df_resumo = pd.read_csv(diretorio / 'resumo_escola.csv', sep=';')
+    assert df_resumo['ID_ESCOLA'].tolist() == [50001, 50002, 50003]
+
+
+def test_relatorio_renderizado(dados):
+    _exportar(dados, limite=1)
+    diretorio = dados / '2023' / '5EF' / 'escola'
+
+    conteudo = (diretorio / 'escola_50001.html').read_text(encoding='utf-8')
+    assert 'Relatório de Diagnóstico - Escola 50001 (RO - Rondônia)' in conteudo
+    assert 'SAEB 2023 - Série 5EF' in conteudo
+    assert 'estimadas a partir da composição de clusters' in conteudo
+    assert 'Habilidade D1' in conteudo
+
+    df_csv = pd.read_csv(diretorio / 'escola_50001.csv', sep=';')
+    assert df_csv['ID_ESCOLA'].unique().tolist() == [50001]
+    assert df_csv['ESTIMADO'].unique().tolist() == [1]
+    # Escola com um aluno do cluster 0 e um do cluster 3: média das taxas nacionais dos dois.
+    assert df_csv['TAXA_ERRO'].tolist() == pytest.approx([0.65, 0.65])
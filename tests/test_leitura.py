@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+import leitura
+
+
+@pytest.fixture
+def csv_alunos(tmp_path):
+    caminho = tmp_path / 'alunos.csv'
+    df = pd.DataFrame({'ID_ALUNO': range(1000), 'ID_UF': [11] * 1000, 'NOTA': ['1.5'] * 1000})
+    df.to_csv(caminho, sep=';', index=False, encoding='latin-1')
+    return caminho
+
+
+def test_colunas_ausentes_geram_erro(csv_alunos):
+    with pytest.raises(ValueError, match='INEXISTENTE'):
+        leitura.ler_csv(csv_alunos, colunas=['ID_ALUNO', 'INEXISTENTE'])
+    with pytest.raises(ValueError, match='INEXISTENTE'):
+        next(iter(leitura.ler_csv_em_blocos(csv_alunos, 100, colunas=['ID_ALUNO', 'INEXISTENTE'])))
+
+
+@pytest.mark.parametrize('motor', ['c', 'pyarrow'])
+def test_blocos_preservam_linhas_e_projecao(csv_alunos, motor):
+    blocos = list(leitura.ler_csv_em_blocos(csv_alunos, 300, colunas=['ID_UF', 'ID_ALUNO'],
+                                            dtype={'ID_ALUNO': 'int64', 'ID_UF': 'int64'}, motor=motor))
+    assert [len(b) for b in blocos] == [300, 300, 300, 100]
+    df = pd.concat(blocos, ignore_index=True)
+    assert list(df.columns) == ['ID_ALUNO', 'ID_UF']
+    assert df['ID_ALUNO'].tolist() == list(range(1000))
+
+
+def test_blocos_voltam_para_pandas_sem_repetir_linhas(csv_alunos, monkeypatch):
+    if not leitura.PYARROW_DISPONIVEL:
+        pytest.skip('pyarrow não instalado')
+    blocos_pyarrow = leitura._blocos_pyarrow
+
+    def falhar_no_terceiro_bloco(*args):
+        gerador = blocos_pyarrow(*args)
+        yield next(gerador)
+        yield next(gerador)
+        raise leitura.pa.ArrowInvalid('falha simulada')
+
+    monkeypatch.setattr(leitura, '_blocos_pyarrow', falhar_no_terceiro_bloco)
+    blocos = list(leitura.ler_csv_em_blocos(csv_alunos, 300, dtype={'ID_ALUNO': 'int64'}, motor='pyarrow'))
+    df = pd.concat(blocos, ignore_index=True)
+    assert df['ID_ALUNO'].tolist() == list(range(1000))
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import leitura
+import main
+
+
+def _alunos(escolas, ufs, riscos):
+    return pd.DataFrame({
+        'ID_ESCOLA': escolas,
+        'ID_UF': ufs,
+        'PROFICIENCIA_LP': [200.0] * len(escolas),
+        'PROFICIENCIA_MT': [220.0] * len(escolas),
+        'RISCO_APRENDIZAGEM': np.array(riscos, dtype=np.int8),
+        'STATUS_RISCO_FINAL': ['Alto Risco'] * len(escolas),
+    })
+
+
+def test_generate_reports_ignora_escola_nula_sem_misturar_series():
+    # ID_ESCOLA nulo chega como NaN (float) quando a coluna int64 é lida pelo pyarrow.
+    dados_series = {
+        '5EF': _alunos([1.0, 2.0, np.nan], [11, 12, 11], [1, 0, 1]),
+        '9EF': _alunos([np.nan, 3.0, 3.0], [13, 13, 13], [1, 1, 0]),
+    }
+    df_escolas = main.generate_reports(dados_series).set_index(['SERIE', 'ID_ESCOLA'])
+
+    assert sorted(df_escolas.index) == [('5EF', 1.0), ('5EF', 2.0), ('9EF', 3.0)]
+    assert df_escolas.loc[('5EF', 1.0), 'ALUNOS_RISCO'] == 1
+    assert df_escolas.loc[('5EF', 2.0), 'ID_UF'] == 12
+    assert df_escolas.loc[('9EF', 3.0), 'TOTAL_ALUNOS'] == 2
+    assert df_escolas.loc[('9EF', 3.0), 'TAXA_RISCO'] == 0.5
+    assert df_escolas['ALUNOS_ALTO_RISCO'].sum() == 4
+
+
+def test_agregar_em_blocos_igual_a_serie_inteira(tmp_path):
+    rng = np.random.default_rng(7)
+    n = 5000
+    df = pd.DataFrame({
+        'ID_ESCOLA': rng.integers(1, 60, n),
+        'ID_UF': 11,
+        'PROFICIENCIA_LP': rng.normal(210, 45, n).round(2),
+        'PROFICIENCIA_MT': rng.normal(220, 45, n).round(2),
+        'STATUS_RISCO_FINAL': rng.choice(['Normal', 'Risco Moderado', 'Alto Risco'], n),
+    })
+    df.loc[rng.choice(n, 50, replace=False), 'PROFICIENCIA_MT'] = np.nan
+    caminho = tmp_path / 'resultados_finais_5EF.csv.gz'
+    df.to_csv(caminho, sep=';', encoding='utf-8', compression='gzip', index=False)
+
+    df_somas = main.agregar_serie_em_blocos(str(caminho), '5EF', tamanho_bloco=700)
+    em_blocos = main.montar_relatorio_escolas({'5EF': df_somas}).sort_values('ID_ESCOLA', ignore_index=True)
+
+    df_completo = main.adicionar_medidas_risco(df.dropna(subset=['PROFICIENCIA_LP', 'PROFICIENCIA_MT']).copy())
+    limiares = main.calcular_limiares_risco(main.atualizar_sketches_risco(main.criar_sketches_risco(), df_completo))
+    esperado = main.generate_reports({'5EF': main.calculate_risk_indicators(df_completo, *limiares)})
+    esperado = esperado.sort_values('ID_ESCOLA', ignore_index=True)
+
+    pd.testing.assert_frame_equal(em_blocos, esperado, check_dtype=False)
+    assert em_blocos['TOTAL_ALUNOS'].sum() == n - 50
+
+
+@pytest.mark.parametrize('motor', ['pyarrow', 'c'])
+def test_agregar_em_blocos_com_escola_nula(tmp_path, monkeypatch, motor):
+    monkeypatch.setattr(leitura, 'MOTOR_PADRAO', motor)
+    df = _alunos([1, 1, np.nan, 2], [11, 11, 11, 29], [0, 0, 0, 0]).drop(columns=['RISCO_APRENDIZAGEM'])
+    caminho = tmp_path / 'resultados_finais_5EF.csv.gz'
+    # Com o nulo, o pandas grava ID_ESCOLA como float ('1.0').
+    df.to_csv(caminho, sep=';', encoding='utf-8', compression='gzip', index=False)
+
+    df_escolas = main.montar_relatorio_escolas({'5EF': main.agregar_serie_em_blocos(str(caminho), '5EF', 2)})
+    assert df_escolas['ID_ESCOLA'].dtype == np.int64
+    assert df_escolas.set_index('ID_ESCOLA')['TOTAL_ALUNOS'].to_dict() == {1: 2, 2: 1}
+    assert df_escolas.set_index('ID_ESCOLA')['ID_UF'].to_dict() == {1: 11, 2: 29}
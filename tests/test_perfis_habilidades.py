@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import perfis_habilidades as ph
+
+
+MAP_ITENS = {
+    'LP_1': {ph.COLUNA_DISCIPLINA: 'LP', ph.COLUNA_DESCRITOR: 'D1'},
+    'LP_2': {ph.COLUNA_DISCIPLINA: 'LP', ph.COLUNA_DESCRITOR: 'D2'},
+    'MT_1': {ph.COLUNA_DISCIPLINA: 'MT', ph.COLUNA_DESCRITOR: 'D1'},
+}
+
+
+def _acertos(linhas):
+    return pd.DataFrame(linhas, columns=[ph.COLUNA_ID_ALUNO, ph.COLUNA_ID_ESCOLA, ph.COLUNA_DISCIPLINA,
+                                         ph.COLUNA_DESCRITOR, 'ACERTO'])
+
+
+@pytest.fixture
+def diretorio_perfis(tmp_path):
+    indice = ph.criar_indice_descritores(MAP_ITENS)
+    partes = [
+        ph.montar_perfis_chunk(_acertos([
+            ('30', '200', 'LP', 'D1', 1), ('30', '200', 'LP', 'D2', 0),
+            ('10', '100', 'LP', 'D1', 0), ('10', '100', 'MT', 'D1', 1),
+        ]), indice),
+        ph.montar_perfis_chunk(_acertos([
+            ('20', '100', 'LP', 'D1', 1), ('20', '100', 'MT', 'D1', 1),
+            ('10', '999', 'LP', 'D2', 1),  # ID repetido em outro bloco: vale a primeira ocorrência
+        ]), indice),
+    ]
+    diretorio = tmp_path / 'perfis'
+    ph.gravar_perfis(str(diretorio), partes, indice)
+    return str(diretorio)
+
+
+def test_buscar_aluno(diretorio_perfis):
+    perfis = ph.abrir_perfis(diretorio_perfis)
+    df = ph.buscar_aluno(perfis, '10').set_index([ph.COLUNA_DISCIPLINA, ph.COLUNA_DESCRITOR])
+    assert df.loc[('LP', 'D1'), 'RESULTADO'] == 'Errou'
+    assert df.loc[('LP', 'D2'), 'RESULTADO'] == 'Não respondeu'
+    assert df.loc[('MT', 'D1'), 'RESULTADO'] == 'Acertou'
+    assert (df[ph.COLUNA_ID_ESCOLA] == 100).all()
+    assert ph.buscar_aluno(perfis, '15') is None
+
+
+def test_indice_escolas_mapeado_em_disco(diretorio_perfis):
+    perfis = ph.abrir_perfis(diretorio_perfis)
+    assert isinstance(perfis['escolas_unicas'], np.memmap)
+    assert isinstance(perfis['inicio_escola'], np.memmap)
+    assert perfis['escolas_unicas'].tolist() == [100, 200]
+    assert perfis['inicio_escola'].tolist() == [0, 2, 3]
+
+
+def test_buscar_escolas(diretorio_perfis):
+    perfis = ph.abrir_perfis(diretorio_perfis)
+    df = ph.buscar_escola(perfis, 100).set_index([ph.COLUNA_DISCIPLINA, ph.COLUNA_DESCRITOR])
+    assert df.attrs['total_alunos'] == 2
+    assert df.loc[('LP', 'D1'), 'N_ALUNOS'] == 2
+    assert df.loc[('LP', 'D1'), 'TAXA_ERRO'] == pytest.approx(0.5)
+    assert df.loc[('MT', 'D1'), 'TAXA_ERRO'] == pytest.approx(0.0)
+    assert np.isnan(df.loc[('LP', 'D2'), 'TAXA_ERRO'])
+
+    df_todas = ph.buscar_escolas(perfis, [200, 100, 100, 555], tamanho_bloco=1)
+    assert df_todas.attrs['total_alunos'] == 3
+    assert df_todas['N_ALUNOS'].tolist() == [3, 1, 2]
+    assert ph.buscar_escolas(perfis, [1, 555]) is None
+
+
+
+def test_perfis_por_edicao(tmp_path, monkeypatch):
+    import armazenamento
+
+    monkeypatch.setattr(armazenamento, 'DIRETORIO_PARTICOES', str(tmp_path / 'particoes'))
+    indice = ph.criar_indice_descritores(MAP_ITENS)
+
+    def gravar(edicao, linhas):
+        ph.gravar_perfis(armazenamento.diretorio_perfis('5EF', edicao), [ph.montar_perfis_chunk(_acertos(linhas), indice)], indice)
+
+    gravar(2021, [('1', '100', 'LP', 'D1', 1)])
+    gravar(2023, [('2', '200', 'LP', 'D1', 0)])
+    # Reprocessar uma edição substitui só os perfis dela.
+    gravar(2023, [('3', '300', 'MT', 'D1', 1)])
+
+    assert armazenamento.listar_edicoes(armazenamento.TABELA_PERFIS, '5EF') == [2021, 2023]
+    perfis_2021 = ph.abrir_perfis(armazenamento.diretorio_perfis('5EF', 2021))
+    perfis_2023 = ph.abrir_perfis(armazenamento.diretorio_perfis('5EF', 2023))
+    assert perfis_2021['id_aluno'].tolist() == [1]
+    assert perfis_2023['id_aluno'].tolist() == [3]
+    assert ph.abrir_perfis(armazenamento.diretorio_perfis('9EF', 2023)) is None
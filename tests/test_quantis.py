@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import quantis
+
+
+QUANTIS = [0.0, 0.01, 0.1, 0.3, 0.5, 0.7, 0.9, 0.99, 1.0]
+
+
+@pytest.fixture
+def valores():
+    rng = np.random.default_rng(42)
+    return np.concatenate([rng.normal(210, 45, 200_000), rng.gamma(2, 30, 100_000)])
+
+
+def test_quantis_mesclados_dentro_do_limite_de_erro(valores):
+    parciais = [quantis.atualizar_sketch(quantis.criar_sketch(), bloco) for bloco in np.array_split(valores, 7)]
+    sketch = quantis.mesclar_sketches(*parciais)
+
+    exatos = pd.Series(valores).quantile(QUANTIS).to_numpy()
+    aproximados = quantis.quantil_sketch(sketch, QUANTIS)
+    np.testing.assert_allclose(aproximados, exatos, rtol=0, atol=sketch['largura'])
+
+
+def test_mescla_independe_da_divisao_em_blocos(valores):
+    inteiro = quantis.atualizar_sketch(quantis.criar_sketch(), valores)
+    parciais = [quantis.atualizar_sketch(quantis.criar_sketch(), bloco) for bloco in np.array_split(valores, 13)]
+    mesclado = quantis.mesclar_sketches(*reversed(parciais))
+
+    np.testing.assert_array_equal(mesclado['contagens'], inteiro['contagens'])
+    assert quantis.quantil_sketch(mesclado, 0.3) == quantis.quantil_sketch(inteiro, 0.3)
+
+
+def test_valores_fora_da_grade_e_ausentes():
+    sketch = quantis.atualizar_sketch(quantis.criar_sketch(inicio=0, fim=10, largura=1),
+                                      [-50.0, 1.5, 2.5, np.nan, 80.0])
+    assert sketch['contagens'].sum() == 4
+    assert quantis.quantil_sketch(sketch, 0.0) == -50.0
+    assert quantis.quantil_sketch(sketch, 1.0) == 80.0
+    assert np.isnan(quantis.quantil_sketch(quantis.criar_sketch(), 0.5))
+
+
+def test_mesclar_grades_diferentes_gera_erro():
+    with pytest.raises(ValueError):
+        quantis.mesclar_sketches(quantis.criar_sketch(), quantis.criar_sketch(largura=0.1))
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import selecao_k
+from analise import COLUNAS_MANTER
+
+
+def _resultado(k, seed, rotulos, inercia, silhueta):
+    return {'K': k, 'SEED': seed, 'INERCIA': inercia, 'SILHUETA': silhueta, 'DAVIES_BOULDIN': 1.0 + k,
+            'SEGUNDOS': 0.5, 'ROTULOS': np.array(rotulos, dtype=np.int8)}
+
+
+def test_resumir_resultados_estabilidade_e_medias():
+    resultados = [
+        # K=2: as três seeds dão a mesma partição (rótulos trocados não importam para o ARI).
+        _resultado(2, 42, [0, 0, 1, 1, 1, 1], 10.0, 0.5),
+        _resultado(2, 43, [1, 1, 0, 0, 0, 0], 12.0, 0.7),
+        _resultado(2, 44, [0, 0, 1, 1, 1, 1], 14.0, 0.6),
+        # K=3: duas seeds com partições diferentes.
+        _resultado(3, 43, [0, 1, 2, 0, 1, 2], 6.0, 0.2),
+        _resultado(3, 42, [0, 0, 1, 1, 2, 2], 8.0, 0.4),
+        # K=4: uma única seed, sem pares para o ARI.
+        _resultado(4, 42, [0, 1, 2, 3, 0, 1], 3.0, 0.1),
+    ]
+    df = selecao_k.resumir_resultados(resultados).set_index('K')
+
+    assert df.index.tolist() == [2, 3, 4]
+    assert df['N_SEEDS'].tolist() == [3, 2, 1]
+    assert df.loc[2, 'INERCIA'] == pytest.approx(12.0)
+    assert df.loc[2, 'SILHUETA'] == pytest.approx(0.6)
+    assert df.loc[3, 'DAVIES_BOULDIN'] == pytest.approx(4.0)
+    assert df.loc[2, 'ESTABILIDADE_ARI'] == pytest.approx(1.0)
+    assert df.loc[3, 'ESTABILIDADE_ARI'] == pytest.approx(-0.25)
+    assert np.isnan(df.loc[4, 'ESTABILIDADE_ARI'])
+
+
+@pytest.fixture
+def csv_alunos(tmp_path):
+    rng = np.random.default_rng(5)
+    n = 600
+    df = pd.DataFrame({
+        'ID_ALUNO': np.arange(n),
+        'ID_ESCOLA': rng.integers(1, 20, n),
+        'ID_UF': rng.choice([11, 29, 35], n),
+        'PROFICIENCIA_LP': rng.normal(210, 45, n),
+        'PROFICIENCIA_MT': rng.normal(220, 45, n),
+        'TX_RESP_Q05a': 'A', 'TX_RESP_Q05b': 'A', 'TX_RESP_Q05c': 'A',
+    })[COLUNAS_MANTER]
+    caminho = tmp_path / 'TS_ALUNO.csv'
+    df.to_csv(caminho, sep=';', index=False, encoding='latin-1')
+    return str(caminho)
+
+
+def test_selecionar_k_em_paralelo(csv_alunos):
+    df = selecao_k.selecionar_k(csv_alunos, k_min=2, k_max=3, tamanho_amostra=400, n_seeds=2,
+                                tamanho_silhueta=200, processos=2)
+    assert df['K'].tolist() == [2, 3]
+    assert df['N_SEEDS'].tolist() == [2, 2]
+
+
+def test_selecionar_k_sem_orcamento(csv_alunos):
+    assert selecao_k.selecionar_k(csv_alunos, k_min=2, k_max=3, n_seeds=1, processos=1, orcamento_segundos=0) is None
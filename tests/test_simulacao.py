@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import simulacao
+from analise import classificar_risco_final
+from configuracao import CONFIG_SERIES
+
+
+@pytest.fixture
+def df_alunos():
+    rng = np.random.default_rng(3)
+    n = 20000
+    return pd.DataFrame({
+        'ID_UF': rng.choice([11, 29, 35], n),
+        'CLUSTER': rng.integers(0, 7, n).astype(str),
+        'TX_RESP_Q05c': rng.choice(['A', 'B'], n, p=[0.9, 0.1]),
+        'PROFICIENCIA_LP': rng.normal(210, 45, n),
+        'PROFICIENCIA_MT': rng.normal(220, 45, n),
+        'SCORE_ANOMALIA': rng.normal(0.08, 0.06, n),
+    })
+
+
+def test_histograma_preserva_total_de_alunos(df_alunos):
+    df_hist = simulacao.gerar_histogramas_risco(df_alunos)
+    assert df_hist['N_ALUNOS'].sum() == len(df_alunos)
+    assert not df_hist.duplicated(simulacao.COLUNAS_CHAVE + simulacao.COLUNAS_FAIXA).any()
+
+
+@pytest.mark.parametrize('limiar_media, limiar_discrepancia, limiar_score', [
+    (190.0, 67.5, 0.0),
+    (215.0, 20.0, 0.05),
+    (150.0, 100.0, -0.1),
+])
+def test_simulacao_reproduz_contagens_exatas_nas_bordas(df_alunos, limiar_media, limiar_discrepancia, limiar_score):
+    config = CONFIG_SERIES['5EF']
+    df_hist = simulacao.gerar_histogramas_risco(df_alunos)
+    df_simulado = simulacao.simular_risco(
+        df_hist, simulacao.faixa_media(limiar_media), simulacao.faixa_discrepancia(limiar_discrepancia),
+        simulacao.faixa_score(limiar_score), config
+    )
+    resumo = simulacao.resumir_simulacao(df_simulado)
+
+    media = (df_alunos['PROFICIENCIA_LP'] + df_alunos['PROFICIENCIA_MT']) / 2
+    discrepancia = (df_alunos['PROFICIENCIA_LP'] - df_alunos['PROFICIENCIA_MT']).abs()
+    anomalia = df_alunos['SCORE_ANOMALIA'] < limiar_score
+    status = [
+        classificar_risco_final(cluster, 'Risco' if anomalo else 'Normal', q05c, config) or 'Normal'
+        for cluster, anomalo, q05c in zip(df_alunos['CLUSTER'], anomalia, df_alunos['TX_RESP_Q05c'])
+    ]
+    esperado = pd.Series(status).value_counts()
+
+    assert resumo['RISCO_APRENDIZAGEM'] == ((media < limiar_media) | (discrepancia >= limiar_discrepancia)).sum()
+    assert resumo['ANOMALIA'] == anomalia.sum()
+    for nome in simulacao.STATUS_SIMULADOS:
+        assert resumo[nome] == esperado.get(nome, 0), nome
+
+
+def test_resumo_por_grupo_soma_o_total(df_alunos):
+    df_hist = simulacao.gerar_histogramas_risco(df_alunos)
+    df_simulado = simulacao.simular_risco(df_hist, 76, 27, 100, CONFIG_SERIES['5EF'])
+    total = simulacao.resumir_simulacao(df_simulado)
+    por_uf = simulacao.resumir_simulacao(df_simulado, agrupar_por='ID_UF')
+
+    assert sorted(por_uf['ID_UF']) == [11, 29, 35]
+    for coluna in ['N_ALUNOS', 'RISCO_APRENDIZAGEM', 'ANOMALIA'] + simulacao.STATUS_SIMULADOS:
+        assert por_uf[coluna].sum() == total[coluna]
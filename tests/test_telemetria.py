@@ -0,0 +1,90 @@
+import itertools
+
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+import telemetria
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    """perf_counter que avança 1 s a cada leitura."""
+    contador = itertools.count()
+    monkeypatch.setattr(telemetria.time, 'perf_counter', lambda: float(next(contador)))
+
+
+@pytest.fixture
+def coletor():
+    coletor = telemetria.iniciar()
+    yield coletor
+    telemetria.finalizar()
+
+
+def test_medir_etapas_aninhadas(relogio, coletor):
+    @telemetria.cronometrar()
+    def carregar():
+        with telemetria.medir('ler'):
+            telemetria.registrar_figura(go.Figure())
+        telemetria.registrar_falta_cache('carregar')
+
+    carregar()        # leituras: início carregar, início ler, figura (2), fim ler, fim carregar
+    carregar()
+    telemetria.registrar_figura(go.Figure())
+
+    assert telemetria.finalizar() is coletor
+    assert coletor.pilha == []
+    etapas = coletor.etapas
+    assert etapas['ler']['CHAMADAS'] == 2 and etapas['ler']['SEGUNDOS'] == 6.0
+    # O tempo da etapa externa inclui o da interna.
+    assert etapas['carregar']['CHAMADAS'] == 2 and etapas['carregar']['SEGUNDOS'] == 10.0
+    assert etapas['carregar']['FALTAS_CACHE'] == 2
+    # Figuras são atribuídas à etapa mais interna em execução.
+    assert etapas['ler']['FIGURAS'] == 2 and etapas['carregar']['FIGURAS'] == 0
+    assert etapas['sem_etapa']['FIGURAS'] == 1
+    assert coletor.segundos_total > etapas['carregar']['SEGUNDOS']
+
+
+def test_medir_sem_coletor():
+    telemetria.finalizar()
+    with telemetria.medir('etapa'):
+        telemetria.registrar_falta_cache('etapa')
+        telemetria.registrar_figura(go.Figure())
+    assert telemetria.finalizar() is None
+
+
+def test_historico_limitado(relogio):
+    historico = telemetria.Historico(max_linhas=telemetria.MAX_LINHAS_HISTORICO)
+    coletor = telemetria.iniciar()
+    with telemetria.medir('a'):
+        with telemetria.medir('b'):
+            pass
+    telemetria.finalizar()
+
+    # Cada rerun gera uma linha por etapa mais a linha do rerun total.
+    n_reruns = telemetria.MAX_LINHAS_HISTORICO // 3 + 10
+    for _ in range(n_reruns):
+        historico.adicionar(coletor)
+
+    df = historico.para_dataframe()
+    assert len(df) == telemetria.MAX_LINHAS_HISTORICO
+    assert df.columns.tolist() == telemetria.COLUNAS_HISTORICO
+    assert historico.n_reruns == n_reruns
+    # As linhas mais antigas são descartadas primeiro.
+    assert df['RERUN'].iloc[-1] == n_reruns
+    assert df['RERUN'].iloc[0] == (3 * n_reruns - telemetria.MAX_LINHAS_HISTORICO) // 3 + 1
+    total = df[df['ETAPA'] == telemetria.ETAPA_RERUN]
+    assert (total['SEGUNDOS'] == coletor.segundos_total).all()
+
+
+def test_taxas_acerto_cache():
+    df_historico = pd.DataFrame({
+        'ETAPA': ['carregar', 'carregar', 'perfis', 'outra', telemetria.ETAPA_RERUN],
+        'CHAMADAS': [4, 6, 5, 3, 1],
+        'FALTAS_CACHE': [1, 0, 5, 3, 0],
+    })
+    df = telemetria.taxas_acerto_cache(df_historico, ['carregar', 'perfis', 'ausente'])
+    assert df['ETAPA'].tolist() == ['carregar', 'perfis']
+    assert df['CHAMADAS'].tolist() == [10, 5]
+    assert df['FALTAS_CACHE'].tolist() == [1, 5]
+    assert df['TAXA_ACERTO'].tolist() == pytest.approx([0.9, 0.0])
@@ -0,0 +1,90 @@
+import gzip
+
+import pandas as pd
+import pytest
+
+import validacao
+
+
+COLUNAS = ['ID_ALUNO', 'PROFICIENCIA_LP', 'PROFICIENCIA_MT', 'TX_RESP_BLOCO1_LP']
+
+
+@pytest.fixture
+def arquivo_alunos(tmp_path):
+    caminho = tmp_path / 'TS_ALUNO.csv'
+    linhas = [';'.join(COLUNAS)] + [f'{i};{200 + i % 50}.5;{210 + i % 40}.25;ABCDE.*' for i in range(20000)]
+    caminho.write_text('\n'.join(linhas) + '\n', encoding='latin-1')
+    return caminho
+
+
+def test_amostrar_linhas_cabeca_e_saltos(arquivo_alunos):
+    cabecalho, linhas = validacao.amostrar_linhas(arquivo_alunos, linhas_cabeca=100, n_saltos=50, linhas_por_salto=20)
+    assert cabecalho.decode().rstrip('\n').split(';') == COLUNAS
+    assert linhas[:100] == [f'{i};{200 + i % 50}.5;{210 + i % 40}.25;ABCDE.*\n'.encode() for i in range(100)]
+
+    # Saltos depois da cabeça: linhas completas, sem repetições e na ordem do arquivo.
+    ids = [int(linha.split(b';')[0]) for linha in linhas]
+    assert len(ids) == len(set(ids))
+    assert ids == sorted(ids)
+    assert 100 < len(ids) <= 100 + 50 * 20
+    assert max(ids) > 5000
+    assert all(linha.endswith(b'.*\n') for linha in linhas)
+
+
+def test_amostrar_linhas_reprodutivel_e_sem_saltos_em_gz(arquivo_alunos, tmp_path):
+    amostragem = dict(linhas_cabeca=10, n_saltos=30, linhas_por_salto=5)
+    assert validacao.amostrar_linhas(arquivo_alunos, **amostragem) == validacao.amostrar_linhas(arquivo_alunos, **amostragem)
+
+    caminho_gz = tmp_path / 'TS_ALUNO.csv.gz'
+    caminho_gz.write_bytes(gzip.compress(arquivo_alunos.read_bytes()))
+    _, linhas = validacao.amostrar_linhas(caminho_gz, **amostragem)
+    assert len(linhas) == 10
+
+
+def test_amostrar_linhas_arquivo_menor_que_a_cabeca(tmp_path):
+    caminho = tmp_path / 'pequeno.csv'
+    caminho.write_bytes(b'A;B\n1;2\n3;4')
+    cabecalho, linhas = validacao.amostrar_linhas(caminho, linhas_cabeca=100, n_saltos=10)
+    assert cabecalho == b'A;B\n'
+    assert linhas == [b'1;2\n', b'3;4']
+
+
+def test_verificar_alunos_sem_linhas_validas(tmp_path):
+    caminho = tmp_path / 'malformado.csv'
+    # Linhas em branco são descartadas pelo leitor: a amostra fica sem nenhuma linha de dados.
+    caminho.write_text(';'.join(COLUNAS) + '\n' + '\n' * 50, encoding='latin-1')
+    resultados, _ = validacao.verificar_alunos(str(caminho), COLUNAS, n_saltos=0)
+    df = pd.DataFrame(resultados).set_index('VERIFICACAO')
+    assert df.loc['linhas_malformadas', 'SEVERIDADE'] == 'ERRO'
+
+
+def test_verificar_alunos_proficiencia_nao_numerica(arquivo_alunos, monkeypatch):
+    with open(arquivo_alunos, 'a', encoding='latin-1') as arquivo:
+        arquivo.write('99999;abc;210.0;ABCDE\n')
+    resultados, _ = validacao.verificar_alunos(str(arquivo_alunos), COLUNAS, linhas_cabeca=30000, n_saltos=0)
+    df = pd.DataFrame(resultados).set_index('VERIFICACAO')
+    assert df.loc['PROFICIENCIA_LP_nao_numerica', 'SEVERIDADE'] == 'ERRO'
+    assert "'abc'" in df.loc['PROFICIENCIA_LP_nao_numerica', 'DETALHE']
+
+    monkeypatch.setattr(validacao, 'LIMITE_PROFICIENCIA_NAO_NUMERICA', 0.01)
+    resultados, _ = validacao.verificar_alunos(str(arquivo_alunos), COLUNAS, linhas_cabeca=30000, n_saltos=0)
+    df = pd.DataFrame(resultados).set_index('VERIFICACAO')
+    assert df.loc['PROFICIENCIA_LP_nao_numerica', 'SEVERIDADE'] == 'AVISO'
+    assert df.loc['PROFICIENCIA_MT_nao_numerica', 'SEVERIDADE'] == 'OK'
+
+
+def test_ids_duplicados_por_etapa(arquivo_alunos, tmp_path):
+    with open(arquivo_alunos, 'a', encoding='latin-1') as arquivo:
+        arquivo.write('5;200.5;210.25;ABCDE.*\n')
+    arquivos = {'5EF': str(arquivo_alunos)}
+
+    # A análise remove IDs repetidos ao consolidar os alunos: só avisa.
+    sem_erros, df = validacao.validar_entradas(arquivos, COLUNAS, 'analise', diretorio_relatorio=str(tmp_path),
+                                               linhas_cabeca=30000, n_saltos=0)
+    assert sem_erros
+    assert df.set_index('VERIFICACAO').loc['ids_duplicados', 'SEVERIDADE'] == 'AVISO'
+
+    sem_erros, df = validacao.validar_entradas(arquivos, COLUNAS, 'diagnostico', diretorio_relatorio=str(tmp_path),
+                                               linhas_cabeca=30000, n_saltos=0)
+    assert not sem_erros
+    assert df.set_index('VERIFICACAO').loc['ids_duplicados', 'SEVERIDADE'] == 'ERRO'
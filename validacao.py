@@ -0,0 +1,307 @@
+import argparse
+import gzip
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import leitura
+
+
+# Validação prévia (pre-flight) das entradas do pipeline: amostra os arquivos brutos em
+# segundos (início do arquivo + trechos a partir de posições aleatórias) e interrompe a
+# execução antes das etapas demoradas se houver erros. Para pular a validação, use
+# SAEB_PULAR_VALIDACAO=1.
+
+LINHAS_CABECA = 5000
+N_SALTOS = 200
+LINHAS_POR_SALTO = 50
+SEMENTE = 42
+
+# Alternativas, '.' (em branco) e '*' (dupla marcação/rasura).
+PADRAO_SIMBOLOS_VALIDOS = '[ABCDE.*]'
+FAIXA_PROFICIENCIA = (0.0, 500.0)
+COLUNAS_PROFICIENCIA = ['PROFICIENCIA_LP', 'PROFICIENCIA_MT']
+PREFIXO_COLUNA_RESPOSTA = 'TX_RESP_BLOCO'
+
+# Frações máximas toleradas na amostra antes de a verificação ser considerada erro.
+LIMITE_LINHAS_MALFORMADAS = 0.001
+LIMITE_SIMBOLOS_INVALIDOS = 0.001
+LIMITE_PROFICIENCIA_FORA_FAIXA = 0.001
+LIMITE_PROFICIENCIA_NAO_NUMERICA = 0.0
+LIMITE_IDS_DUPLICADOS = 0.0
+
+# IDs repetidos acima do limite: a análise remove as repetições ao consolidar os alunos e
+# só avisa; o diagnóstico de habilidades grava um perfil por ID e considera erro.
+SEVERIDADE_IDS_DUPLICADOS = {'analise': 'AVISO', 'diagnostico': 'ERRO'}
+
+DIRETORIO_RELATORIOS = 'data'
+COLUNAS_RELATORIO = ['ARQUIVO', 'VERIFICACAO', 'SEVERIDADE', 'VALOR', 'LIMITE', 'DETALHE']
+
+
+def _resultado(arquivo, verificacao, severidade, valor=None, limite=None, detalhe=''):
+    return {
+        'ARQUIVO': arquivo, 'VERIFICACAO': verificacao, 'SEVERIDADE': severidade,
+        'VALOR': valor, 'LIMITE': limite, 'DETALHE': detalhe,
+    }
+
+
+def _severidade(taxa, limite, acima_do_limite='ERRO'):
+    if taxa > limite:
+        return acima_do_limite
+    return 'AVISO' if taxa > 0 else 'OK'
+
+
+def amostrar_linhas(caminho, linhas_cabeca=LINHAS_CABECA, n_saltos=N_SALTOS,
+                    linhas_por_salto=LINHAS_POR_SALTO, semente=SEMENTE):
+    """
+    Retorna (cabeçalho, linhas) em bytes: as primeiras linhas do arquivo e trechos lidos
+    após saltos (seek) para posições aleatórias. A linha parcial após cada salto é
+    descartada e cada linha entra uma única vez (chave: posição no arquivo). Arquivos
+    .gz não permitem saltos baratos e são amostrados só pelo início.
+    """
+    comprimido = str(caminho).endswith('.gz')
+    abrir = gzip.open if comprimido else open
+    linhas = {}
+
+    with abrir(caminho, 'rb') as arquivo:
+        cabecalho = arquivo.readline()
+
+        def ler_trecho(n_linhas):
+            for _ in range(n_linhas):
+                posicao = arquivo.tell()
+                linha = arquivo.readline()
+                if not linha:
+                    break
+                linhas[posicao] = linha
+
+        ler_trecho(linhas_cabeca)
+
+        tamanho = os.path.getsize(caminho)
+        if not comprimido and tamanho > arquivo.tell():
+            gerador = np.random.default_rng(semente)
+            for posicao in np.sort(gerador.integers(arquivo.tell(), tamanho, n_saltos)):
+                arquivo.seek(int(posicao))
+                arquivo.readline()
+                ler_trecho(linhas_por_salto)
+
+    return cabecalho, [linhas[posicao] for posicao in sorted(linhas)]
+
+
+def verificar_itens(caminho_itens, filtrar_itens):
+    """
+    Verifica o TS_ITEM e retorna (resultados, comprimentos esperados por coluna de resposta).
+
+    `filtrar_itens` é o mesmo filtro usado pelo diagnóstico (descritores D<número>);
+    o comprimento esperado de cada bloco é o número de itens que criar_map_itens mapeia.
+    """
+    arquivo = os.path.basename(caminho_itens)
+    if not os.path.exists(caminho_itens):
+        return [_resultado(arquivo, 'arquivo_existe', 'ERRO', detalhe=f"{caminho_itens} não encontrado.")], None
+
+    colunas = ['ID_ITEM', 'NU_DESCRITOR_HABILIDADE', 'TP_DISCIPLINA', 'TX_GABARITO', 'NU_POSICAO', 'NU_BLOCO']
+    ausentes = [c for c in colunas if c not in leitura.ler_cabecalho(caminho_itens)]
+    if ausentes:
+        return [_resultado(arquivo, 'colunas', 'ERRO', len(ausentes), 0, f"Colunas ausentes: {', '.join(ausentes)}.")], None
+
+    df_itens = leitura.ler_csv(caminho_itens, colunas=colunas)
+    df_saeb = filtrar_itens(df_itens)
+    resultados = [_resultado(arquivo, 'colunas', 'OK', 0, 0)]
+    resultados.append(_resultado(
+        arquivo, 'descritores_saeb', 'ERRO' if df_saeb.empty else 'OK', len(df_saeb), None,
+        f"{len(df_saeb)} de {len(df_itens)} itens com gabarito e descritor D<número>."
+    ))
+    if df_saeb.empty:
+        return resultados, None
+
+    gabaritos = set(df_saeb['TX_GABARITO'].astype(str)) - set('ABCDEX')
+    resultados.append(_resultado(
+        arquivo, 'alfabeto_gabarito', 'AVISO' if gabaritos else 'OK', len(gabaritos), 0,
+        f"Gabaritos inesperados: {', '.join(sorted(gabaritos))}." if gabaritos else ''
+    ))
+
+    duplicados = df_saeb.duplicated(subset=['TP_DISCIPLINA', 'NU_BLOCO', 'NU_POSICAO']).sum()
+    resultados.append(_resultado(
+        arquivo, 'posicoes_duplicadas', 'ERRO' if duplicados else 'OK', int(duplicados), 0,
+        "Itens com a mesma disciplina, bloco e posição desalinham o mapa de respostas." if duplicados else ''
+    ))
+
+    comprimentos = {
+        f'{PREFIXO_COLUNA_RESPOSTA}{bloco}_{disciplina}': int(
+            ((df_saeb['TP_DISCIPLINA'] == disciplina) & (df_saeb['NU_BLOCO'] == bloco)).sum()
+        )
+        for disciplina in ['LP', 'MT'] for bloco in [1, 2]
+    }
+    vazios = [coluna for coluna, n in comprimentos.items() if n == 0]
+    resultados.append(_resultado(
+        arquivo, 'blocos_mapeados', 'ERRO' if vazios else 'OK', len(vazios), 0,
+        f"Blocos sem itens: {', '.join(vazios)}." if vazios else
+        ', '.join(f"{coluna}={n}" for coluna, n in comprimentos.items())
+    ))
+    return resultados, comprimentos
+
+
+def verificar_alunos(caminho, colunas_obrigatorias, comprimentos_blocos=None, severidade_ids_duplicados='ERRO',
+                     **amostragem):
+    """Verifica uma amostra de um TS_ALUNO: colunas, linhas, IDs, proficiências e respostas."""
+    arquivo = os.path.basename(caminho)
+    if not os.path.exists(caminho):
+        return [_resultado(arquivo, 'arquivo_existe', 'ERRO', detalhe=f"{caminho} não encontrado.")], 0
+
+    cabecalho, linhas = amostrar_linhas(caminho, **amostragem)
+    colunas_arquivo = leitura.ler_cabecalho(caminho)
+    ausentes = [c for c in colunas_obrigatorias if c not in colunas_arquivo]
+    resultados = [_resultado(
+        arquivo, 'colunas', 'ERRO' if ausentes else 'OK', len(ausentes), 0,
+        f"Colunas ausentes: {', '.join(ausentes)}." if ausentes else ''
+    )]
+    if ausentes or not linhas:
+        if not linhas:
+            resultados.append(_resultado(arquivo, 'linhas', 'ERRO', 0, None, "Arquivo sem linhas de dados."))
+        return resultados, len(linhas)
+
+    n_separadores = np.array([linha.count(b';') for linha in linhas])
+    taxa_malformadas = np.mean(n_separadores != cabecalho.count(b';'))
+    resultados.append(_resultado(
+        arquivo, 'linhas_malformadas', _severidade(taxa_malformadas, LIMITE_LINHAS_MALFORMADAS),
+        round(float(taxa_malformadas), 5), LIMITE_LINHAS_MALFORMADAS
+    ))
+
+    df = pd.read_csv(
+        io.BytesIO(cabecalho + b''.join(linhas)), sep=';', encoding='latin-1',
+        usecols=colunas_obrigatorias, dtype=str, on_bad_lines='skip'
+    )
+
+    if 'ID_ALUNO' in df.columns:
+        ids = df['ID_ALUNO'].dropna()
+        taxa_duplicados = 1 - ids.nunique() / len(ids) if len(ids) else 0.0
+        resultados.append(_resultado(
+            arquivo, 'ids_duplicados', _severidade(taxa_duplicados, LIMITE_IDS_DUPLICADOS, severidade_ids_duplicados),
+            round(float(taxa_duplicados), 5), LIMITE_IDS_DUPLICADOS,
+            f"{len(ids) - ids.nunique()} ID_ALUNO repetidos em {len(ids)} linhas amostradas."
+        ))
+
+    for coluna in [c for c in COLUNAS_PROFICIENCIA if c in df.columns]:
+        valores = df[coluna].dropna()
+        numericos = pd.to_numeric(valores, errors='coerce')
+        nao_numericos = numericos.isna()
+        taxa_nao_numericos = float(nao_numericos.mean()) if len(valores) else 0.0
+        exemplos = valores[nao_numericos].unique()[:5]
+        numericos = numericos.dropna()
+        fora_faixa = (numericos < FAIXA_PROFICIENCIA[0]) | (numericos > FAIXA_PROFICIENCIA[1])
+        taxa_fora_faixa = float(fora_faixa.mean()) if len(numericos) else 0.0
+        taxa_sem_proficiencia = 1 - len(valores) / len(df) if len(df) else 0.0
+        resultados.append(_resultado(
+            arquivo, f'{coluna}_nao_numerica', _severidade(taxa_nao_numericos, LIMITE_PROFICIENCIA_NAO_NUMERICA),
+            round(taxa_nao_numericos, 5), LIMITE_PROFICIENCIA_NAO_NUMERICA,
+            f"Exemplos: {', '.join(repr(v) for v in exemplos)}." if len(exemplos) else ''
+        ))
+        resultados.append(_resultado(
+            arquivo, f'{coluna}_fora_faixa', _severidade(taxa_fora_faixa, LIMITE_PROFICIENCIA_FORA_FAIXA),
+            round(taxa_fora_faixa, 5), LIMITE_PROFICIENCIA_FORA_FAIXA,
+            f"Faixa {FAIXA_PROFICIENCIA[0]:g}-{FAIXA_PROFICIENCIA[1]:g}; "
+            f"{taxa_sem_proficiencia:.1%} das linhas sem proficiência (excluídas pela análise)."
+        ))
+
+    for coluna in [c for c in df.columns if c.startswith(PREFIXO_COLUNA_RESPOSTA)]:
+        respostas = df[coluna].dropna()
+        if respostas.empty:
+            continue
+
+        invalidos = respostas.str.replace(PADRAO_SIMBOLOS_VALIDOS, '', regex=True)
+        taxa_invalidos = float((invalidos.str.len() > 0).mean())
+        simbolos = sorted(set(''.join(invalidos[invalidos.str.len() > 0].head(1000))))
+        resultados.append(_resultado(
+            arquivo, f'{coluna}_alfabeto', _severidade(taxa_invalidos, LIMITE_SIMBOLOS_INVALIDOS),
+            round(taxa_invalidos, 5), LIMITE_SIMBOLOS_INVALIDOS,
+            f"Símbolos inesperados: {' '.join(repr(s) for s in simbolos)}." if simbolos else ''
+        ))
+
+        if comprimentos_blocos is not None and coluna in comprimentos_blocos:
+            esperado = comprimentos_blocos[coluna]
+            comprimentos = respostas.str.len()
+            taxa_maiores = float((comprimentos > esperado).mean())
+            taxa_menores = float((comprimentos < esperado).mean())
+            # Respostas além do mapa são ignoradas em silêncio pelo diagnóstico: é erro.
+            resultados.append(_resultado(
+                arquivo, f'{coluna}_comprimento', 'ERRO' if taxa_maiores > 0 else _severidade(taxa_menores, 1.0),
+                round(taxa_maiores + taxa_menores, 5), 0.0,
+                f"Esperado {esperado} (mapa de itens); maiores: {taxa_maiores:.1%}, menores: {taxa_menores:.1%}, "
+                f"comprimentos observados: {comprimentos.min()}-{comprimentos.max()}."
+            ))
+
+    return resultados, len(df)
+
+
+def validar_entradas(arquivos_alunos, colunas_obrigatorias, etapa, caminho_itens=None, filtrar_itens=None,
+                     diretorio_relatorio=DIRETORIO_RELATORIOS, **amostragem):
+    """
+    Valida os TS_ALUNO das séries (e o TS_ITEM, se informado), imprime e grava o
+    relatório em data/validacao_entradas_<etapa>.csv. Retorna (sem_erros, df_relatorio).
+    """
+    inicio = time.perf_counter()
+    resultados = []
+    comprimentos_blocos = None
+    if caminho_itens is not None:
+        resultados_itens, comprimentos_blocos = verificar_itens(caminho_itens, filtrar_itens)
+        resultados.extend(resultados_itens)
+
+    n_linhas = 0
+    for serie, caminho in arquivos_alunos.items():
+        resultados_serie, n_linhas_serie = verificar_alunos(
+            caminho, colunas_obrigatorias, comprimentos_blocos,
+            SEVERIDADE_IDS_DUPLICADOS.get(etapa, 'ERRO'), **amostragem
+        )
+        resultados.extend(dict(r, ARQUIVO=f"{r['ARQUIVO']} ({serie})") for r in resultados_serie)
+        n_linhas += n_linhas_serie
+
+    df_relatorio = pd.DataFrame(resultados, columns=COLUNAS_RELATORIO)
+    os.makedirs(diretorio_relatorio, exist_ok=True)
+    caminho_relatorio = os.path.join(diretorio_relatorio, f'validacao_entradas_{etapa}.csv')
+    df_relatorio.to_csv(caminho_relatorio, sep=';', encoding='utf-8', index=False)
+
+    n_erros = (df_relatorio['SEVERIDADE'] == 'ERRO').sum()
+    n_avisos = (df_relatorio['SEVERIDADE'] == 'AVISO').sum()
+    for _, linha in df_relatorio[df_relatorio['SEVERIDADE'] != 'OK'].iterrows():
+        medida = f" (valor {linha['VALOR']:g}, limite {linha['LIMITE']:g})" if pd.notna(linha['LIMITE']) else ''
+        print(f"{linha['SEVERIDADE']}: {linha['ARQUIVO']} - {linha['VERIFICACAO']}{medida}. {linha['DETALHE']}")
+    print(f"Validação '{etapa}': {len(df_relatorio)} verificações, {n_erros} erros, {n_avisos} avisos "
+          f"({n_linhas} linhas amostradas em {time.perf_counter() - inicio:.1f}s). Relatório: '{caminho_relatorio}'.")
+    return n_erros == 0, df_relatorio
+
+
+def exigir_entradas_validas(arquivos_alunos, colunas_obrigatorias, etapa, **kwargs):
+    """Chamada no início das etapas do pipeline: encerra o processo se a validação encontrar erros."""
+    if os.environ.get('SAEB_PULAR_VALIDACAO') == '1':
+        print(f"AVISO: validação das entradas da etapa '{etapa}' pulada (SAEB_PULAR_VALIDACAO=1).")
+        return
+    sem_erros, _ = validar_entradas(arquivos_alunos, colunas_obrigatorias, etapa, **kwargs)
+    if not sem_erros:
+        raise SystemExit(f"ERRO: entradas inválidas para a etapa '{etapa}'. Corrija-as ou use SAEB_PULAR_VALIDACAO=1.")
+
+
+if __name__ == "__main__":
+    import analise
+    import diagnostico_habilidades
+
+    parser = argparse.ArgumentParser(description="Validação prévia (por amostragem) das entradas do pipeline.")
+    parser.add_argument('--series', nargs='+', default=list(analise.ARQUIVOS_ALUNO), choices=list(analise.ARQUIVOS_ALUNO))
+    parser.add_argument('--linhas-cabeca', type=int, default=LINHAS_CABECA)
+    parser.add_argument('--saltos', type=int, default=N_SALTOS, help="Número de posições aleatórias amostradas.")
+    parser.add_argument('--linhas-por-salto', type=int, default=LINHAS_POR_SALTO)
+    args = parser.parse_args()
+
+    amostragem = {'linhas_cabeca': args.linhas_cabeca, 'n_saltos': args.saltos, 'linhas_por_salto': args.linhas_por_salto}
+    sem_erros_analise, _ = validar_entradas(
+        {serie: analise.ARQUIVOS_ALUNO[serie] for serie in args.series},
+        analise.COLUNAS_MANTER, 'analise', **amostragem
+    )
+    sem_erros_diagnostico, _ = validar_entradas(
+        {serie: diagnostico_habilidades.ARQUIVOS_SERIES[serie]['respostas'] for serie in args.series},
+        [diagnostico_habilidades.COLUNA_ID_ALUNO] + diagnostico_habilidades.COLUNAS_RESPOSTA, 'diagnostico',
+        caminho_itens=diagnostico_habilidades.CAMINHO_ITENS,
+        filtrar_itens=diagnostico_habilidades.filtrar_itens_saeb, **amostragem
+    )
+    raise SystemExit(0 if sem_erros_analise and sem_erros_diagnostico else 1)